@@ -0,0 +1,84 @@
+import numpy as np
+
+class SymmetryUtils():
+    """Utilities for the 8 symmetries (4 rotations, each optionally followed by a horizontal flip)
+    of a square game board. A symmetry is identified by an integer from 0 to 7:
+    symmetry % 4 is the number of counterclockwise rotations, symmetry >= 4 adds a horizontal flip.
+    The utilities are static functions called by SymmetryUtils.function_name()
+    """
+    SYMMETRY_NUMBER = 8
+
+    @staticmethod
+    def transform_grid(board_grid, symmetry):
+        """Apply a symmetry to a board grid
+        Args:
+            board_grid: 2d array representation of the board
+            symmetry: integer from 0 to 7 identifying the symmetry
+        Returns:
+            the transformed grid as a numpy array
+        """
+        new_board_grid = np.rot90(np.asarray(board_grid), symmetry % 4)
+        if symmetry >= 4:
+            new_board_grid = np.fliplr(new_board_grid)
+        return new_board_grid
+
+    @staticmethod
+    def transform_move(move, symmetry, board_dimension):
+        """Find where a move lands after a symmetry is applied to the board
+        Args:
+            move: (r, c) tuple, (-1, -1) for pass which is left unchanged
+            symmetry: integer from 0 to 7 identifying the symmetry
+            board_dimension: dimension of the board
+        Returns:
+            the transformed (r, c) tuple
+        """
+        (r, c) = move
+        if r == -1 and c == -1:
+            return move
+        for i in range(symmetry % 4):
+            (r, c) = (board_dimension - 1 - c, r)
+        if symmetry >= 4:
+            c = board_dimension - 1 - c
+        return (r, c)
+
+    @staticmethod
+    def inverse_symmetry(symmetry):
+        """Find the symmetry that undoes the given one
+        Args:
+            symmetry: integer from 0 to 7 identifying the symmetry
+        Returns:
+            the inverse symmetry
+        """
+        if symmetry >= 4: #Reflections are their own inverse
+            return symmetry
+        return (4 - symmetry) % 4
+
+    @staticmethod
+    def canonical_symmetry(board_grid):
+        """Find the symmetry that maps the board grid to its canonical representative,
+        the transformed grid with the smallest byte representation
+        Args:
+            board_grid: 2d array representation of the board
+        Returns:
+            (symmetry, canonical_grid): the symmetry and the int8 canonical grid
+        """
+        grid = np.asarray(board_grid, dtype=np.int8)
+        best_symmetry, best_grid, best_key = 0, grid, grid.tobytes()
+        for symmetry in range(1, SymmetryUtils.SYMMETRY_NUMBER):
+            new_grid = SymmetryUtils.transform_grid(grid, symmetry)
+            key = new_grid.tobytes()
+            if key < best_key:
+                best_symmetry, best_grid, best_key = symmetry, new_grid, key
+        return best_symmetry, np.ascontiguousarray(best_grid)
+
+    @staticmethod
+    def find_symmetries(board_grid):
+        """Find the symmetries that leave the board grid unchanged
+        Args:
+            board_grid: 2d array representation of the board
+        Returns:
+            list of symmetries, always including the identity 0
+        """
+        grid = np.asarray(board_grid)
+        return [symmetry for symmetry in range(SymmetryUtils.SYMMETRY_NUMBER)
+            if np.array_equal(SymmetryUtils.transform_grid(grid, symmetry), grid)]
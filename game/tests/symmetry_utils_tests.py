@@ -0,0 +1,27 @@
+import unittest
+import numpy as np
+
+from game.symmetry_utils import SymmetryUtils
+
+class SymmetryUtilsTest(unittest.TestCase):
+    def test_transform_move_matches_transform_grid(self):
+        grid = np.arange(25).reshape(5, 5)
+        for symmetry in range(8):
+            new_grid = SymmetryUtils.transform_grid(grid, symmetry)
+            inverse = SymmetryUtils.inverse_symmetry(symmetry)
+            self.assertTrue(np.array_equal(SymmetryUtils.transform_grid(new_grid, inverse), grid))
+            for r in range(5):
+                for c in range(5):
+                    (new_r, new_c) = SymmetryUtils.transform_move((r, c), symmetry, 5)
+                    self.assertEqual(new_grid[new_r][new_c], grid[r][c])
+            self.assertEqual(SymmetryUtils.transform_move((-1, -1), symmetry, 5), (-1, -1))
+
+    def test_find_symmetries(self):
+        self.assertEqual(len(SymmetryUtils.find_symmetries(np.zeros((5, 5)))), 8)
+        grid = np.zeros((5, 5))
+        grid[2][2] = 1
+        grid[0][2] = 1
+        self.assertEqual(sorted(SymmetryUtils.find_symmetries(grid)), [0, 4])
+
+if __name__ == '__main__':
+    unittest.main()
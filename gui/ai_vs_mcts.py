@@ -1,8 +1,9 @@
 from game.go_board import GoBoard
 from game.go_utils import GoUtils
-from gui.alphago_zero import AlphaGoZero
+from gui.alphago_zero import AlphaGoZero, play_model_path
 from self_play.mcts import MCTS
 from self_play.self_play import SelfPlay
+from value_policy_net.model_registry import ModelRegistry
 from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
 from value_policy_net.tests.random_net import RandomNet
 
@@ -13,11 +14,12 @@ PLAYER_BLACK = 1
 PLAYER_WHITE = -1
 BOARD_DIM = 5
 
-def nn_vs_random(nn_batch, game_num):
+def nn_vs_random(nn_batch, game_num, registry=None):
     """ Play raw neural net against random play
     Args:
         nn_batch: the batch number for the version of ResNet used, save in the models folder
         game_num: number of games played
+        registry: optional ModelRegistry, so matches against the same checkpoint build its graph once
     Returns:
         black winning counts, white winning counts
     """
@@ -25,7 +27,8 @@ def nn_vs_random(nn_batch, game_num):
     utils = GoUtils()
     count_nn_winning = 0
     count_random_winning = 0
-    alphago0 = AlphaGoZero(model_path="../models/batch_" + str(nn_batch), restored=True)
+    alphago0 = AlphaGoZero(model_path=play_model_path("../models/batch_" + str(nn_batch)), restored=True,
+        inference_only=True, registry=registry)
    
     for i in range(game_num):
         print()
@@ -36,7 +39,7 @@ def nn_vs_random(nn_batch, game_num):
             #Raw NN plays black 
             if board.player == PLAYER_BLACK:
                 print("Raw NN plays")
-                move, _ = alphago0.play_with_raw_nn(board)
+                move = alphago0.analyze(board, budget=1).move
             else:
                 print("Random plays")
                 p, _ = uniform_net.predict(board)
@@ -60,12 +63,13 @@ def nn_vs_random(nn_batch, game_num):
 
     return count_nn_winning, count_random_winning
 
-def ai_vs_random(nn_batch, ai_simulation_num, game_num):
+def ai_vs_random(nn_batch, ai_simulation_num, game_num, registry=None):
     """ Play ai against random play
     Args:
         nn_batch: the batch number for the version of ResNet used, save in the models folder
         ai_simulation_num: simulation number used in AlphaGo
         game_num: number of games played
+        registry: optional ModelRegistry, so matches against the same checkpoint build its graph once
     Returns:
         percentage of games when AI beats MCTS
     """
@@ -73,7 +77,8 @@ def ai_vs_random(nn_batch, ai_simulation_num, game_num):
     utils = GoUtils()
     count_nn_winning = 0
     count_random_winning = 0
-    alphago0 = AlphaGoZero(model_path="../models/batch_" + str(nn_batch), restored=True)
+    alphago0 = AlphaGoZero(model_path=play_model_path("../models/batch_" + str(nn_batch)), restored=True,
+        inference_only=True, registry=registry)
    
     for i in range(game_num):
         print()
@@ -84,7 +89,7 @@ def ai_vs_random(nn_batch, ai_simulation_num, game_num):
             #AlphaGo with MCTS plays black 
             if board.player == PLAYER_BLACK:
                 print("AlphaGo Zero plays")
-                move = alphago0.play_with_mcts(board, simulation_number=mcts_simulation_num)
+                move = alphago0.analyze(board, budget=ai_simulation_num).move
             else:
                 print("Random plays")
                 p, _ = uniform_net.predict(board)
@@ -108,13 +113,14 @@ def ai_vs_random(nn_batch, ai_simulation_num, game_num):
 
     return count_nn_winning, count_random_winning
 
-def ai_vs_mcts(nn_batch, ai_simulation_num, mcts_simulation_num, game_num):
+def ai_vs_mcts(nn_batch, ai_simulation_num, mcts_simulation_num, game_num, registry=None):
     """ Play ai against mcts (with uniform heuristic) only and calculate the ai's winning rate
     Args:
         nn_batch: the batch number for the version of ResNet used, save in the models folder
         ai_simulation_num: simulation number used in AlphaGo
         mcts_simulation_num: simluation number used in MCTS
         game_num: number of games played
+        registry: optional ModelRegistry, so matches against the same checkpoint build its graph once
     Returns:
         percentage of games when AI beats MCTS
     """
@@ -122,7 +128,8 @@ def ai_vs_mcts(nn_batch, ai_simulation_num, mcts_simulation_num, game_num):
     utils = GoUtils()
     count_nn_winning = 0
     count_mcts_winning = 0
-    alphago0 = AlphaGoZero(model_path="../models/batch_" + str(nn_batch), restored=True)
+    alphago0 = AlphaGoZero(model_path=play_model_path("../models/batch_" + str(nn_batch)), restored=True,
+        inference_only=True, registry=registry)
    
     for i in range(game_num):
         print()
@@ -133,7 +140,7 @@ def ai_vs_mcts(nn_batch, ai_simulation_num, mcts_simulation_num, game_num):
             #AlphaGo with MCTS plays black 
             if board.player == PLAYER_BLACK:
                 print("AlphaGo Zero plays")
-                move = alphago0.play_with_mcts(board, simulation_number=mcts_simulation_num)
+                move = alphago0.analyze(board, budget=ai_simulation_num).move
             else:
                 print("MCTS plays")
                 mcts_play_instance = MCTS(board, uniform_net, utils, simluation_number=mcts_simulation_num)
@@ -157,15 +164,63 @@ def ai_vs_mcts(nn_batch, ai_simulation_num, mcts_simulation_num, game_num):
 
     return count_nn_winning, count_mcts_winning
 
-batch = 1920 #Last model saved
-game_num = 100
-# mcts_simulation_num = 5000
-# ai_simulation_num = 300
-# print("For nn trained with {} batches VS MCTS simluations 100 playing {} games, the winning ratio is".format(batch, game_num))
-# print(ai_vs_mcts(nn_batch=batch, ai_simulation_num=ai_simulation_num, mcts_simulation_num=100, game_num=game_num))
+def checkpoint_vs_checkpoint(black_batch, white_batch, ai_simulation_num, game_num, registry=None):
+    """ Play two checkpoints against each other, both searching with MCTS
+    Args:
+        black_batch: the batch number of the ResNet playing black, saved in the models folder
+        white_batch: the batch number of the ResNet playing white
+        ai_simulation_num: simulation number used by both players
+        game_num: number of games played
+        registry: optional ModelRegistry, both networks are loaded in it once and shared with later matches
+    Returns:
+        black winning counts, white winning counts
+    """
+    if registry == None:
+        registry = ModelRegistry()
+    utils = GoUtils()
+    count_black_winning = 0
+    count_white_winning = 0
+    players = {
+        PLAYER_BLACK: AlphaGoZero(model_path="../models/batch_" + str(black_batch), restored=True, registry=registry),
+        PLAYER_WHITE: AlphaGoZero(model_path="../models/batch_" + str(white_batch), restored=True, registry=registry)
+    }
+
+    for i in range(game_num):
+        print()
+        print("game number ", i)
+        board = GoBoard(board_dimension=BOARD_DIM, player=PLAYER_BLACK)
+        while not utils.is_game_finished(board) and len(board.game_history) <= BOARD_DIM**2*2:
+            move = players[board.player].analyze(board, budget=ai_simulation_num).move
+            _, board = utils.make_move(board=board, move=move)
 
-print("For nn trained with {} batches VS random playing {} games, the winning ratio is".format(batch, game_num))
-print(nn_vs_random(nn_batch=batch, game_num=game_num))
+        winner, winning_by_points = utils.evaluate_winner(board.board_grid)
+        if winning_by_points > 0:
+            if winner == 1:
+                count_black_winning += 1
+            elif winner == -1:
+                count_white_winning += 1
+        print("winner is ", winner)
+        print("winning by points", winning_by_points)
+        print(board)
+
+    return count_black_winning, count_white_winning
+
+def main():
+    batch = 1920 #Last model saved
+    game_num = 100
+    #Matches against the same checkpoint share one graph
+    registry = ModelRegistry()
+    # mcts_simulation_num = 5000
+    # ai_simulation_num = 300
+    # print("For nn trained with {} batches VS MCTS simluations 100 playing {} games, the winning ratio is".format(batch, game_num))
+    # print(ai_vs_mcts(nn_batch=batch, ai_simulation_num=ai_simulation_num, mcts_simulation_num=100, game_num=game_num, registry=registry))
+
+    print("For nn trained with {} batches VS random playing {} games, the winning ratio is".format(batch, game_num))
+    print(nn_vs_random(nn_batch=batch, game_num=game_num, registry=registry))
+    registry.close()
+
+if __name__ == '__main__':
+    main()
 
 
 
@@ -1,44 +1,118 @@
 import numpy as np
-import operator
-import tensorflow as tf
+import os
+import threading
 
-from pyprind import prog_bar
+from collections import namedtuple
 
 from game.go_board import GoBoard
 from game.go_utils import GoUtils
 from self_play.mcts import MCTS
+from self_play.replay_buffer import PersistentReplayBuffer, ReplayBuffer
 from self_play.self_play import SelfPlay
-from value_policy_net.resnet import ResNet
+from value_policy_net.evaluation_cache import EvaluationCache
 
 BLACK = 1
 WHITE = -1
 
+#Result of AlphaGoZero.analyze
+#   move: (row, col) of the selected move, (-1, -1) for pass
+#   value: value the res net assigned to the board
+#   prior: the res net's move probability dictionary for the board
+#   visits: size dimension x dimension + 1 array of the share of root visits of each move, all zeros without search
+#   principal_variation: list of moves following the most visited edges, starting with the selected move
+#   stats: SearchStats of the search if profiling was asked for, otherwise None
+Analysis = namedtuple('Analysis', ['move', 'value', 'prior', 'visits', 'principal_variation', 'stats'])
+
+def play_model_path(model_path):
+    """Weights to play a checkpoint with: its export model_path.npz if there is one, so play starts without
+    TensorFlow, otherwise the checkpoint itself. Export with python -m value_policy_net.numpy_net <checkpoint> <npz>
+    """
+    return model_path + '.npz' if os.path.exists(model_path + '.npz') else model_path
+
 class AlphaGoZero():
-    def __init__(self, model_path, restored):
+    def __init__(self, model_path, restored, cache_size=100000, inference_only=False, registry=None):
         """
         Args:
-            model_path: path to the model to be restored from or save to
+            model_path: path to the model to be restored from or save to. Weights exported to an npz file
+                by export_checkpoint play with NumpyNet, without importing TensorFlow, but cannot be trained
             restored: boolean indicating if we want to restore a saved model
+            cache_size: number of positions kept in the evaluation cache in front of the res net
+            inference_only: True to only play and analyze, the res net is built without its training operations
+            registry: optional ModelRegistry the restored res net is taken from, so instances playing the same
+                checkpoint share one graph instead of building their own. The res net is asked for again before
+                each use, so a model the registry evicted or rebuilt is replaced
         """
         self.model_path = model_path
         self.utils = GoUtils()
-        self.sess = tf.Session()
-        with self.sess.as_default():
-            self.nn = ResNet(board_dimension = 5, l2_beta=1e-4, model_path = model_path, restored=restored)
-
-    def train_nn(self, training_game_number, simulation_number):
+        self.cache_size = cache_size
+        exported = restored and model_path.endswith('.npz')
+        #Exported weights load in milliseconds, the registry shares checkpoints
+        self.registry = registry if restored and not exported else None
+        self.nn = None
+        if self.registry != None:
+            self.get_nn()
+        elif exported:
+            from value_policy_net.numpy_net import NumpyNet
+
+            self.sess = None
+            self.nn = NumpyNet(model_path)
+            self.evaluator = EvaluationCache(self.nn, max_size=cache_size)
+        else:
+            #TensorFlow is imported when the res net is built, so importing this module is fast
+            import tensorflow as tf
+            from value_policy_net.resnet import ResNet
+
+            self.sess = tf.Session()
+            with self.sess.as_default():
+                self.nn = ResNet(board_dimension = 5, l2_beta=1e-4, model_path = model_path, restored=restored,
+                    inference_only=inference_only)
+            #Used by search and play, invalidated automatically when the res net is trained
+            self.evaluator = EvaluationCache(self.nn, max_size=cache_size)
+
+    def get_nn(self):
+        """Res net of the model, asked for from the registry if there is one. Asking marks the model as used,
+        and an evicted model is loaded again. A new res net gets a new evaluation cache
+        Returns:
+            the res net
+        """
+        if self.registry == None:
+            return self.nn
+        nn = self.registry.get(self.model_path, self.model_path)
+        if nn is not self.nn:
+            self.nn = nn
+            self.sess = nn.sess
+            self.evaluator = EvaluationCache(nn, max_size=self.cache_size)
+        return nn
+
+    def train_nn(self, training_game_number, simulation_number, use_gumbel=False,
+                 full_search_probability=1.0, fast_simulation_number=None, simulation_budget=None, board_dimension=None,
+                 replay_path=None, symmetry_pruning=None):
         """Training the resnet by self play using MCTS
         With experience replay
         Args:
             training_game_number: number of self play games
             simulation_number: number of simulations used in MCTS
+            use_gumbel: True to use the Gumbel root search in self play, 16 - 64 simulations are enough
+            full_search_probability: fraction of self play moves searched with simulation_number simulations
+                and used as policy training targets
+            fast_simulation_number: simulations for the other self play moves, None to search every move fully
+            simulation_budget: optional AdaptiveSimulationBudget choosing the simulations of each full search
+            board_dimension: dimension of the self play boards, None for the dimension of the nn.
+                A fully convolutional nn can train on several dimensions, from small boards to large ones
+            replay_path: optional directory of a PersistentReplayBuffer. The self play samples are kept on disk there,
+                and a restarted training run resumes with them instead of filling the bucket again
+            symmetry_pruning: symmetry pruning of the self play searches, None, 'root' or 'all', see MCTS
         Returns:
-            Nothing, but model_path/game_1 has the model trained
+            Nothing, but model_path/batch_<n> checkpoints are written and listed in model_path/manifest.json.
+            A run restarted with the same model_path restores the latest of them before training
         Notes:
             Training 2000 games, total distinct board number seen = 2000 * 50 = 100,000
             After each game, 2000 boards are sampled. Each board is used 2/25*25000/50 = 40 times.
             Fake dataset also had 100,000 data seen (achieved 96% test accuracy on 50 test boards for counting)
         """
+        from pyprind import prog_bar
+        from value_policy_net.checkpoint_manager import CheckpointManager
+        from value_policy_net.input_pipeline import dataset_from_replay_buffer
 
         #Batch and bucket size used for testing
         # BATCH_SIZE = 60
@@ -46,59 +120,104 @@ class AlphaGoZero():
         
         BATCH_SIZE = 2000
         BUCKET_SIZE = 25000 # bucket size used in experience replay
+        HELD_OUT_PER_GAME = 1 # positions of each game kept out of the bucket to measure the held out loss
         BLACK = 1 # black goes first
         batch_num = 0
-
-        # batch_training_sample_size = 0
-        bucket_training_boards = np.empty(0)
-        bucket_training_labels_p = np.empty(0)
-        bucket_training_labels_v = np.empty(0)
-
-        batch_training_boards = np.empty(0)
-        batch_training_labels_p = np.empty(0)
-        batch_training_labels_v = np.empty(0)
+        self.get_nn()
+        if self.sess == None:
+            raise ValueError("Exported weights only play, train from a checkpoint")
+        if board_dimension == None:
+            board_dimension = self.nn.board_dimension
+        elif board_dimension != self.nn.board_dimension and not self.nn.config.fully_convolutional:
+            raise ValueError("Only a fully convolutional nn trains on boards of another dimension")
+
+        #Experience replay memory, the oldest samples are overwritten once it holds BUCKET_SIZE samples
+        if replay_path != None:
+            replay_buffer = PersistentReplayBuffer(replay_path, BUCKET_SIZE, board_dimension)
+            print("replay buffer resumed with", len(replay_buffer), "samples")
+        else:
+            replay_buffer = ReplayBuffer(BUCKET_SIZE, board_dimension)
+        #Batches are sampled by the tf.data pipeline, the lock keeps them from reading a game being added
+        replay_lock = threading.Lock()
+        dataset = dataset_from_replay_buffer(replay_buffer, BATCH_SIZE, lock=replay_lock)
+
+        #Checkpoints are written in the background, keeping the last 5 and every 10th
+        checkpoint_manager = CheckpointManager(self.sess, self.model_path, prefix='batch_', keep_last=5, keep_every=10,
+            config=self.nn.config)
+        #A resumed run continues from the weights and optimizer state of the last checkpoint and numbers
+        #its batches after it
+        if checkpoint_manager.entries:
+            self.nn.restore(checkpoint_manager.latest_checkpoint())
+            batch_num = checkpoint_manager.entries[-1]['step']
+            print("training resumed from", checkpoint_manager.latest_checkpoint())
 
         with self.sess.as_default():
             for game_num in prog_bar(range(training_game_number)):
                 print("training game:", game_num+1)
-                board = GoBoard(self.nn.board_dimension, BLACK, board_grid=[], game_history=None)
+                board = GoBoard(board_dimension, BLACK, board_grid=[], game_history=None)
                 
-                play = SelfPlay(board, self.nn, self.utils, simluation_number=simulation_number)
+                play = SelfPlay(board, self.evaluator, self.utils, simluation_number=simulation_number, use_gumbel=use_gumbel,
+                    full_search_probability=full_search_probability, fast_simluation_number=fast_simulation_number,
+                    simulation_budget=simulation_budget, symmetry_pruning=symmetry_pruning)
                 training_boards, training_labels_p, training_labels_v = play.play_till_finish()
+                print("self play throughput:", play.get_throughput_stats())
+                print("evaluation cache:", self.evaluator.get_stats())
                 
-                # Fill the bucket with current game's boards, around 20
-                if len(bucket_training_boards) == 0:
-                    bucket_training_boards = training_boards
-                if len(bucket_training_labels_p) == 0:
-                    bucket_training_labels_p = training_labels_p
-                if len(bucket_training_labels_v) == 0:
-                    bucket_training_labels_v = training_labels_v
-                bucket_training_boards = np.append(bucket_training_boards, training_boards, axis=0)
-                bucket_training_labels_p = np.append(bucket_training_labels_p, training_labels_p, axis=0)
-                #print("bucket_training_labels_p:", bucket_training_labels_p.shape)
-                bucket_training_labels_v = np.append(bucket_training_labels_v, training_labels_v, axis=0)
-
-                # Remove from the front if bucket size exceeds the specified bucket size
-                if len(bucket_training_labels_v) > BUCKET_SIZE:
-                    deleted_indices = [i for i in range(len(bucket_training_labels_v) - BUCKET_SIZE)]
-                    bucket_training_boards = np.delete(bucket_training_boards, deleted_indices, axis=0)
-                    bucket_training_labels_p = np.delete(bucket_training_labels_p, deleted_indices, axis=0)
-                    bucket_training_labels_v = np.delete(bucket_training_labels_v, deleted_indices, axis=0)
-                    #print("bucket_training_labels_p:", bucket_training_labels_p.shape)
-                    # Take BATCH_SIZE number of random elements from the bucket and train
-                    BUCKET_INDICES = [i for i in range(BUCKET_SIZE)]
-                    batch_indices = np.random.choice(BUCKET_INDICES, BATCH_SIZE, replace=False)
-                    batch_training_boards = np.take(bucket_training_boards, batch_indices, axis=0)
-                    batch_training_labels_p = np.take(bucket_training_labels_p, batch_indices, axis=0)
-                    #print("batch_training_labels_p:", batch_training_labels_p.shape)
-                    batch_training_labels_v = np.take(bucket_training_labels_v, batch_indices, axis=0)
+                # Random positions go to the held out set with all their augmented boards, never to the bucket,
+                # so they are not trained on. They are drawn among the fully searched positions, fast moves have
+                # no policy target and would lower the held out policy loss
+                full_search_positions = play.get_full_search_positions()
+                held_out = np.zeros(len(training_boards), dtype=bool)
+                held_out[play.get_training_indices(np.random.choice(full_search_positions,
+                    min(HELD_OUT_PER_GAME, len(full_search_positions)), replace=False))] = True
+                self.nn.hold_out(training_boards[held_out], training_labels_p[held_out], training_labels_v[held_out])
+
+                # Fill the bucket with the other boards of the current game, around 20
+                with replay_lock:
+                    replay_buffer.add_boards(training_boards[~held_out], training_labels_p[~held_out], training_labels_v[~held_out])
+
+                # Once the bucket is full, train on a batch of BATCH_SIZE random elements from it
+                if replay_buffer.is_full():
                     batch_num += 1
+                    print("batch number", batch_num)
+                    training_loss, _ = self.nn.train_on_dataset(dataset, steps=1)
+                    print("Training loss for this batch is:", training_loss)
                     if batch_num%10 == 0: #Save every 10 batches
-                        model_path = self.model_path + '/batch_' + str(batch_num)
-                        self.nn.train(batch_training_boards, batch_training_labels_p, batch_training_labels_v, model_path)
-                    else:
-                        print("batch number", batch_num)
-                        self.nn.train(batch_training_boards, batch_training_labels_p, batch_training_labels_v)
+                        checkpoint_manager.save(batch_num)
+
+        checkpoint_manager.close()
+        if replay_path != None:
+            replay_buffer.close()
+
+    def analyze(self, board, budget, max_nodes=None, profile=False, symmetry_pruning=None):
+        """Evaluate a board and select a move with a single search, so the board is evaluated once
+        Args:
+            board: current board including the current player and stone distribution
+            budget: number of MCTS simluations, 1 or less plays the raw res net's most likely valid move
+            max_nodes: node budget of the search tree, None for an unbounded tree
+            profile: True to collect SearchStats during the search
+            symmetry_pruning: symmetry pruning of the search, None, 'root' or 'all', see MCTS
+        Returns:
+            an Analysis tuple with the move, value, prior, visit distribution, principal variation and stats
+        """
+        self.get_nn()
+        if budget <= 1:
+            prior, value = self.evaluator.predict(board)
+            valid_moves = [move for move in prior if self.utils.is_valid_move(board, move)]
+            move = max(valid_moves, key=lambda m: prior[m]) if valid_moves else (-1, -1)
+            visits = np.zeros(board.board_dimension*board.board_dimension+1)
+            return Analysis(move, value, prior, visits, [move], None)
+
+        mcts_play_instance = MCTS(board, self.evaluator, self.utils, simluation_number = budget,
+            max_nodes = max_nodes, profile = profile, symmetry_pruning = symmetry_pruning)
+        move, stats = mcts_play_instance.run_simulations_without_noise(return_stats=True)
+        root_node = mcts_play_instance.root_node
+        value = mcts_play_instance.root_value if mcts_play_instance.root_value is not None else root_node.action_value
+        #The played move is drawn among the best moves, the variation continues below it
+        principal_variation = mcts_play_instance.get_principal_variation(first_move=move)
+
+        return Analysis(move, value, root_node.move_p_dist, mcts_play_instance.get_visit_distribution(),
+            principal_variation, stats)
 
     def play_with_raw_nn(self, board):
         """Play a move with the raw res net
@@ -108,35 +227,20 @@ class AlphaGoZero():
             next_move: (row, col) indicating where the neural net would place the stone
             winning_prob: probability of winning by playing this move acording to out neural net
         """
-        potential_moves_policy, winning_prob = self.nn.predict(board)
+        analysis = self.analyze(board, budget=1)
+        return analysis.move, analysis.value
 
-        #print("policy is:", potential_moves_policy)
-        found_move = False
-        while not found_move:
-            board_copy = board.copy()
-            next_move = max(potential_moves_policy.items(), key=operator.itemgetter(1))[0]
-            is_valid_move, new_board = self.utils.make_move(board_copy, next_move)
-
-            #Only makes the move when the move is valid.
-            if is_valid_move:
-                found_move = True
-            else:
-                potential_moves_policy.pop(next_move)
-
-        return next_move, winning_prob
-
-    def play_with_mcts(self, board, simulation_number):
+    def play_with_mcts(self, board, simulation_number, max_nodes=None, symmetry_pruning=None):
         """Play a move with the res net and another round of Monte Carlo Tree Search
         Args:
             board: current board including the current player and stone distribution
             simulation_number: number of simluations during play
+            max_nodes: node budget of the search tree, None for an unbounded tree
+            symmetry_pruning: symmetry pruning of the search, None, 'root' or 'all', see MCTS
         Returns:
             next_move: (row, col) indicating where the neural net with MCTS would place the stone
         """
-        mcts_play_instance = MCTS(board, self.nn, self.utils, simluation_number = simulation_number)
-        next_move = mcts_play_instance.run_simulations_without_noise()
-
-        return next_move
+        return self.analyze(board, budget=simulation_number, max_nodes=max_nodes, symmetry_pruning=symmetry_pruning).move
         
 if __name__ == '__main__':
     alphpago0 = AlphaGoZero(model_path="../models", restored=False)
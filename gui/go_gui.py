@@ -244,6 +244,9 @@ class Go:
     def retrieve_winner(self):
         return self.utils.evaluate_winner(self.go_board.board_grid)
 
-if __name__ == "__main__" :
+def main():
     go = Go()
-    go.on_execute()
\ No newline at end of file
+    go.on_execute()
+
+if __name__ == "__main__" :
+    main()
\ No newline at end of file
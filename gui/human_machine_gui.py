@@ -4,12 +4,14 @@ from pygame.locals import *
 
 from game.go_board import GoBoard
 from game.go_utils import GoUtils
-from gui.alphago_zero import AlphaGoZero
+from gui.alphago_zero import AlphaGoZero, play_model_path
+from self_play.ponderer import Ponderer
 #from self_play.self_play import SelfPlay
 
 # Assume human is black and machine is white
 
 BOARD_DIM = 5 # Define an x by x board
+SIMULATION_NUMBER = 1000 # Simulations the machine searches for each move
 
 # Define colors
 BLACK  = (0, 0, 0)
@@ -50,14 +52,40 @@ class Go:
         self.pass_button_clicked = False
         self.passed_once = False
         self.game_over = False
-        self.alphpago0 = AlphaGoZero(model_path="../models/batch_1920", restored=True)
+        self.alphpago0 = AlphaGoZero(model_path=play_model_path("../models/batch_1920"), restored=True, inference_only=True)
+        # Searches on a background thread, pondering while the human thinks
+        self.ponderer = None
+        self.machine_thinking = False
+
+    def human_moves(self, move):
+        """ Promote the subtree of the human's move to the root of the machine's search
+        """
+        if self.ponderer != None:
+            self.ponderer.play_move(move)
 
     def machine_responds(self):
+        """ Start the machine's search in the background, the move is played by check_machine_move
+        """
         print("machine responds")        
         print("for board.", self.go_board)
-        _, win_prob = self.alphpago0.play_with_raw_nn(self.go_board)
-        machine_mv = self.alphpago0.play_with_mcts(self.go_board, simulation_number=1000)
-        print(machine_mv, win_prob)
+        if self.ponderer == None:
+            self.ponderer = Ponderer(self.go_board, self.alphpago0.evaluator, self.utils, simluation_number=SIMULATION_NUMBER)
+        self.ponderer.start_search()
+        self.machine_thinking = True
+
+    def check_machine_move(self):
+        """ Play the machine's move once its search finished, then ponder on the human's turn
+        """
+        if not self.machine_thinking:
+            return
+        machine_mv = self.ponderer.get_move()
+        if machine_mv == None:
+            return
+        self.machine_thinking = False
+        mcts = self.ponderer.mcts
+        win_prob = mcts.root_value if mcts.root_value is not None else mcts.root_node.action_value
+        print(machine_mv, win_prob, mcts.get_principal_variation())
+        self.ponderer.play_move(machine_mv)
         if machine_mv == (-1, -1): # Machine passes
             if self.passed_once == True:
                 print("Game Over!")
@@ -69,12 +97,18 @@ class Go:
             self.passed_once = False
             _, self.go_board = self.utils.make_move(board=self.go_board, move=machine_mv)
             print("Machine thinks the winning probability is:", win_prob)
+        self.lastPosition = self.go_board.get_last_position()
+        self.print_winner()
+        if not self.game_over:
+            self.ponderer.ponder()
 
     def on_event(self, event):
         if event.type == pygame.QUIT:
             self._running = False
 
         pos = pygame.mouse.get_pos()
+        if self.machine_thinking:
+            return
         if self._playing and event.type == pygame.MOUSEBUTTONDOWN and self.mouse_in_pass_button(pos):
             self.pass_button_clicked = True
 
@@ -84,22 +118,19 @@ class Go:
                     self.start()
                     # Machine plays first move
                     self.machine_responds()
-                    self.lastPosition = self.go_board.get_last_position()
-                    self.print_winner()
                 else:
                     self.surrender()
                     self.go_board.flip_player()
             elif self.mouse_in_pass_button(pos) and self._playing:
                 self.pass_button_clicked = False
                 _, self.go_board = self.utils.make_move(board=self.go_board, move=PASS)
+                self.human_moves(PASS)
                 if not self.passed_once:
                     self.passed_once = True
                     self.on_render()
 
                     # Machine plays
                     self.machine_responds()
-                    self.lastPosition = self.go_board.get_last_position()
-                    self.print_winner()
                     
                 else:
                     # Double Pass Game Over
@@ -115,6 +146,7 @@ class Go:
                 if 0 <= r < BOARD_DIM and 0 <= c < BOARD_DIM:
                     is_valid, self.go_board = self.utils.make_move(board=self.go_board, move=(r, c))
                     if is_valid:
+                        self.human_moves((r, c))
                         self.passed_once = False
                         self.print_winner()
                         self.lastPosition = self.go_board.get_last_position()
@@ -122,8 +154,6 @@ class Go:
 
                         # Machine plays
                         self.machine_responds()
-                        self.print_winner()
-                        self.lastPosition = self.go_board.get_last_position()
                     else:
                         print("Invalid move!")
     
@@ -136,6 +166,8 @@ class Go:
         pygame.display.update()
 
     def on_cleanup(self):
+        if self.ponderer != None:
+            self.ponderer.stop()
         pygame.quit()
 
 
@@ -144,16 +176,23 @@ class Go:
             self.go_board_init()
             for event in pygame.event.get():
                 self.on_event(event)
+            self.check_machine_move()
             self.on_render()
         self.on_cleanup()
 
     def start(self):
+        if self.ponderer != None:
+            self.ponderer.stop()
+            self.ponderer = None
+        self.machine_thinking = False
         self._playing = True
         self.lastPosition = [-1,-1]
         self.go_board = GoBoard(board_dimension=BOARD_DIM, player=PLAYER_BLACK)
         self._win = False
 
     def surrender(self):
+        if self.ponderer != None:
+            self.ponderer.stop()
         self._playing = False
         self._win = True
 
@@ -287,6 +326,9 @@ class Go:
     def retrieve_winner(self):
         return self.utils.evaluate_winner(self.go_board.board_grid)
 
-if __name__ == "__main__" :
+def main():
     go = Go()
-    go.on_execute()
\ No newline at end of file
+    go.on_execute()
+
+if __name__ == "__main__" :
+    main()
\ No newline at end of file
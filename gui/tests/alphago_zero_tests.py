@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from game.go_board import GoBoard
+from game.go_utils import GoUtils
+from gui.alphago_zero import AlphaGoZero
+from value_policy_net.model_registry import ModelRegistry
+from value_policy_net.numpy_net import NumpyNet
+from value_policy_net.tests.numpy_net_tests import random_weights
+from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
+
+class UniformRegistry(ModelRegistry):
+    """ModelRegistry of UniformPredictionNet instances, checkpoints ending with 'wide' need another architecture
+    """
+    def build_model(self, model_path):
+        nn = UniformPredictionNet(path_to_model = tempfile.gettempdir(), board_dimension = 3)
+        nn.sess = None
+        nn.weights_version = 0
+        nn.closed = False
+        return nn
+
+    def restore_model(self, nn, model_path):
+        if model_path.endswith('wide'):
+            return False
+        nn.weights_version += 1
+        return True
+
+    def close_model(self, nn):
+        nn.closed = True
+
+class AlphaGoZeroTest(unittest.TestCase):
+    def test_analyze(self):
+        alphago0 = AlphaGoZero(model_path='uniform', restored=True, registry=UniformRegistry())
+        utils = GoUtils()
+        board = GoBoard(board_dimension=3, player=1)
+
+        for symmetry_pruning in [None, 'all']:
+            analysis = alphago0.analyze(board, budget=100, symmetry_pruning=symmetry_pruning)
+            self.assertAlmostEqual(sum(analysis.visits), 1)
+            #The variation starts with the played move and continues below it
+            self.assertEqual(analysis.principal_variation[0], analysis.move)
+            self.assertTrue(len(analysis.principal_variation) > 1)
+            next_board = board
+            for move in analysis.principal_variation:
+                valid_move, next_board = utils.make_move(next_board, move)
+                self.assertTrue(valid_move)
+
+        #Without search, the move is the most likely move of the raw nn
+        analysis = alphago0.analyze(GoBoard(board_dimension=3, player=1), budget=1)
+        self.assertEqual(analysis.principal_variation, [analysis.move])
+        self.assertTrue(np.all(analysis.visits == 0))
+
+    def test_registry_models_are_asked_for_again(self):
+        registry = UniformRegistry(idle_seconds=None)
+        alphago0 = AlphaGoZero(model_path='uniform', restored=True, registry=registry)
+        board = GoBoard(board_dimension=3, player=1)
+        nn = alphago0.nn
+
+        #A model the registry closed is loaded again on the next use
+        registry.unload('uniform')
+        alphago0.analyze(board, budget=10)
+        self.assertTrue(nn.closed)
+        self.assertFalse(alphago0.nn.closed)
+        self.assertTrue(alphago0.evaluator.nn is alphago0.nn)
+
+        #So is a model rebuilt for another architecture
+        nn = alphago0.nn
+        registry.reload('uniform', 'uniform_wide')
+        alphago0.analyze(board, budget=10)
+        self.assertTrue(nn.closed)
+        self.assertFalse(alphago0.nn is nn or alphago0.nn.closed)
+
+    def test_exported_weights(self):
+        weights_path = os.path.join(tempfile.mkdtemp(), 'batch_10.npz')
+        np.savez(weights_path, **random_weights(board_dimension = 5))
+        alphago0 = AlphaGoZero(model_path=weights_path, restored=True)
+        self.assertTrue(isinstance(alphago0.nn, NumpyNet))
+
+        board = GoBoard(board_dimension=5, player=1)
+        valid_move, _ = GoUtils().make_move(board, alphago0.play_with_mcts(board, simulation_number=20))
+        self.assertTrue(valid_move)
+        self.assertRaises(ValueError, alphago0.train_nn, training_game_number=1, simulation_number=10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,9 @@ class Edge():
             N: the number of times the move has been visited
             P: probability assigned by the nn to make this move
             move: a tuple of (player, row, col) indicating what the move is, row = col = -1 if pass
+        Fields:
+            self.equivalent_moves: moves leading to boards symmetric to the one of move, including move itself.
+                They share this edge when the search prunes symmetric moves
         """
         self.from_node = from_node
         self.to_node = to_node
@@ -17,6 +20,7 @@ class Edge():
         self.N = N
         self.P = P
         self.move = move
+        self.equivalent_moves = [move]
 
     def __str__(self):
         return "NEW EDGE: W (sum of values of all explored children nodes): " + str(self.W) + " \n  " \
@@ -0,0 +1,172 @@
+import numpy as np
+
+from math import ceil, log2
+
+from self_play.mcts import MCTS
+
+class GumbelMCTS(MCTS):
+    """MCTS whose root search samples a Gumbel top-k set of moves and allocates simluations
+    among them by sequential halving. The policy target is built from completed Q values,
+    which stays policy improving with a small number of simluations (16 - 64).
+    Original paper: https://openreview.net/forum?id=bERaNdoegnO
+    """
+    def __init__(self, board, nn, utils, simluation_number, random_seed = None,
+                 max_considered_moves = 16, c_visit = 50, c_scale = 0.1, use_solver = True, profile = False,
+                 max_nodes = None, symmetry_pruning = None):
+        """Initialize the Gumbel MCTS instance
+        Args:
+            max_considered_moves: number of root moves sampled with Gumbel top-k
+            c_visit: visit count offset used when scaling Q values into logits
+            c_scale: scale applied to Q values when they are added to the prior logits
+        """
+        super(GumbelMCTS, self).__init__(board, nn, utils, simluation_number, random_seed, use_solver, profile,
+            max_nodes, symmetry_pruning)
+        self.max_considered_moves = max_considered_moves
+        self.c_visit = c_visit
+        self.c_scale = c_scale
+
+    def sigma(self, q_values):
+        """Monotonic transformation of Q values into the scale of the prior logits.
+        Q values are rescaled to [0, 1] by the smallest and largest Q among the visited root edges.
+        Args:
+            q_values: array of Q values from the root player's perspective
+        Returns:
+            the transformed Q values
+        """
+        visited_q = [edge.Q for edge in self.root_node.edges if edge.N > 0]
+        min_q = min(visited_q + [-1e-6])
+        max_q = max(visited_q + [1e-6])
+        max_N = max([edge.N for edge in self.root_node.edges])
+        normalized_q = (np.asarray(q_values, dtype=float) - min_q) / (max_q - min_q)
+        return (self.c_visit + max_N) * self.c_scale * np.clip(normalized_q, 0, 1)
+
+    def completed_q_values(self, root_value):
+        """Q values of the root edges, where unvisited edges are completed with a mixed value
+        estimate of the raw network value and the prior weighted Q of the visited edges
+        Args:
+            root_value: value the network assigned to the root board
+        Returns:
+            array of completed Q values, one per root edge
+        """
+        root_edges = self.root_node.edges
+        visits = np.array([edge.N for edge in root_edges], dtype=float)
+        q_values = np.array([edge.Q for edge in root_edges], dtype=float)
+        priors = np.array([edge.P for edge in root_edges], dtype=float)
+
+        visited = visits > 0
+        sum_N = visits.sum()
+        if sum_N > 0 and priors[visited].sum() > 0:
+            weighted_q = (priors[visited] * q_values[visited]).sum() / priors[visited].sum()
+            mixed_value = (root_value + sum_N * weighted_q) / (1 + sum_N)
+        else:
+            mixed_value = root_value
+        return np.where(visited, q_values, mixed_value)
+
+    def improved_policy(self, logits, root_value):
+        """Policy target softmax(logits + sigma(completed Q)) over the root edges
+        Args:
+            logits: log prior of each root edge
+            root_value: value the network assigned to the root board
+        Returns:
+            a size dimension x dimension + 1 array indicating the possibility of each move
+        """
+        scores = logits + self.sigma(self.completed_q_values(root_value))
+        scores = np.exp(scores - scores.max())
+        scores = scores / scores.sum()
+
+        policy = np.zeros(self.board_dimension*self.board_dimension+1)
+        for (edge, p) in zip(self.root_node.edges, scores):
+            self.add_edge_to_policy(policy, edge, p)
+        return policy
+
+    def run_gumbel_simulations(self, return_stats=False):
+        """Run simluation_number simluations, using Gumbel top-k sampling and sequential halving at the root.
+        Args:
+            return_stats: True to append self.search_stats to the returned tuple
+        Returns:
+            (new_board, move, policy) or (new_board, move, policy, search_stats) if return_stats is True
+            new_board: board and its configurations after the selected move is placed
+            move: the move selected by sequential halving
+            policy: a size dimension x dimension + 1 array of the improved policy, used as training target
+        """
+        if self.random_seed:
+            np.random.seed(seed=self.random_seed)
+        profile_start = self.start_profile()
+        move, policy = self.search_gumbel_move()
+        self.stop_profile(profile_start)
+
+        valid_move, new_board = self.utils.make_move(self.original_board, move)
+        assert valid_move == True
+
+        if return_stats:
+            return new_board, move, policy, self.search_stats
+        return new_board, move, policy
+
+    def search_gumbel_move(self):
+        """Search the root with sequential halving over the Gumbel top-k moves
+        Returns:
+            (move, policy): the selected move and the improved policy, see run_gumbel_simulations
+        """
+        #The first simluation expands the root node and evaluates it with the nn
+        if self.root_node.is_leaf():
+            self.run_one_simluation()
+        root_value = float(np.squeeze(self.root_value if self.root_value is not None else self.root_node.action_value))
+        root_edges = self.root_node.edges
+
+        if len(root_edges) == 0: #Pass is the default when no move is available
+            move = (-1, -1)
+            policy = np.zeros(self.board_dimension*self.board_dimension+1)
+            policy[self.board_dimension*self.board_dimension] = 1
+            return move, policy
+
+        logits = np.log(np.array([edge.P for edge in root_edges], dtype=float) + 1e-12)
+        gumbel = np.random.gumbel(size=len(root_edges))
+
+        #Gumbel top-k: sample considered moves without replacement
+        considered_number = min(self.max_considered_moves, len(root_edges))
+        considered = list(np.argsort(-(gumbel + logits))[:considered_number])
+
+        #Sequential halving over the considered moves
+        simluations_left = self.get_remaining_simulations()
+        simluation_budget = simluations_left
+        phase_number = max(1, int(ceil(log2(considered_number))))
+        for phase in range(phase_number):
+            if phase == phase_number - 1:
+                visits_per_move = max(1, simluations_left // len(considered))
+            else:
+                visits_per_move = max(1, simluation_budget // (phase_number * len(considered)))
+
+            #Visit the considered moves in turn, the visits of proven moves go to the moves still open
+            phase_simluations = min(simluations_left, visits_per_move * len(considered))
+            while phase_simluations > 0 and not self.root_node.is_proven():
+                open_considered = [i for i in considered if not root_edges[i].to_node.is_proven()]
+                if len(open_considered) == 0:
+                    break
+                for edge_index in open_considered:
+                    if phase_simluations <= 0 or self.root_node.is_proven():
+                        break
+                    self.run_one_simluation(root_edge=root_edges[edge_index])
+                    phase_simluations -= 1
+                    simluations_left -= 1
+
+            if len(considered) > 1:
+                q_values = np.array([root_edges[i].Q for i in considered])
+                scores = gumbel[considered] + logits[considered] + self.sigma(q_values)
+                order = np.argsort(-scores)
+                considered = [considered[i] for i in order[:max(1, int(ceil(len(considered) / 2.0)))]]
+
+        if self.root_node.is_proven():
+            #Play and train on the moves that achieve the proven result
+            proven_edges = self.get_root_edges_to_play()
+            selected_edge = proven_edges[np.random.randint(len(proven_edges))]
+            policy = np.zeros(self.board_dimension*self.board_dimension+1)
+            for edge in proven_edges:
+                self.add_edge_to_policy(policy, edge, 1.0 / len(proven_edges))
+        else:
+            q_values = np.array([root_edges[i].Q for i in considered])
+            scores = gumbel[considered] + logits[considered] + self.sigma(q_values)
+            selected_edge = root_edges[considered[int(np.argmax(scores))]]
+
+            policy = self.improved_policy(logits, root_value)
+        move = selected_edge.equivalent_moves[np.random.randint(len(selected_edge.equivalent_moves))]
+        return move, policy
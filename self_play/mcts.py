@@ -3,33 +3,56 @@ import time
 import numpy as np
 
 from math import sqrt
-from pyprind import prog_bar
 
 from game.game_utils import GameUtils
-from self_play.edge import Edge
-from self_play.node import Node
+from game.symmetry_utils import SymmetryUtils
+from self_play.node_pool import NodePool
+from self_play.search_stats import SearchStats
 
 class MCTS():
     """Perform MCTS with a large number of simluations to determine the next move policy
     for a given board
     """
-    def __init__(self, board, nn, utils, simluation_number, random_seed = None):
+    def __init__(self, board, nn, utils, simluation_number, random_seed = None, use_solver = True, profile = False,
+                 max_nodes = None, symmetry_pruning = None):
         """Initialize the MCTS instance
         Args:
             simluation_number: number of simluations in MCTS before calculating a pi (next move policy)
             utils: GameUtils instance used during MCTS passed from self play
+            use_solver: True to mark finished games as proven wins, losses or draws and propagate the proofs,
+                proven subtrees are not searched again and a proven root stops the simluations
+            profile: True to collect per-phase timings and tree statistics in self.search_stats
+            max_nodes: node budget of the tree, the subtrees with the fewest visits are recycled when it is reached.
+                None for an unbounded tree
+            symmetry_pruning: 'root' to keep one representative of each class of symmetric moves at the root,
+                'all' to do it at every node, None to search all moves separately
         Fields:
             self.simluation_number: number of simluations in MCTS before calculating a pi (next move policy)
             self.root_node: the root node for MCTS simluations
+            self.board_dimension: dimension of the searched board, which sets the size of the policies
             self.nn: instance of neural network model or heuristics used for this iteration of self play
+            self.search_stats: SearchStats instance if profiling is on, None otherwise
+            self.node_pool: NodePool the nodes and edges of the tree come from
+            self.simluations_run: number of simluations the current root has received
+            self.root_value: value the nn assigned to the root board, None before the root is evaluated
         """
         self.simluation_number = simluation_number
         self.nn = nn
         self.utils = utils
         self.original_board = board.copy()
+        #Policies are sized for the searched board, a fully convolutional nn plays several dimensions
+        self.board_dimension = board.board_dimension
 
-        self.root_node = Node(board, parent_edge = None, edges=[], action_value=0, move_p_dist=None)
+        self.node_pool = NodePool(max_nodes)
+        self.root_node = self.node_pool.acquire_node(board, parent_edge = None)
+        self.simluations_run = 0
+        self.root_value = None
         self.random_seed = random_seed
+        self.use_solver = use_solver
+        self.search_stats = SearchStats() if profile else None
+        if symmetry_pruning not in (None, 'root', 'all'):
+            raise ValueError("symmetry_pruning has to be None, 'root' or 'all'")
+        self.symmetry_pruning = symmetry_pruning
 
     def calculate_U_for_edge(self, edge, c_puct):
         """ Calculate U (related to prior probability and explore factor) for an edge using
@@ -57,6 +80,8 @@ class MCTS():
             edge: edge class instance with the largest U+Q, None if no edge exists
         """
         all_edges = current_node.edges
+        if self.use_solver: #Proven subtrees do not need more simluations
+            all_edges = [edge for edge in all_edges if not edge.to_node.is_proven()]
         selected_edge = None
 
         if all_edges:
@@ -74,17 +99,31 @@ class MCTS():
                 #selected_edge = min(edge_to_qu_val, key=edge_to_qu_val.get)
         return selected_edge
 
-    def run_one_simluation(self):
+    def run_one_simluation(self, root_edge=None):
         """Run one simluation within MCTS including select, expand leaf node and backup
+        Args:
+            root_edge: optional edge of the root node the simluation is forced through,
+                used by root searches that allocate simluations themselves. None to select with PUCT
         Returns:
             None, but the tree is expanded after this function and the internal strucutre changes
         """
+        stats = self.search_stats
+        if stats:
+            phase_start = time.perf_counter()
+        self.simluations_run += 1
         current_node = self.root_node
+        depth = 0
 
         #traverse the tree till leaf node
         edge_type_max = True
         selected_edge = True #Initial value != None, will change in loop
+        if root_edge != None:
+            current_node = root_edge.to_node
+            edge_type_max = False
+            depth = 1
         while selected_edge != None:
+            if current_node.is_proven(): #Only reached when root_edge leads to a proven node
+                break
             if edge_type_max:
                 selected_edge = self.select_edge(current_node, "max")
             else:
@@ -92,41 +131,77 @@ class MCTS():
             edge_type_max = not edge_type_max
             if selected_edge != None:
                 current_node = selected_edge.to_node
-        #Now current_node is a leaf node with no outgoing edges
+                depth += 1
+        #Now current_node is a leaf node with no outgoing edges, or a proven node
+        if stats:
+            stats.simluations += 1
+            stats.depths[depth] += 1
+            stats.selection_time += time.perf_counter() - phase_start
 
-        assert current_node.is_leaf()
-   
         #expand and evaluate if the game is not over
         current_board = current_node.board
-        if not self.utils.is_game_finished(current_board):
-            (move_p_dist, v) = self.nn.predict(current_board)
+        if current_node.is_proven():
+            current_node.action_value = current_node.proven
+        elif not self.utils.is_game_finished(current_board):
+            assert current_node.is_leaf()
+
+            if stats:
+                phase_start = time.perf_counter()
+            if current_node.value is None:
+                (move_p_dist, v) = self.nn.predict(current_board)
+                current_node.move_p_dist = move_p_dist
+                current_node.value = v
+                if stats:
+                    stats.evaluations += 1
+            else: #Evaluated before, but not expanded or collapsed since
+                (move_p_dist, v) = (current_node.move_p_dist, current_node.value)
+            if stats:
+                stats.evaluation_time += time.perf_counter() - phase_start
+                phase_start = time.perf_counter()
            
             current_node.action_value = v
-            current_node.move_p_dist = move_p_dist
+            if current_node is self.root_node:
+                self.root_value = v
 
-            for next_move in move_p_dist:
-                p = move_p_dist[next_move]
-                is_move_valid = self.utils.is_valid_move(current_board, next_move)
-             
-                if is_move_valid: #expand the edge is move is valid
+            #expand the edges of the valid moves, if the node budget leaves room for them
+            valid_moves = [next_move for next_move in move_p_dist if self.utils.is_valid_move(current_board, next_move)]
+            if self.symmetry_pruning == 'all' or (self.symmetry_pruning == 'root' and current_node is self.root_node):
+                move_classes = self.group_symmetric_moves(current_board, valid_moves)
+            else:
+                move_classes = [[next_move] for next_move in valid_moves]
+            if self.reserve_nodes(len(move_classes), current_node):
+                for equivalent_moves in move_classes:
+                    next_move = equivalent_moves[0]
                     _, new_board = self.utils.make_move(current_board, next_move)
 
-                    new_edge = Edge(from_node=current_node, to_node=None, W=0, Q=0, N=0, P=p, move=next_move)
+                    #The representative move carries the prior of all its equivalent moves
+                    p = sum([move_p_dist[move] for move in equivalent_moves])
+                    new_edge = self.node_pool.acquire_edge(current_node, p, next_move)
+                    new_edge.equivalent_moves = equivalent_moves
                     current_node.edges.append(new_edge)
-                    next_node = Node(new_board, new_edge, edges=[], action_value=0, move_p_dist=None)
-                    new_edge.to_node = next_node
+                    new_edge.to_node = self.node_pool.acquire_node(new_board, new_edge)
+            if stats:
+                stats.node_count += len(current_node.edges)
+                stats.expansion_time += time.perf_counter() - phase_start
         else: #Current board is an end game state
             if self.root_node.board.player == 1:
                 current_node.action_value, _ = self.utils.evaluate_winner(current_board.board_grid)
             else:
                 current_node.action_value, _ = self.utils.evaluate_winner(current_board.board_grid)
                 current_node.action_value = - current_node.action_value
+            if self.use_solver:
+                current_node.proven = current_node.action_value
 
         #backup from leaf node that was just expanded (current_node) to root
+        if stats:
+            phase_start = time.perf_counter()
         while current_node.parent_edge != None: #Continue when it is not root node
             current_node.parent_edge.N = current_node.parent_edge.N + 1
             current_node.parent_edge.W = current_node.parent_edge.W + current_node.action_value
             current_node.parent_edge.Q = current_node.parent_edge.W * 1.0 / current_node.parent_edge.N
+            if current_node.is_proven(): #A proven result replaces the averaged value of the edge
+                current_node.parent_edge.Q = current_node.proven
+                current_node.parent_edge.W = current_node.proven * current_node.parent_edge.N
             current_node.action_value = current_node.parent_edge.Q
             current_node = current_node.parent_edge.from_node
 
@@ -137,7 +212,310 @@ class MCTS():
                 child_node_counter += 1
             current_node.action_value /= child_node_counter
 
-    def run_all_simulations(self, temp1, temp2, step_boundary):
+            if self.use_solver:
+                self.update_proof(current_node)
+                if current_node.is_proven():
+                    current_node.action_value = current_node.proven
+        if stats:
+            stats.backup_time += time.perf_counter() - phase_start
+
+    def group_symmetric_moves(self, board, moves):
+        """Group moves that lead to symmetric boards, using the symmetries that leave the board unchanged
+        Args:
+            board: the board the moves are played on
+            moves: list of valid (r, c) moves
+        Returns:
+            list of move classes, each a list of equivalent moves starting with its representative
+        """
+        symmetries = SymmetryUtils.find_symmetries(board.board_grid)
+        if len(symmetries) == 1:
+            return [[move] for move in moves]
+
+        move_classes = {}
+        for move in moves:
+            canonical_move = min([SymmetryUtils.transform_move(move, symmetry, board.board_dimension) for symmetry in symmetries])
+            move_classes.setdefault(canonical_move, []).append(move)
+        #Keep the order of the moves
+        return sorted(move_classes.values(), key=lambda equivalent_moves: moves.index(equivalent_moves[0]))
+
+    def reserve_nodes(self, node_number, leaf_node):
+        """Make room for node_number new nodes below leaf_node. When the node budget is reached,
+        the expanded nodes with the fewest visits are collapsed back into leaves and their subtrees recycled.
+        The nodes on the path from the root to leaf_node are never collapsed.
+        Args:
+            node_number: number of nodes about to be added
+            leaf_node: the leaf that is about to be expanded
+        Returns:
+            True if there is room for the new nodes
+        """
+        available_nodes = self.node_pool.available_nodes()
+        if available_nodes == None or available_nodes >= node_number:
+            return True
+
+        protected_nodes = set()
+        node = leaf_node
+        while node != None:
+            protected_nodes.add(id(node))
+            node = node.parent_edge.from_node if node.parent_edge != None else None
+
+        candidates = []
+        stack = [self.root_node]
+        while stack:
+            node = stack.pop()
+            for edge in node.edges:
+                if not edge.to_node.is_leaf():
+                    stack.append(edge.to_node)
+                    if id(edge.to_node) not in protected_nodes:
+                        candidates.append(edge.to_node)
+        candidates.sort(key=lambda node: node.parent_edge.N)
+
+        #Free some slack so the tree is not pruned on every expansion
+        target_nodes = node_number + self.node_pool.max_nodes // 10
+        for node in candidates:
+            if self.node_pool.available_nodes() >= target_nodes:
+                break
+            if node.board != None: #Not released with an ancestor already
+                self.node_pool.release_children(node)
+        return self.node_pool.available_nodes() >= node_number
+
+    def advance_root(self, move):
+        """Move the root to the board after move is played, keeping the subtree below it
+        and releasing the rest of the tree back to the node pool
+        Args:
+            move: (r, c) tuple of the move played on the root board. With symmetry pruning, the subtree of
+                its representative move is reused with the symmetry mapping one move to the other applied
+        Returns:
+            True if an existing subtree became the new root, False if a new root was created
+        Notes:
+            simluations_run restarts from the visits of the new root, so a search on it only tops up to the budget
+        """
+        old_root = self.root_node
+        old_root_player = old_root.board.player
+        new_root = None
+        self.simluations_run = 0
+        self.root_value = None
+        for edge in old_root.edges:
+            if move in edge.equivalent_moves:
+                new_root = edge.to_node
+                edge.to_node = None #Detach the subtree so it is not released
+                self.simluations_run = edge.N
+                #An equivalent move leads to a board symmetric to the one of the representative move
+                if move != edge.move:
+                    symmetry = self.find_move_symmetry(edge, move)
+                    self.transform_subtree(new_root, symmetry, len(old_root.board.game_history or []))
+
+        if new_root != None:
+            self.node_pool.release_subtree(old_root)
+            new_root.parent_edge = None
+            #Values are stored from the root player's perspective
+            if new_root.board.player != old_root_player:
+                self.flip_perspective(new_root)
+        else:
+            valid_move, new_board = self.utils.make_move(old_root.board, move)
+            assert valid_move == True
+            self.node_pool.release_subtree(old_root)
+            new_root = self.node_pool.acquire_node(new_board, parent_edge = None)
+
+        self.root_node = new_root
+        self.original_board = new_root.board.copy()
+        return new_root.edges != []
+
+    def find_move_symmetry(self, edge, move):
+        """Symmetry of the board of an edge's from_node that maps the edge's representative move to move
+        Args:
+            edge: an edge
+            move: one of the equivalent moves of edge
+        Returns:
+            the symmetry, 0 when move is the representative
+        """
+        for symmetry in SymmetryUtils.find_symmetries(edge.from_node.board.board_grid):
+            if SymmetryUtils.transform_move(edge.move, symmetry, self.board_dimension) == move:
+                return symmetry
+        raise ValueError(str(move) + " is not equivalent to " + str(edge.move))
+
+    def transform_subtree(self, node, symmetry, history_length):
+        """Apply a symmetry to the boards, priors and moves of the subtree below node
+        Args:
+            node: root of the subtree
+            symmetry: symmetry leaving the board above the subtree unchanged
+            history_length: number of moves in the game history of the board above the subtree,
+                the moves played before it are kept as they are
+        """
+        transform = lambda move: SymmetryUtils.transform_move(move, symmetry, self.board_dimension)
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            board = node.board
+            board_grid = SymmetryUtils.transform_grid(board.board_grid, symmetry)
+            board.board_grid = board_grid.tolist() if isinstance(board.board_grid, list) else np.array(board_grid)
+            if board.game_history != None:
+                board.game_history = board.game_history[:history_length] + [(player,) + transform((r, c))
+                    for (player, r, c) in board.game_history[history_length:]]
+            if node.move_p_dist != None:
+                node.move_p_dist = {transform(move): p for (move, p) in node.move_p_dist.items()}
+            for edge in node.edges:
+                edge.move = transform(edge.move)
+                edge.equivalent_moves = [transform(move) for move in edge.equivalent_moves]
+                stack.append(edge.to_node)
+
+    def flip_perspective(self, node):
+        """Negate the values stored in the subtree below node, used when the root player changes
+        Args:
+            node: root of the subtree
+        """
+        stack = [node]
+        while stack:
+            current_node = stack.pop()
+            current_node.action_value = - current_node.action_value
+            if current_node.is_proven():
+                current_node.proven = - current_node.proven
+            for edge in current_node.edges:
+                edge.W = - edge.W
+                edge.Q = - edge.Q
+                stack.append(edge.to_node)
+
+    def get_memory_stats(self):
+        """Report the memory held by the tree
+        Returns:
+            a dictionary with the nodes in use, the peak number of nodes and the estimated peak tree memory in bytes
+        """
+        return self.node_pool.get_memory_stats()
+
+    def update_proof(self, node):
+        """Mark an expanded node as proven once its children decide its result.
+        The root player picks the largest result and the opponent the smallest, so a node is proven
+        when one child has the best possible result for the player to move, or when all children are proven.
+        Args:
+            node: the node whose children may have been proven during the last simluation
+        """
+        if node.is_proven() or node.is_leaf():
+            return
+
+        children_results = [edge.to_node.proven for edge in node.edges]
+        if node.board.player == self.root_node.board.player:
+            best_result, pick_best = 1, max
+        else:
+            best_result, pick_best = -1, min
+
+        if best_result in children_results:
+            node.proven = best_result
+        elif None not in children_results:
+            node.proven = pick_best(children_results)
+
+    def get_proven_result(self):
+        """Result of the root board proven by the search
+        Returns:
+            None if the root is not solved, otherwise 1 if the root player wins, -1 if it loses and 0 for a draw
+        """
+        return self.root_node.proven
+
+    def get_root_edges_to_play(self):
+        """Root edges the final move is picked from
+        Returns:
+            all root edges, or only the edges achieving the proven result if the root is solved
+        """
+        if self.root_node.is_proven():
+            return [edge for edge in self.root_node.edges if edge.to_node.proven == self.root_node.proven]
+        return self.root_node.edges
+
+    def add_edge_to_policy(self, policy, edge, probability):
+        """Write the probability of an edge into a policy array, spread evenly over its equivalent moves
+        Args:
+            policy: a size dimension x dimension + 1 policy array
+            edge: a root edge
+            probability: the probability of the edge
+        """
+        for move in edge.equivalent_moves:
+            policy[self.move_to_policy_index(move)] = probability * 1.0 / len(edge.equivalent_moves)
+
+    def move_to_policy_index(self, move):
+        """Index of a move in a size dimension x dimension + 1 policy array, pass is the last entry
+        Args:
+            move: (r, c) tuple, (-1, -1) for pass
+        Returns:
+            the index of the move in the policy array
+        """
+        (r, c) = move
+        if r == -1 and c == -1:
+            return self.board_dimension*self.board_dimension
+        return r*self.board_dimension+c
+
+    def get_visit_distribution(self):
+        """Share of the root visits each move received so far
+        Returns:
+            a size dimension x dimension + 1 array, all zeros if the root has not been visited
+        """
+        visits = np.zeros(self.board_dimension*self.board_dimension+1)
+        sum_N = sum([edge.N for edge in self.root_node.edges])
+        if sum_N > 0:
+            for edge in self.root_node.edges:
+                self.add_edge_to_policy(visits, edge, edge.N * 1.0 / sum_N)
+        return visits
+
+    def get_principal_variation(self, first_move=None):
+        """Sequence of moves obtained by following the most visited edge from the root
+        Args:
+            first_move: optional root move the variation starts with, for example the move played when
+                several root moves have the same visits. None to start with the most visited root move
+        Returns:
+            list of (r, c) moves, the first one is first_move or the most visited root move
+        """
+        principal_variation = []
+        current_node = self.root_node
+        symmetry = 0
+        if first_move != None:
+            principal_variation.append(first_move)
+            root_edges = [edge for edge in self.root_node.edges if first_move in edge.equivalent_moves]
+            if len(root_edges) == 0:
+                return principal_variation
+            #The subtree of an equivalent move is searched on the board of its representative
+            symmetry = self.find_move_symmetry(root_edges[0], first_move)
+            current_node = root_edges[0].to_node
+        while current_node != None and not current_node.is_leaf():
+            edge = max(current_node.edges, key=lambda e: e.N)
+            if edge.N == 0:
+                break
+            principal_variation.append(SymmetryUtils.transform_move(edge.move, symmetry, self.board_dimension))
+            current_node = edge.to_node
+        return principal_variation
+
+    def get_remaining_simulations(self):
+        """Number of simluations still needed for the root to reach simluation_number
+        """
+        return max(0, self.simluation_number - self.simluations_run)
+
+    def run_simulations(self, simluation_number):
+        """Run simluations one by one, stopping early once the root is proven
+        Args:
+            simluation_number: maximum number of simluations to run
+        """
+        profile_start = self.start_profile()
+        for i in range(simluation_number):
+            if self.root_node.is_proven():
+                break
+            self.run_one_simluation()
+        self.stop_profile(profile_start)
+
+    def start_profile(self):
+        """Start timing a search when profiling is on
+        Returns:
+            the start time and the hits and misses of the evaluation cache in front of the nn, None without profiling
+        """
+        if not self.search_stats:
+            return None
+        return (time.perf_counter(), getattr(self.nn, 'hits', 0), getattr(self.nn, 'misses', 0))
+
+    def stop_profile(self, profile_start):
+        """Add the time and the evaluation cache hits and misses since start_profile to the search stats
+        """
+        if profile_start == None:
+            return
+        (start_time, cache_hits, cache_misses) = profile_start
+        self.search_stats.total_time += time.perf_counter() - start_time
+        self.search_stats.cache_hits += getattr(self.nn, 'hits', 0) - cache_hits
+        self.search_stats.cache_misses += getattr(self.nn, 'misses', 0) - cache_misses
+
+    def run_all_simulations(self, temp1, temp2, step_boundary, return_stats=False):
         """Run the specified number of simluations according to simluation_number
         when initializing the object. Returns a policy pi for board's next move
         according to these simluations
@@ -145,22 +523,22 @@ class MCTS():
             temp1: exploration temparature before the step_boundary
             temp2: exploration temparatre used after step_boundary
             step_boundary: the number of moves where temperature changes (that divided explore more and explore less)
+            return_stats: True to append self.search_stats to the returned tuple
         Returns: 
-            (new_board, move)
+            (new_board, move, policy) or (new_board, move, policy, search_stats) if return_stats is True
             move: the best move generated according to the MCTS simulations
             new_board: board and its configurations after the best move is placed
             policy: a size dimension x dimension + 1 array indicating the possibility of each move
         """
-        for i in range(self.simluation_number):
-            self.run_one_simluation()
+        self.run_simulations(self.get_remaining_simulations())
 
         if self.random_seed:
             np.random.seed(seed=self.random_seed)
 
         #Pick the most explored move for root node with randomization
-        root_edges = self.root_node.edges
-    
-        policy = np.zeros(self.nn.board_dimension*self.nn.board_dimension+1)
+        root_edges = self.get_root_edges_to_play()
+
+        policy = np.zeros(self.board_dimension*self.board_dimension+1)
 
         #If in the second part of the game
         if len(self.root_node.board.game_history) > step_boundary:
@@ -170,30 +548,18 @@ class MCTS():
                     largest_N = max([e.N for e in root_edges])
                     sample_edges = [e for e in root_edges if abs(e.N - largest_N) < 1e-3]
                     edge_with_largest_N = random.choice(sample_edges)
-                    (r, c) = edge_with_largest_N.move
-                    if r == -1 and c == -1:
-                        policy[self.nn.board_dimension*self.nn.board_dimension] = 1
-                    else:
-                        policy[r*self.nn.board_dimension+c] = 1
+                    self.add_edge_to_policy(policy, edge_with_largest_N, 1)
                 else:
-                    policy[self.nn.board_dimension*self.nn.board_dimension] = 1
+                    policy[self.board_dimension*self.board_dimension] = 1
             else:
                 sum_N = sum([edge.N**(1/temp2) for edge in root_edges])
                 for edge in root_edges:
-                    (r, c) = edge.move
-                    if (r == -1) and (c == -1):
-                        policy[self.nn.board_dimension*self.nn.board_dimension] = (edge.N**(1/temp2) * 1.0 / sum_N)
-                    else:
-                        policy[r*self.nn.board_dimension+c] = (edge.N**(1/temp2) * 1.0 / sum_N)
+                    self.add_edge_to_policy(policy, edge, edge.N**(1/temp2) * 1.0 / sum_N)
         #First part of the game
         else:
             sum_N = sum([edge.N**(1/temp1) for edge in root_edges])
             for edge in root_edges:
-                (r, c) = edge.move
-                if (r == -1) and (c == -1): #Pass      
-                    policy[self.nn.board_dimension*self.nn.board_dimension] = (edge.N**(1/temp1) * 1.0 / sum_N)
-                else:   
-                    policy[r*self.nn.board_dimension+c] = (edge.N**(1/temp1) * 1.0 / sum_N) # t = 1, relatively high exploration
+                self.add_edge_to_policy(policy, edge, edge.N**(1/temp1) * 1.0 / sum_N) # t = 1, relatively high exploration
 
         #Additional exploration is achieved by adding Dirichlet noise to the prior probabilities 
         policy_with_noise = 0.75 * policy
@@ -207,14 +573,14 @@ class MCTS():
             #Make probbilities add up to zero
             sum_prob = sum(policy_with_noise)
             policy_with_noise = [p / sum_prob for p in policy_with_noise]
-            move_indices = [i for i in range(self.nn.board_dimension**2+1)]
+            move_indices = [i for i in range(self.board_dimension**2+1)]
             move_index = np.random.choice(move_indices, 1, p = policy_with_noise)[0]
 
-            if move_index == self.nn.board_dimension**2:
+            if move_index == self.board_dimension**2:
                 move = (-1, -1)
             else:
-                r = int(move_index / self.nn.board_dimension)
-                c = move_index % self.nn.board_dimension
+                r = int(move_index / self.board_dimension)
+                c = move_index % self.board_dimension
                 move = (r, c)
         else: #Pass is the default when no move is available
             move = (-1, -1)
@@ -222,29 +588,35 @@ class MCTS():
         valid_move, new_board = self.utils.make_move(self.original_board, move)  
         assert valid_move == True
 
+        if return_stats:
+            return new_board, move, policy_with_noise, self.search_stats
         return new_board, move, policy_with_noise
 
-    def run_simulations_without_noise(self):
+    def run_simulations_without_noise(self, return_stats=False):
         """Run the specified number of simluations according to simluation_number
         when initializing the object. This is used in inference so there is no noise.
+        Args:
+            return_stats: True to return (move, self.search_stats) instead of move
         Returns: 
             move: the best move generated according to the MCTS simulations
         """
-        for i in range(self.simluation_number):
-            self.run_one_simluation()
+        self.run_simulations(self.get_remaining_simulations())
 
         if self.random_seed:
             np.random.seed(seed=self.random_seed)
 
         #Pick the most explored move for root node with randomization
-        root_edges = self.root_node.edges
+        root_edges = self.get_root_edges_to_play()
 
         #Return the edge with the largest N in root_edges
         if len(root_edges) > 0:
             largest_N = max([e.N for e in root_edges])
             sample_edges = [e for e in root_edges if abs(e.N - largest_N) < 1e-3]
-            edge_with_largest_N = random.choice(sample_edges)
-            return edge_with_largest_N.move
+            move = random.choice(random.choice(sample_edges).equivalent_moves)
         else:
-            return (-1, -1)
+            move = (-1, -1)
+
+        if return_stats:
+            return move, self.search_stats
+        return move
         
@@ -6,12 +6,19 @@ class Node():
             board: the game board the node represents
             parent_edge: the edge that links to its parent node
             edges: the edges that link to its children nodes
+        Fields:
+            self.proven: None if the result of the node is unknown, otherwise the proven result from
+                the MCTS root player's perspective, 1 win, -1 loss and 0 draw
+            self.value: value the nn assigned to the board, None before the node is evaluated.
+                A leaf keeps its evaluation when its expansion has to wait for room in the node budget
         """
         self.board = board
         self.parent_edge = parent_edge
         self.edges = edges
         self.action_value = action_value
         self.move_p_dist = move_p_dist
+        self.proven = None
+        self.value = None
 
     def get_edge_info(self):
         return str([str(edge) for edge in self.edges])
@@ -19,6 +26,9 @@ class Node():
     def is_leaf(self):
         return self.edges == []
 
+    def is_proven(self):
+        return self.proven != None
+
     def __str__(self):
         return "On Node \n Number of outgoing edges: " \
             + str(len(self.edges)) + "\n  action_value:" + str(self.action_value) \
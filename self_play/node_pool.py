@@ -0,0 +1,154 @@
+import sys
+
+from self_play.edge import Edge
+from self_play.node import Node
+
+class NodePool():
+    """Preallocated Node and Edge objects for a memory bounded MCTS tree.
+    Released subtrees go back to the pool and are reused by later expansions,
+    so the tree never holds more than max_nodes nodes.
+    """
+    def __init__(self, max_nodes=None):
+        """Initialize the pool
+        Args:
+            max_nodes: node budget of the tree, None for an unbounded tree where nodes are allocated on demand
+        Fields:
+            self.used_nodes: number of nodes currently in the tree
+            self.peak_nodes: largest number of nodes the tree held at once
+            self.recycled_nodes: number of nodes released back to the pool
+        """
+        self.max_nodes = max_nodes
+        self.free_nodes = []
+        self.free_edges = []
+        if max_nodes:
+            self.free_nodes = [Node(None, None, edges=[], action_value=0, move_p_dist=None) for i in range(max_nodes)]
+            self.free_edges = [Edge(None, None, W=0, Q=0, N=0, P=0, move=None) for i in range(max_nodes)]
+        self.used_nodes = 0
+        self.peak_nodes = 0
+        self.recycled_nodes = 0
+        self.node_bytes = None
+
+    def available_nodes(self):
+        """Number of nodes that can still be added to the tree, None if the tree is unbounded
+        """
+        if not self.max_nodes:
+            return None
+        return self.max_nodes - self.used_nodes
+
+    def acquire_node(self, board, parent_edge):
+        """Take a node from the pool, or allocate one if the pool is empty
+        Args:
+            board: the game board the node represents
+            parent_edge: the edge that links to its parent node, None for the root
+        Returns:
+            a fresh leaf node
+        """
+        if self.free_nodes:
+            node = self.free_nodes.pop()
+            node.board = board
+            node.parent_edge = parent_edge
+            node.edges = []
+            node.action_value = 0
+            node.move_p_dist = None
+            node.proven = None
+            node.value = None
+        else:
+            node = Node(board, parent_edge, edges=[], action_value=0, move_p_dist=None)
+
+        if self.node_bytes == None:
+            self.node_bytes = NodePool.estimate_node_bytes(node)
+        self.used_nodes += 1
+        self.peak_nodes = max(self.peak_nodes, self.used_nodes)
+        return node
+
+    def acquire_edge(self, from_node, P, move):
+        """Take an edge from the pool, or allocate one if the pool is empty
+        Args:
+            from_node: parent node of the edge
+            P: prior probability of the move
+            move: (r, c) tuple of the move
+        Returns:
+            an unvisited edge with no child node yet
+        """
+        if self.free_edges:
+            edge = self.free_edges.pop()
+            edge.from_node = from_node
+            edge.to_node = None
+            edge.W = 0
+            edge.Q = 0
+            edge.N = 0
+            edge.P = P
+            edge.move = move
+            edge.equivalent_moves = [move]
+            return edge
+        return Edge(from_node=from_node, to_node=None, W=0, Q=0, N=0, P=P, move=move)
+
+    def release_children(self, node):
+        """Release every subtree below node back to the pool, node becomes a leaf again.
+        The statistics on the edge leading to node are kept.
+        Args:
+            node: the node whose children are released
+        """
+        stack = [edge for edge in node.edges]
+        node.edges = []
+        while stack:
+            edge = stack.pop()
+            child = edge.to_node
+            if child != None:
+                stack.extend(child.edges)
+                self.release_node(child)
+            edge.from_node = None
+            edge.to_node = None
+            self.free_edges.append(edge)
+
+    def release_subtree(self, node):
+        """Release node and every subtree below it back to the pool
+        Args:
+            node: root of the subtree to release
+        """
+        self.release_children(node)
+        self.release_node(node)
+
+    def release_node(self, node):
+        node.board = None
+        node.parent_edge = None
+        node.edges = []
+        node.move_p_dist = None
+        self.free_nodes.append(node)
+        self.used_nodes -= 1
+        self.recycled_nodes += 1
+
+    def get_memory_stats(self):
+        """Report the tree memory
+        Returns:
+            a dictionary with the nodes in use, the peak number of nodes, the estimated bytes per node
+            (node, edge and board copy) and the estimated peak tree memory in bytes
+        """
+        node_bytes = self.node_bytes or 0
+        return {
+            'max_nodes': self.max_nodes,
+            'used_nodes': self.used_nodes,
+            'peak_nodes': self.peak_nodes,
+            'recycled_nodes': self.recycled_nodes,
+            'node_bytes': node_bytes,
+            'peak_bytes': self.peak_nodes * node_bytes
+        }
+
+    @staticmethod
+    def estimate_node_bytes(node):
+        """Estimate the memory held by one node: the node, its incoming edge and its board copy
+        Args:
+            node: a node with a board
+        Returns:
+            estimated size in bytes
+        """
+        size = sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.edges)
+        edge = Edge(None, None, W=0, Q=0, N=0, P=0, move=None)
+        size += sys.getsizeof(edge) + sys.getsizeof(edge.__dict__)
+        board = node.board
+        if board != None:
+            size += sys.getsizeof(board) + sys.getsizeof(board.__dict__)
+            size += sys.getsizeof(board.board_grid) + sum([sys.getsizeof(row) for row in board.board_grid])
+            if board.game_history != None:
+                size += sys.getsizeof(board.game_history) + sum([sys.getsizeof(move) for move in board.game_history])
+        return size
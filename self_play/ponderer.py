@@ -0,0 +1,98 @@
+import threading
+
+from self_play.mcts import MCTS
+
+class Ponderer():
+    """Keeps one MCTS tree alive over a game and searches it on a background thread.
+    While the opponent thinks, the engine ponders: it keeps searching the current position.
+    When the opponent's move arrives, its subtree is promoted to the root, so the engine's own
+    search only tops up the visits the subtree already has. Only one thread searches the tree at a time.
+    """
+    def __init__(self, board, nn, utils, simluation_number, chunk_size=16, max_ponder_simulations=None, max_nodes=None):
+        """Initialize the ponderer
+        Args:
+            board: the current board of the game
+            nn: the evaluator used by the search
+            utils: the game utils
+            simluation_number: number of simluations the engine searches before it plays a move
+            chunk_size: simluations run between two checks for a stop request
+            max_ponder_simulations: root visits after which pondering pauses, defaults to 10 x simluation_number
+            max_nodes: node budget of the search tree, None for an unbounded tree
+        Fields:
+            self.mcts: the MCTS instance holding the tree
+            self.ponder_simulations: simluations run while pondering since the ponderer was created
+        """
+        self.mcts = MCTS(board, nn, utils, simluation_number, max_nodes = max_nodes)
+        self.simluation_number = simluation_number
+        self.chunk_size = chunk_size
+        self.max_ponder_simulations = max_ponder_simulations or 10 * simluation_number
+        self.ponder_simulations = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.selected_move = None
+
+    def is_searching(self):
+        return self.thread != None and self.thread.is_alive()
+
+    def ponder(self):
+        """Start searching the current root in the background until stop is called
+        """
+        self.stop()
+        self.start_thread(self.ponder_loop)
+
+    def ponder_loop(self):
+        while not self.stop_event.is_set():
+            with self.lock:
+                if self.mcts.simluations_run >= self.max_ponder_simulations or self.mcts.root_node.is_proven():
+                    break
+                simluations_run = self.mcts.simluations_run
+                self.mcts.run_simulations(self.chunk_size)
+                self.ponder_simulations += self.mcts.simluations_run - simluations_run
+
+    def stop(self):
+        """Stop the background search and wait for the current chunk of simluations to finish
+        """
+        if self.thread != None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.stop_event.clear()
+
+    def play_move(self, move):
+        """Play a move of either player on the tree, stopping the background search first
+        Args:
+            move: (r, c) tuple of the move played on the current board
+        Returns:
+            True if the subtree of the move was reused as the new root
+        """
+        self.stop()
+        with self.lock:
+            return self.mcts.advance_root(move)
+
+    def start_search(self):
+        """Start topping up the search of the current root to simluation_number on the background thread.
+        The selected move is available through get_move once the search finishes
+        """
+        self.stop()
+        self.selected_move = None
+        self.start_thread(self.search)
+
+    def search(self):
+        with self.lock:
+            self.mcts.simluation_number = self.simluation_number
+            self.selected_move = self.mcts.run_simulations_without_noise()
+
+    def get_move(self):
+        """Selected move of the last search
+        Returns:
+            the (r, c) move, or None while the search is still running
+        """
+        if self.is_searching():
+            return None
+        return self.selected_move
+
+    def start_thread(self, target):
+        self.thread = threading.Thread(target=target)
+        self.thread.daemon = True
+        self.thread.start()
@@ -0,0 +1,237 @@
+import json
+import os
+import numpy as np
+
+from value_policy_net.board_encoder import BoardEncoder
+
+class ReplayBuffer():
+    """Fixed capacity experience replay memory of self play samples.
+    Samples live in preallocated arrays: int8 grids and players, which BoardEncoder turns into the input planes
+    of a batch, float32 policy and value labels and a float32 sampling weight. Adding overwrites the oldest
+    samples in place and sampling copies only the batch, so the memory use is fixed by the capacity.
+    """
+    def __init__(self, capacity, board_dimension, seed=None):
+        """Allocate an empty buffer
+        Args:
+            capacity: maximum number of samples, the oldest ones are overwritten beyond it
+            board_dimension: dimension of the boards stored
+            seed: seed of the random generator drawing the batches
+        Fields:
+            self.cursor: index the next sample is written to
+            self.size: number of samples stored
+            self.added: number of samples added since the buffer was created
+        """
+        self.capacity = capacity
+        self.board_dimension = board_dimension
+        self.rng = np.random.default_rng(seed)
+        self.encoder = BoardEncoder(board_dimension)
+        self.cursor = 0
+        self.size = 0
+        self.added = 0
+        self.allocate()
+
+    def get_array_specs(self):
+        """Name, shape and type of each sample array
+        """
+        dimension = self.board_dimension
+        return [
+            ('grids', (self.capacity, dimension, dimension), np.int8),
+            ('players', (self.capacity,), np.int8),
+            ('labels_p', (self.capacity, dimension * dimension + 1), np.float32),
+            ('labels_v', (self.capacity, 1), np.float32),
+            ('weights', (self.capacity,), np.float32)
+        ]
+
+    def allocate(self):
+        for (name, shape, dtype) in self.get_array_specs():
+            setattr(self, name, np.zeros(shape, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    def is_full(self):
+        return self.size == self.capacity
+
+    def get_memory_bytes(self):
+        """Bytes held by the sample arrays, fixed by the capacity
+        """
+        return sum([getattr(self, name).nbytes for (name, shape, dtype) in self.get_array_specs()])
+
+    def add(self, grids, players, labels_p, labels_v, weights=None):
+        """Write samples at the cursor, wrapping around and overwriting the oldest samples
+        Args:
+            grids: N x dim x dim array of -1 (white), 0 (empty) and 1 (black)
+            players: array of the N players to move
+            labels_p: N x (dim x dim + 1) policy labels
+            labels_v: N x 1 value labels
+            weights: optional array of N sampling weights, 1 by default
+        """
+        sample_number = len(grids)
+        if weights is None:
+            weights = np.ones(sample_number)
+        #Only the last capacity samples survive a larger batch
+        start = max(0, sample_number - self.capacity)
+        written = sample_number - start
+        indices = (self.cursor + np.arange(written)) % self.capacity
+        self.grids[indices] = np.asarray(grids)[start:]
+        self.players[indices] = np.asarray(players)[start:]
+        self.labels_p[indices] = np.asarray(labels_p)[start:]
+        self.labels_v[indices] = np.asarray(labels_v).reshape(-1, 1)[start:]
+        self.weights[indices] = np.asarray(weights)[start:]
+
+        self.cursor = (self.cursor + written) % self.capacity
+        self.size = min(self.capacity, self.size + sample_number)
+        self.added += sample_number
+
+    def add_boards(self, boards, labels_p, labels_v, weights=None):
+        """Same as add, for a list of boards such as the training data of SelfPlay.play_till_finish
+        """
+        grids = np.array([board.board_grid for board in boards], dtype=np.int8).reshape(
+            len(boards), self.board_dimension, self.board_dimension)
+        players = np.array([board.player for board in boards], dtype=np.int8)
+        self.add(grids, players, labels_p, labels_v, weights)
+
+    def positions_to_indices(self, positions):
+        """Indices into the arrays of samples counted from the oldest one, the size samples before the cursor
+        """
+        return (self.cursor - self.size + np.asarray(positions)) % self.capacity
+
+    def sample_indices(self, batch_size, weighted=False):
+        """Draw the indices of a batch without replacement
+        Args:
+            batch_size: number of samples, at most the number of samples stored
+            weighted: False for uniform sampling, which costs O(batch_size).
+                True to draw samples in proportion to their weights, which costs O(size)
+        Returns:
+            array of batch_size indices into the buffer
+        """
+        if weighted:
+            weights = self.weights[self.positions_to_indices(np.arange(self.size))]
+            positions = self.rng.choice(self.size, batch_size, replace=False, p=weights / weights.sum())
+        else:
+            positions = self.rng.choice(self.size, batch_size, replace=False, shuffle=False)
+        return self.positions_to_indices(positions)
+
+    def get_samples(self, indices):
+        """Samples at indices
+        Returns:
+            (planes, labels_p, labels_v): N x dim x dim x 3 input planes, a view of the encoder buffer that the
+            next call overwrites, and copies of the labels
+        """
+        planes = self.encoder.encode(self.grids[indices], self.players[indices])
+        return planes, self.labels_p[indices], self.labels_v[indices]
+
+    def sample(self, batch_size, weighted=False):
+        """Draw a training batch, see sample_indices and get_samples
+        """
+        return self.get_samples(self.sample_indices(batch_size, weighted))
+
+    def set_weights(self, indices, weights):
+        """Change the sampling weights of samples, for example from their training loss
+        """
+        self.weights[indices] = weights
+
+class PersistentReplayBuffer(ReplayBuffer):
+    """ReplayBuffer whose arrays are memory mapped .npy files in a directory, so its content survives a restart.
+    header.json holds the capacity, the board dimension and the write cursor. It is replaced atomically after the
+    samples of each add are flushed, so after a crash the buffer reopens with every sample the header counts.
+    Once the buffer wraps, the header first stops counting the oldest samples an add overwrites, so a crash
+    in the middle of the add never leaves a counted sample mixing old and new arrays.
+    Other processes can open the directory read only and sample from the same files without copying them.
+    """
+    def __init__(self, directory, capacity, board_dimension, seed=None, read_only=False):
+        """Open the buffer stored in directory, or create it
+        Args:
+            directory: directory of header.json and of the array files
+            capacity, board_dimension, seed: same as ReplayBuffer, they have to match an existing buffer
+            read_only: True to open an existing buffer without writing to it, refresh shows the samples
+                added by the writing process since
+        Raises:
+            ValueError if the stored buffer has another capacity or board dimension, or if a read only buffer does not exist
+        """
+        self.directory = directory
+        self.read_only = read_only
+        self.header_path = os.path.join(directory, 'header.json')
+        header = self.read_header()
+        if header == None and read_only:
+            raise ValueError("No replay buffer in " + directory)
+        if header != None and (header['capacity'] != capacity or header['board_dimension'] != board_dimension):
+            raise ValueError("The replay buffer in {} has capacity {} and board dimension {}".format(
+                directory, header['capacity'], header['board_dimension']))
+        super(PersistentReplayBuffer, self).__init__(capacity, board_dimension, seed)
+        if header != None:
+            self.cursor, self.size, self.added = header['cursor'], header['size'], header['added']
+
+    def allocate(self):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        exists = os.path.exists(self.header_path)
+        for (name, shape, dtype) in self.get_array_specs():
+            path = os.path.join(self.directory, name + '.npy')
+            if exists:
+                array = np.load(path, mmap_mode='r' if self.read_only else 'r+')
+            else:
+                array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+            setattr(self, name, array)
+        if not exists:
+            self.write_header()
+
+    def read_header(self):
+        if not os.path.exists(self.header_path):
+            return None
+        with open(self.header_path) as header_file:
+            return json.load(header_file)
+
+    def write_header(self):
+        header = {
+            'capacity': self.capacity,
+            'board_dimension': self.board_dimension,
+            'cursor': self.cursor,
+            'size': self.size,
+            'added': self.added
+        }
+        #Write then rename, so a reader never sees a partial header
+        temp_path = self.header_path + '.tmp'
+        with open(temp_path, 'w') as header_file:
+            json.dump(header, header_file)
+        os.replace(temp_path, self.header_path)
+
+    def flush(self):
+        """Write the samples to disk, then the header counting them
+        """
+        for (name, shape, dtype) in self.get_array_specs():
+            getattr(self, name).flush()
+        self.write_header()
+
+    def add(self, grids, players, labels_p, labels_v, weights=None):
+        """Same as ReplayBuffer.add, the samples are on disk when it returns
+        """
+        if self.read_only:
+            raise ValueError("The replay buffer was opened read only")
+        #The samples about to be overwritten are the oldest ones, they leave the header before their slots change
+        overwritten = self.size + min(len(grids), self.capacity) - self.capacity
+        if overwritten > 0:
+            self.size -= overwritten
+            self.write_header()
+        super(PersistentReplayBuffer, self).add(grids, players, labels_p, labels_v, weights)
+        self.flush()
+
+    def set_weights(self, indices, weights):
+        if self.read_only:
+            raise ValueError("The replay buffer was opened read only")
+        super(PersistentReplayBuffer, self).set_weights(indices, weights)
+        self.weights.flush()
+
+    def refresh(self):
+        """Read the cursor written by the writing process, for a read only buffer
+        """
+        header = self.read_header()
+        self.cursor, self.size, self.added = header['cursor'], header['size'], header['added']
+
+    def close(self):
+        """Flush a writable buffer and release the memory maps
+        """
+        if not self.read_only:
+            self.flush()
+        for (name, shape, dtype) in self.get_array_specs():
+            setattr(self, name, None)
@@ -0,0 +1,65 @@
+from collections import Counter
+
+class SearchStats():
+    """Per-phase profile of an MCTS search, collected when the search is created with profile=True
+    """
+    def __init__(self):
+        """Initialize empty statistics
+        Fields:
+            self.simluations: number of simluations run
+            self.selection_time: seconds spent walking down the tree with PUCT
+            self.expansion_time: seconds spent in is_valid_move / make_move creating child nodes
+            self.evaluation_time: seconds spent in nn.predict
+            self.backup_time: seconds spent backing values up to the root
+            self.total_time: seconds spent in run_simulations
+            self.node_count: number of nodes created
+            self.evaluations: number of nn.predict calls
+            self.depths: counter of the depth of the leaf reached by each simluation
+            self.cache_hits, self.cache_misses: evaluation cache counters during the search, if the nn has them
+        """
+        self.simluations = 0
+        self.selection_time = 0.0
+        self.expansion_time = 0.0
+        self.evaluation_time = 0.0
+        self.backup_time = 0.0
+        self.total_time = 0.0
+        self.node_count = 0
+        self.evaluations = 0
+        self.depths = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def evaluations_per_second(self):
+        return self.evaluations / self.total_time if self.total_time > 0 else 0.0
+
+    def simluations_per_second(self):
+        return self.simluations / self.total_time if self.total_time > 0 else 0.0
+
+    def get_summary(self):
+        """Summarize the statistics
+        Returns:
+            a dictionary of the counters, phase times and rates
+        """
+        return {
+            'simulations': self.simluations,
+            'selection_time': self.selection_time,
+            'expansion_time': self.expansion_time,
+            'evaluation_time': self.evaluation_time,
+            'backup_time': self.backup_time,
+            'total_time': self.total_time,
+            'node_count': self.node_count,
+            'evaluations': self.evaluations,
+            'evaluations_per_second': self.evaluations_per_second(),
+            'simulations_per_second': self.simluations_per_second(),
+            'max_depth': max(self.depths) if self.depths else 0,
+            'depths': dict(self.depths),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
+
+    def __str__(self):
+        return "Search stats: " + str(self.simluations) + " simluations in " + str(round(self.total_time, 3)) + "s\n" \
+            + "  selection: " + str(round(self.selection_time, 3)) + "s, expansion: " + str(round(self.expansion_time, 3)) \
+            + "s, evaluation: " + str(round(self.evaluation_time, 3)) + "s, backup: " + str(round(self.backup_time, 3)) + "s\n" \
+            + "  nodes: " + str(self.node_count) + ", evaluations per second: " + str(round(self.evaluations_per_second(), 1)) \
+            + ", cache hits: " + str(self.cache_hits) + ", depths: " + str(dict(self.depths))
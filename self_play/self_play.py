@@ -1,26 +1,56 @@
 import numpy as np
+import time
+
+from self_play.gumbel_mcts import GumbelMCTS
 from self_play.mcts import MCTS
 
 class SelfPlay():
     """Algorithm plays against itself till the game ends and produce a set of (board, policy, result)
     Used as training data for the neural net.
     """
-    def __init__(self, starting_board, nn, utils, simluation_number):
+    def __init__(self, starting_board, nn, utils, simluation_number, use_gumbel=False,
+                 full_search_probability=1.0, fast_simluation_number=None, simulation_budget=None, symmetry_pruning=None):
         """Initialize an instance of self play with a starting node
         Args:
             starting_board: a GameBoard instance representing the starting board
             nn: instance of current neural net model
             utils: GameUtils instance used during self play
             simluation_number: number of MCTS simulations needed to play one move
+            use_gumbel: True to search the root with Gumbel top-k and sequential halving,
+                which needs far fewer simulations than the PUCT search with Dirichlet noise
+            full_search_probability: playout cap randomization, the fraction of moves searched with
+                simluation_number simulations and recorded as policy training targets
+            fast_simluation_number: number of simulations for the remaining (fast) moves, which are played
+                but not recorded as policy targets. None to search every move fully
+            simulation_budget: optional AdaptiveSimulationBudget choosing the number of simulations of each full search,
+                simluation_number is used when it is None
+            symmetry_pruning: symmetry pruning of the searches, None, 'root' or 'all', see MCTS
         Fields:
             self.nn: instance of neural net model used for this iteration of self play
             self.current_node: the current node during self play
             self.policies: track the history of the nodes played and their corresponding pi
-                pi is the probabilty for next moves according to the MCTS simulations
+                pi is the probabilty for next moves according to the MCTS simulations,
+                moves from fast searches are recorded with an all zero pi
+            self.full_search_moves, self.fast_search_moves: number of moves played with each search
+            self.full_searches: for each move played, True if it was searched fully and has a policy target
+            self.total_simluations: number of simulations run during this self play session
+            self.search_time: seconds spent searching during this self play session
+            self.simulation_budgets: number of simulations chosen for each move played
         """
         self.utils = utils
         self.nn = nn
         self.simluation_number = simluation_number
+        self.use_gumbel = use_gumbel
+        self.full_search_probability = full_search_probability
+        self.fast_simluation_number = fast_simluation_number
+        self.simulation_budget = simulation_budget
+        self.symmetry_pruning = symmetry_pruning
+        self.simulation_budgets = []
+        self.full_search_moves = 0
+        self.fast_search_moves = 0
+        self.full_searches = []
+        self.total_simluations = 0
+        self.search_time = 0.0
         self.current_board = starting_board
         self.policies = np.empty(0)
         self.history_boards = np.empty(0) #Records all the board config played in this self play session
@@ -32,8 +62,34 @@ class SelfPlay():
            Returns:
                 True if the player passed, False otherwise
         """
-        ts_instance = MCTS(self.current_board, self.nn, self.utils, self.simluation_number)
-        new_board, move, policy = ts_instance.run_all_simulations(temp1 = 1, temp2 = 0.0, step_boundary=5)
+        #Playout cap randomization: only a fraction of the moves get a full search
+        full_search = self.fast_simluation_number is None or np.random.rand() < self.full_search_probability
+        simluation_number = self.simluation_number if full_search else self.fast_simluation_number
+
+        start_time = time.time()
+        if self.use_gumbel:
+            ts_instance = GumbelMCTS(self.current_board, self.nn, self.utils, simluation_number,
+                symmetry_pruning=self.symmetry_pruning)
+        else:
+            ts_instance = MCTS(self.current_board, self.nn, self.utils, simluation_number,
+                symmetry_pruning=self.symmetry_pruning)
+        if full_search and self.simulation_budget != None:
+            simluation_number = self.simulation_budget.choose_budget(ts_instance)
+        if self.use_gumbel:
+            new_board, move, policy = ts_instance.run_gumbel_simulations()
+        else:
+            new_board, move, policy = ts_instance.run_all_simulations(temp1 = 1, temp2 = 0.0, step_boundary=5)
+        self.search_time += time.time() - start_time
+        self.total_simluations += ts_instance.simluations_run
+        self.simulation_budgets.append(simluation_number)
+
+        if full_search:
+            self.full_search_moves += 1
+        else:
+            #An all zero pi has no policy loss, so the board only trains the value head
+            self.fast_search_moves += 1
+            policy = np.zeros(len(policy))
+        self.full_searches.append(full_search)
 
         print("move is:", move)
         if len(self.policies) == 0:
@@ -46,6 +102,25 @@ class SelfPlay():
 
         return move == (-1, -1)
 
+    def get_throughput_stats(self):
+        """Summarize the search cost of this self play session
+        Returns:
+            a dictionary with the number of moves, policy targets, simulations and the mean simulation budget,
+            and the moves and simulations searched per second
+        """
+        moves = self.full_search_moves + self.fast_search_moves
+        search_time = max(self.search_time, 1e-9)
+        return {
+            'moves': moves,
+            'policy_targets': self.full_search_moves,
+            'fast_moves': self.fast_search_moves,
+            'simulations': self.total_simluations,
+            'mean_simulation_budget': np.mean(self.simulation_budgets) if self.simulation_budgets else 0,
+            'search_seconds': self.search_time,
+            'moves_per_second': moves / search_time,
+            'simulations_per_second': self.total_simluations / search_time
+        }
+
     def play_till_finish(self):
         """Play until the game reaches a final state (2 passes happen one after another)
         Returns:
@@ -73,3 +148,22 @@ class SelfPlay():
 
         return np.append(boards_data, reversed_boards_data), new_training_labels_p, new_training_labels_v
         #return boards_data, new_training_labels_p, new_training_labels_v
+
+    def get_full_search_positions(self):
+        """Positions of the game searched fully, the ones with a policy target
+        Returns:
+            array of indices of positions in self.history_boards
+        """
+        return np.flatnonzero(self.full_searches)
+
+    def get_training_indices(self, positions):
+        """Indices of the training data returned by play_till_finish that come from some positions of the game.
+        Each position gives 5 augmented boards, and the same boards with the colors reversed
+        Args:
+            positions: indices of positions in self.history_boards
+        Returns:
+            array of 10 indices into the training data for each position
+        """
+        positions = np.asarray(positions, dtype=int).reshape(-1, 1)
+        indices = positions * 5 + np.arange(5)
+        return np.concatenate([indices, indices + len(self.history_boards) * 5], axis=None)
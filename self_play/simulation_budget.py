@@ -0,0 +1,71 @@
+import numpy as np
+
+from math import log
+
+class AdaptiveSimulationBudget():
+    """Chooses the number of MCTS simulations for each move between a minimum and a maximum,
+    so a fixed compute budget goes to the moves that need search. Strategies:
+        entropy: scale with the entropy of the root prior, a confident prior needs few simulations
+        legal_moves: scale with the number of legal moves at the root
+        margin: keep searching in chunks until the visit count margin between the top two moves
+            can no longer be closed by the simulations left
+    """
+    STRATEGIES = ('entropy', 'legal_moves', 'margin')
+
+    def __init__(self, min_simulations, max_simulations, strategy='entropy', check_interval=None):
+        """Initialize the budget scheduler
+        Args:
+            min_simulations: smallest number of simulations for a move
+            max_simulations: largest number of simulations for a move
+            strategy: 'entropy', 'legal_moves' or 'margin'
+            check_interval: simulations between two margin checks, defaults to a tenth of the range
+        """
+        if strategy not in AdaptiveSimulationBudget.STRATEGIES:
+            raise ValueError("Unknown simulation budget strategy: " + str(strategy))
+        if min_simulations < 1 or max_simulations < min_simulations:
+            raise ValueError("Simulation bounds must satisfy 1 <= min_simulations <= max_simulations")
+        self.min_simulations = min_simulations
+        self.max_simulations = max_simulations
+        self.strategy = strategy
+        self.check_interval = check_interval or max(1, (max_simulations - min_simulations) // 10)
+
+    def scale(self, fraction):
+        """Map a number in [0, 1] onto the simulation range
+        """
+        fraction = min(1.0, max(0.0, fraction))
+        return int(round(self.min_simulations + fraction * (self.max_simulations - self.min_simulations)))
+
+    def choose_budget(self, mcts):
+        """Choose the number of simulations for the root of an MCTS instance.
+        The root is expanded (one simulation) if needed, the margin strategy also runs the simulations it decides on.
+        Args:
+            mcts: the MCTS instance searching the current move
+        Returns:
+            the number of simulations chosen for the move, also stored as mcts.simluation_number
+        """
+        if mcts.root_node.is_leaf():
+            mcts.run_simulations(1)
+        root_edges = mcts.root_node.edges
+
+        if len(root_edges) <= 1:
+            budget = self.min_simulations
+        elif self.strategy == 'entropy':
+            priors = np.array([edge.P for edge in root_edges], dtype=float)
+            priors = priors / priors.sum() if priors.sum() > 0 else np.ones(len(priors)) / len(priors)
+            entropy = -sum([p * log(p) for p in priors if p > 0])
+            budget = self.scale(entropy / log(len(priors)))
+        elif self.strategy == 'legal_moves':
+            board_dimension = mcts.root_node.board.board_dimension
+            #Pass is always legal
+            budget = self.scale((len(root_edges) - 1) * 1.0 / (board_dimension * board_dimension))
+        else:
+            mcts.run_simulations(self.min_simulations - mcts.simluations_run)
+            while mcts.simluations_run < self.max_simulations and not mcts.root_node.is_proven():
+                visits = sorted([edge.N for edge in root_edges], reverse=True)
+                if visits[0] - visits[1] > self.max_simulations - mcts.simluations_run:
+                    break
+                mcts.run_simulations(min(self.check_interval, self.max_simulations - mcts.simluations_run))
+            budget = max(self.min_simulations, mcts.simluations_run)
+
+        mcts.simluation_number = budget
+        return budget
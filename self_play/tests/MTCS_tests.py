@@ -1,5 +1,5 @@
 import unittest
-import tensorflow as tf
+import numpy as np
 
 from game.go_board import GoBoard
 from game.go_utils import GoUtils
@@ -7,7 +7,6 @@ from game.tic_tac_toe_board import TicTacToeBoard
 from game.tic_tac_toe_utils import TicTacToeUtils
 from self_play.mcts import MCTS
 from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
-from value_policy_net.resnet import ResNet
 from value_policy_net.tests.go_board_2x2_heuristics import GoBoard2Heuristics
 
 BLACK = 1
@@ -48,5 +47,134 @@ class MCTSTest(unittest.TestCase):
         
         print("board afer move is {} is with policy {}".format(board, policy))
 
+    def test_solver_stops_on_proven_win(self):
+        """ X wins at (1, 0), the search should prove it and stop early
+        """
+        grid = [[1, 0, -1], [0, -1, 0], [1, 0, 0]]
+        history = [(1, 0, 0), (-1, 0, 2), (1, 2, 0), (-1, 1, 1)]
+
+        board = TicTacToeBoard(player=1, board_grid = grid, game_history = history)
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 1000, random_seed=2)
+        board, move, policy = mcts_instance.run_all_simulations(temp1 = 1, temp2 = 1, step_boundary=2)
+        self.assertEqual(move, (1, 0))
+        self.assertEqual(mcts_instance.get_proven_result(), 1)
+        self.assertLess(sum([edge.N for edge in mcts_instance.root_node.edges]), 1000)
+
+    def test_profile_search(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 100, profile=True)
+        move, stats = mcts_instance.run_simulations_without_noise(return_stats=True)
+        self.assertEqual(stats.simluations, 100)
+        self.assertEqual(sum(stats.depths.values()), 100)
+        self.assertTrue(0 < stats.evaluations <= 100)
+        self.assertGreater(stats.node_count, 0)
+        self.assertGreater(stats.total_time, 0)
+
+        self.assertEqual(MCTS(board, nn, utils, simluation_number = 10).run_simulations_without_noise(return_stats=True)[1], None)
+
+    def test_node_budget(self):
+        board = GoBoard(board_dimension=5, player=BLACK)
+        utils = GoUtils()
+        nn = UniformPredictionNet(board_dimension = 5)
+
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 100, max_nodes = 200)
+        move = mcts_instance.run_simulations_without_noise()
+        memory_stats = mcts_instance.get_memory_stats()
+        self.assertLessEqual(memory_stats['peak_nodes'], 200)
+        self.assertGreater(memory_stats['recycled_nodes'], 0)
+        self.assertTrue(utils.is_valid_move(board, move))
+
+    def test_node_budget_keeps_evaluations(self):
+        board = GoBoard(board_dimension=5, player=BLACK)
+        utils = GoUtils()
+        nn = UniformPredictionNet(board_dimension = 5)
+
+        #The root children fill the budget, so the leaves below them cannot be expanded
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 200, max_nodes = 30, profile = True)
+        mcts_instance.run_simulations_without_noise()
+        #Each leaf is evaluated once however often it is visited
+        self.assertEqual(mcts_instance.search_stats.evaluations, mcts_instance.node_pool.used_nodes)
+
+    def test_advance_root(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 200)
+        move = mcts_instance.run_simulations_without_noise()
+        child_edge = [edge for edge in mcts_instance.root_node.edges if edge.move == move][0]
+        child_node = child_edge.to_node
+        grandchild_Q = [edge.Q for edge in child_node.edges]
+
+        self.assertTrue(mcts_instance.advance_root(move))
+        self.assertIs(mcts_instance.root_node, child_node)
+        #Only the subtree below the new root is kept
+        subtree_size = 0
+        stack = [child_node]
+        while stack:
+            node = stack.pop()
+            subtree_size += 1
+            stack.extend([edge.to_node for edge in node.edges])
+        self.assertEqual(mcts_instance.node_pool.used_nodes, subtree_size)
+        #Values are now from the new root player's perspective
+        self.assertEqual([edge.Q for edge in child_node.edges], [-q for q in grandchild_Q])
+        self.assertEqual(mcts_instance.root_node.board.player, -1)
+
+    def test_symmetry_pruning(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 100, symmetry_pruning = 'root')
+        move = mcts_instance.run_simulations_without_noise()
+        root_edges = mcts_instance.root_node.edges
+        #The empty board keeps one corner, one side and the center
+        corner_edge = [edge for edge in root_edges if (0, 0) in edge.equivalent_moves][0]
+        self.assertEqual(sorted(corner_edge.equivalent_moves), [(0, 0), (0, 2), (2, 0), (2, 2)])
+        self.assertEqual(sum([len(edge.equivalent_moves) for edge in root_edges]), len(root_edges) + 6)
+        self.assertIn(move, [m for edge in root_edges for m in edge.equivalent_moves])
+        #The probability of a representative is spread evenly over its equivalent moves
+        policy = np.zeros(10)
+        mcts_instance.add_edge_to_policy(policy, corner_edge, 1)
+        self.assertEqual(list(policy[[0, 2, 6, 8]]), [0.25] * 4)
+        self.assertAlmostEqual(sum(policy), 1)
+
+        #Playing an equivalent move reuses the subtree of its representative, turned to the played board
+        child_node = corner_edge.to_node
+        self.assertTrue(mcts_instance.advance_root((2, 2)))
+        self.assertIs(mcts_instance.root_node, child_node)
+        self.assertEqual(child_node.board.board_grid[2][2], 1)
+        stack = [child_node]
+        while stack:
+            node = stack.pop()
+            for edge in node.edges:
+                valid_move, next_board = utils.make_move(node.board, edge.move)
+                self.assertTrue(valid_move)
+                np.testing.assert_array_equal(next_board.board_grid, edge.to_node.board.board_grid)
+                stack.append(edge.to_node)
+
+    def test_principal_variation(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        mcts_instance = MCTS(board, nn, utils, simluation_number = 100)
+        mcts_instance.run_simulations_without_noise()
+        visits = mcts_instance.get_visit_distribution()
+        self.assertAlmostEqual(sum(visits), 1)
+        principal_variation = mcts_instance.get_principal_variation()
+        self.assertTrue(len(principal_variation) > 1)
+        #The variation starts with the most visited root move and is playable
+        self.assertEqual(visits[mcts_instance.move_to_policy_index(principal_variation[0])], max(visits))
+        for move in principal_variation:
+            valid_move, board = utils.make_move(board, move)
+            self.assertTrue(valid_move)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
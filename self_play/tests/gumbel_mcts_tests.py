@@ -0,0 +1,52 @@
+import random
+import unittest
+import numpy as np
+
+from game.tic_tac_toe_board import TicTacToeBoard
+from game.tic_tac_toe_utils import TicTacToeUtils
+from self_play.gumbel_mcts import GumbelMCTS
+from value_policy_net.evaluation_cache import EvaluationCache
+from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
+
+class GumbelMCTSTest(unittest.TestCase):
+    def test_block_tic_tac_toe_with_few_simulations(self):
+        """ O has to block X at (1, 0) with a budget of 64 simluations
+        """
+        grid = [[1, 0, -1], [0, 0, 0], [1, 0, 0]]
+        history = [(1, 0, 0), (-1, 0, 2), (1, 2, 0)]
+
+        board = TicTacToeBoard(player=-1, board_grid = grid, game_history = history)
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        random.seed(2)
+        mcts_instance = GumbelMCTS(board, nn, utils, simluation_number = 64, random_seed=2)
+        board, move, policy = mcts_instance.run_gumbel_simulations()
+        self.assertEqual(move, (1, 0))
+        self.assertAlmostEqual(np.sum(policy), 1)
+        self.assertEqual(np.argmax(policy), 3)
+
+    def test_policy_only_covers_valid_moves(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        mcts_instance = GumbelMCTS(board, nn, utils, simluation_number = 16, random_seed=3)
+        _, move, policy = mcts_instance.run_gumbel_simulations()
+        self.assertEqual(len(policy), 10)
+        self.assertTrue(utils.is_valid_move(TicTacToeBoard(), move))
+        self.assertAlmostEqual(np.sum(policy), 1)
+
+    def test_profile_search(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = EvaluationCache(UniformPredictionNet(board_dimension = 3))
+
+        mcts_instance = GumbelMCTS(board, nn, utils, simluation_number = 32, random_seed=3, profile=True)
+        _, move, policy, stats = mcts_instance.run_gumbel_simulations(return_stats=True)
+        self.assertEqual(stats.simluations, mcts_instance.simluations_run)
+        self.assertEqual(stats.cache_hits + stats.cache_misses, stats.evaluations)
+        self.assertGreater(stats.total_time, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import time
+import unittest
+
+from game.tic_tac_toe_board import TicTacToeBoard
+from game.tic_tac_toe_utils import TicTacToeUtils
+from self_play.ponderer import Ponderer
+from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
+
+class PondererTest(unittest.TestCase):
+    def test_ponder_then_search(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        ponderer = Ponderer(board, nn, utils, simluation_number = 50, chunk_size = 5, max_ponder_simulations = 200)
+        ponderer.ponder()
+        while ponderer.is_searching():
+            time.sleep(0.01)
+        self.assertEqual(ponderer.mcts.simluations_run, 200)
+
+        #The opponent's move keeps its pondered subtree
+        edge = max(ponderer.mcts.root_node.edges, key=lambda e: e.N)
+        self.assertTrue(ponderer.play_move(edge.move))
+        self.assertEqual(ponderer.mcts.simluations_run, edge.N)
+
+        ponderer.start_search()
+        while ponderer.get_move() == None:
+            time.sleep(0.01)
+        move = ponderer.get_move()
+        self.assertTrue(utils.is_valid_move(ponderer.mcts.root_node.board, move))
+        self.assertEqual(ponderer.mcts.simluations_run, max(50, edge.N))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+from game.go_board import GoBoard
+from self_play.replay_buffer import PersistentReplayBuffer, ReplayBuffer
+
+class ReplayBufferTest(unittest.TestCase):
+    def add_samples(self, buffer, first_value, sample_number):
+        grids = np.zeros((sample_number, 3, 3), dtype=np.int8)
+        grids[:, 0, 0] = 1
+        values = np.arange(first_value, first_value + sample_number, dtype=np.float32).reshape(-1, 1)
+        buffer.add(grids, np.ones(sample_number), np.full((sample_number, 10), 0.1), values)
+
+    def test_ring_buffer(self):
+        buffer = ReplayBuffer(capacity=5, board_dimension=3, seed=0)
+        self.add_samples(buffer, 0, 3)
+        self.assertEqual((len(buffer), buffer.cursor, buffer.is_full()), (3, 3, False))
+
+        #The oldest samples are overwritten
+        self.add_samples(buffer, 3, 4)
+        self.assertEqual((len(buffer), buffer.cursor, buffer.added), (5, 2, 7))
+        npt.assert_array_equal(buffer.labels_v[:, 0], [5, 6, 2, 3, 4])
+
+        #Only the last capacity samples of a larger batch are kept
+        self.add_samples(buffer, 10, 7)
+        self.assertEqual(sorted(buffer.labels_v[:, 0]), [12, 13, 14, 15, 16])
+        self.assertEqual(buffer.get_memory_bytes(), 5 * (9 + 1 + 40 + 4 + 4))
+
+    def test_sample(self):
+        buffer = ReplayBuffer(capacity=100, board_dimension=3, seed=0)
+        board = GoBoard(3, -1, board_grid=[[1, 0, -1], [0, 0, 0], [0, 0, 0]], game_history=[])
+        buffer.add_boards([board] * 20, np.full((20, 10), 0.1), np.ones((20, 1)))
+        planes, labels_p, labels_v = buffer.sample(8)
+        self.assertEqual(planes.shape, (8, 3, 3, 3))
+        self.assertEqual(labels_p.shape, (8, 10))
+        npt.assert_array_equal(planes[:, 0, 2, 0], np.ones(8))
+        npt.assert_array_equal(planes[:, 0, 0, 1], np.ones(8))
+        npt.assert_array_equal(planes[:, :, :, 2], -np.ones((8, 3, 3)))
+
+        indices = buffer.sample_indices(20)
+        self.assertEqual(sorted(indices), list(range(20)))
+
+    def test_weighted_sample(self):
+        buffer = ReplayBuffer(capacity=10, board_dimension=3, seed=0)
+        self.add_samples(buffer, 0, 10)
+        buffer.set_weights(np.arange(5), 0)
+        for i in range(10):
+            self.assertTrue(np.all(buffer.sample_indices(5, weighted=True) >= 5))
+
+    def test_persistent_resume(self):
+        directory = tempfile.mkdtemp()
+        buffer = PersistentReplayBuffer(directory, capacity=5, board_dimension=3)
+        self.add_samples(buffer, 0, 3)
+        self.add_samples(buffer, 3, 4)
+        buffer.close()
+
+        #A restarted run finds the same samples and cursor
+        buffer = PersistentReplayBuffer(directory, capacity=5, board_dimension=3, seed=0)
+        self.assertEqual((len(buffer), buffer.cursor, buffer.added), (5, 2, 7))
+        npt.assert_array_equal(buffer.labels_v[:, 0], [5, 6, 2, 3, 4])
+        self.assertEqual(buffer.sample(4)[0].shape, (4, 3, 3, 3))
+        self.assertRaises(ValueError, PersistentReplayBuffer, directory, capacity=10, board_dimension=3)
+
+        #A reader sees the samples flushed by the writer after refresh
+        reader = PersistentReplayBuffer(directory, capacity=5, board_dimension=3, read_only=True)
+        self.add_samples(buffer, 7, 1)
+        reader.refresh()
+        self.assertEqual((reader.cursor, reader.added), (3, 8))
+        self.assertEqual(reader.labels_v[2, 0], 7)
+        self.assertRaises(ValueError, reader.add, np.zeros((1, 3, 3)), [1], np.zeros((1, 10)), [[0]])
+        reader.close()
+        buffer.close()
+
+    def test_persistent_interrupted_add(self):
+        directory = tempfile.mkdtemp()
+        buffer = PersistentReplayBuffer(directory, capacity=5, board_dimension=3, seed=0)
+        self.add_samples(buffer, 0, 5)
+        #The grids of two slots are overwritten before the value labels of the wrong length fail the add
+        self.assertRaises(ValueError, buffer.add, np.full((2, 3, 3), -1), np.ones(2), np.zeros((2, 10)), np.zeros((3, 1)))
+        buffer.close()
+
+        buffer = PersistentReplayBuffer(directory, capacity=5, board_dimension=3, seed=0)
+        self.assertEqual((len(buffer), buffer.cursor), (3, 0))
+        indices = buffer.sample_indices(3)
+        self.assertEqual(sorted(indices), [2, 3, 4])
+        npt.assert_array_equal(buffer.grids[indices, 0, 0], np.ones(3))
+
+        #The next add fills the buffer again from the cursor
+        self.add_samples(buffer, 5, 2)
+        self.assertEqual((len(buffer), buffer.cursor), (5, 2))
+        self.assertEqual(sorted(buffer.labels_v[buffer.sample_indices(5), 0]), [2, 3, 4, 5, 6])
+        buffer.close()
+
+if __name__ == '__main__':
+    unittest.main()
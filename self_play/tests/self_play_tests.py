@@ -1,10 +1,12 @@
 import unittest
+import numpy as np
 
 from game.go_board import GoBoard
 from game.go_utils import GoUtils
 from game.tic_tac_toe_board import TicTacToeBoard
 from game.tic_tac_toe_utils import TicTacToeUtils
 from self_play.self_play import SelfPlay
+from self_play.simulation_budget import AdaptiveSimulationBudget
 from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
 from value_policy_net.tests.go_board_2x2_heuristics import GoBoard2Heuristics
 
@@ -21,5 +23,63 @@ class SelfPlayTest(unittest.TestCase):
         self_play_instance.play_till_finish()
         print(self_play_instance.history_boards)
 
+    def test_playout_cap_randomization(self):
+        board = TicTacToeBoard()
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        self_play_instance = SelfPlay(board, nn, utils, simluation_number=200,
+            full_search_probability=0.5, fast_simluation_number=20)
+        boards, labels_p, labels_v = self_play_instance.play_till_finish()
+        stats = self_play_instance.get_throughput_stats()
+
+        #Fast moves keep their value targets but have an all zero policy target
+        policies = np.atleast_2d(self_play_instance.policies)
+        zero_policies = sum(1 for p in policies if abs(sum(p)) < 1e-6)
+        self.assertEqual(zero_policies, stats['fast_moves'])
+        full_search_positions = self_play_instance.get_full_search_positions()
+        self.assertEqual(len(full_search_positions), stats['policy_targets'])
+        self.assertTrue(all(abs(sum(policies[position]) - 1) < 1e-6 for position in full_search_positions))
+        self.assertEqual(stats['policy_targets'] + stats['fast_moves'], stats['moves'])
+        #Searches stop early once the solver proves the root
+        self.assertLessEqual(stats['simulations'], 200 * stats['policy_targets'] + 20 * stats['fast_moves'])
+        self.assertEqual(len(labels_v), len(boards))
+
+        #The samples of a position are its augmented boards and the same boards with the colors reversed
+        indices = self_play_instance.get_training_indices([1])
+        self.assertEqual(len(indices), 10)
+        grid = np.array(self_play_instance.history_boards[1].board_grid)
+        np.testing.assert_array_equal(boards[indices[0]].board_grid, np.rot90(grid, 1))
+        np.testing.assert_array_equal(boards[indices[5]].board_grid, -np.rot90(grid, 1))
+        self.assertTrue(np.all(labels_v[indices] == labels_v[indices[0]]))
+
+    def test_symmetry_pruning(self):
+        nn = UniformPredictionNet(board_dimension = 3)
+        self_play_instance = SelfPlay(TicTacToeBoard(), nn, TicTacToeUtils(), simluation_number=32, use_gumbel=True,
+            symmetry_pruning='all')
+        self_play_instance.play_one_move()
+        #Equivalent moves of the empty board share the policy of their representative
+        policy = self_play_instance.policies
+        self.assertAlmostEqual(sum(policy), 1)
+        self.assertEqual(policy[0], policy[2])
+        self.assertEqual(policy[0], policy[8])
+
+    def test_adaptive_simulation_budget(self):
+        utils = TicTacToeUtils()
+        nn = UniformPredictionNet(board_dimension = 3)
+
+        for strategy in AdaptiveSimulationBudget.STRATEGIES:
+            budget = AdaptiveSimulationBudget(min_simulations=10, max_simulations=100, strategy=strategy)
+            self_play_instance = SelfPlay(TicTacToeBoard(), nn, utils, simluation_number=100, simulation_budget=budget)
+            self_play_instance.play_till_finish()
+            budgets = self_play_instance.simulation_budgets
+            self.assertEqual(len(budgets), len(self_play_instance.history_boards))
+            self.assertTrue(all([10 <= b <= 100 for b in budgets]))
+        #The uniform prior has the largest entropy
+        budget = AdaptiveSimulationBudget(min_simulations=10, max_simulations=100, strategy='entropy')
+        self_play_instance = SelfPlay(TicTacToeBoard(), nn, utils, simluation_number=100, simulation_budget=budget)
+        self_play_instance.play_one_move()
+        self.assertEqual(self_play_instance.simulation_budgets, [100])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,130 @@
+import sys
+import time
+import numpy as np
+
+from game.go_board import GoBoard
+from value_policy_net.board_encoder import BoardEncoder
+
+def random_positions(board_dimension, boards_number, seed=0):
+    """Random stone configurations used as benchmark inputs
+    Returns:
+        (grids, players): an N x dim x dim int8 array and the N players to move
+    """
+    rng = np.random.RandomState(seed)
+    grids = rng.randint(-1, 2, size=(boards_number, board_dimension, board_dimension)).astype(np.int8)
+    players = rng.choice([-1, 1], size=boards_number)
+    return grids, players
+
+def time_call(function, repeat):
+    """Mean duration of a call in seconds, after one warm up call
+    """
+    function()
+    start_time = time.perf_counter()
+    for i in range(repeat):
+        function()
+    return (time.perf_counter() - start_time) / repeat
+
+def benchmark_predict(nn, batch_sizes=(1, 16, 128), repeat=50):
+    """Measure the latency of an evaluator with the ResNet predict and predict_batch interface
+    Args:
+        nn: the evaluator, for example ResNet, FrozenNet or NumpyNet
+        batch_sizes: batch sizes given to predict_batch
+        repeat: number of timed calls for each measurement
+    Returns:
+        a dictionary with the single board predict latency in milliseconds and, for each batch size,
+        the batch latency in milliseconds and the boards evaluated per second
+    """
+    grids, players = random_positions(nn.board_dimension, max(batch_sizes))
+    board = GoBoard(nn.board_dimension, int(players[0]), board_grid=grids[0].tolist(), game_history=[])
+    planes = BoardEncoder(nn.board_dimension, max(batch_sizes)).encode(grids, players).copy()
+
+    results = {'predict_ms': time_call(lambda: nn.predict(board), repeat) * 1000}
+    for batch_size in batch_sizes:
+        batch_seconds = time_call(lambda: nn.predict_batch(planes[:batch_size]), repeat)
+        results['batch_' + str(batch_size) + '_ms'] = batch_seconds * 1000
+        results['batch_' + str(batch_size) + '_boards_per_second'] = batch_size / batch_seconds
+    return results
+
+def benchmark_input_pipeline(dataset, batches=100):
+    """Measure how fast a tf.data training pipeline delivers samples, without training
+    Args:
+        dataset: a tf.data.Dataset of (x, yp, yv) batches, such as the ones of input_pipeline
+        batches: number of timed batches
+    Returns:
+        a dictionary with the samples per second and the milliseconds per batch
+    """
+    import tensorflow as tf
+
+    next_batch = dataset.make_one_shot_iterator().get_next()
+    with tf.Session() as sess:
+        sess.run(next_batch) #Warm up, fills the shuffle buffer
+        samples = 0
+        start_time = time.perf_counter()
+        for i in range(batches):
+            samples += len(sess.run(next_batch)[2])
+        seconds = time.perf_counter() - start_time
+    return {'samples_per_second': samples / seconds, 'batch_ms': seconds * 1000 / batches}
+
+def benchmark_configurations(configs, batch_size=128, repeat=20):
+    """Compare network architectures on the speed of play and of training.
+    Each network is built with random weights in its own graph and session.
+    Args:
+        configs: list of NetworkConfig to compare
+        batch_size: batch size of the batch inference and of the training step
+        repeat: number of timed calls for each measurement
+    Returns:
+        a list of (config, results) where results has the single board predict latency,
+        the batch throughput and the milliseconds per training step
+    """
+    import tensorflow as tf
+    from value_policy_net.resnet import ResNet
+
+    all_results = []
+    for config in configs:
+        with tf.Graph().as_default(), tf.Session() as sess:
+            nn = ResNet(config=config)
+            sess.run(tf.global_variables_initializer())
+            results = benchmark_predict(nn, batch_sizes=(batch_size,), repeat=repeat)
+
+            grids, players = random_positions(config.board_dimension, batch_size)
+            planes = BoardEncoder(config.board_dimension, batch_size).encode(grids, players).copy()
+            labels_p = np.full((batch_size, config.board_dimension * config.board_dimension + 1),
+                1.0 / (config.board_dimension * config.board_dimension + 1), dtype=np.float32)
+            labels_v = np.random.RandomState(0).choice([-1.0, 1.0], size=(batch_size, 1))
+            feed_dict = {nn.x: planes, nn.yp: labels_p, nn.yv: labels_v}
+            results['train_step_ms'] = time_call(lambda: sess.run(nn.train_op, feed_dict=feed_dict), repeat) * 1000
+            results['parameters'] = sum([int(np.prod(v.get_shape().as_list())) for v in tf.trainable_variables()])
+        all_results.append((config, results))
+    return all_results
+
+def print_results(name, results):
+    print(name)
+    for (key, value) in sorted(results.items()):
+        print("    {}: {:.3f}".format(key, value))
+
+if __name__ == '__main__' and len(sys.argv) == 1:
+    #python -m value_policy_net.benchmarks compares architectures
+    from value_policy_net.network_config import NetworkConfig
+
+    configs = [NetworkConfig(filters=32, residual_blocks=2), NetworkConfig(),
+               NetworkConfig(filters=64, residual_blocks=6), NetworkConfig(filters=128, residual_blocks=3),
+               NetworkConfig(policy_head_filters=32, value_head_filters=32, fully_convolutional=True)]
+    for (config, results) in benchmark_configurations(configs):
+        print_results(repr(config), results)
+
+elif __name__ == '__main__':
+    #python -m value_policy_net.benchmarks models/batch_1920
+    import tensorflow as tf
+    from value_policy_net.numpy_net import NumpyNet, export_checkpoint
+    from value_policy_net.resnet import ResNet
+
+    model_path = sys.argv[1]
+    with tf.Session().as_default():
+        nn = ResNet(board_dimension=5, model_path=model_path, restored=True)
+        print_results("training graph", benchmark_predict(nn))
+        print("frozen graph error (policy, value):", nn.verify_frozen_net())
+        nn.frozen_inference = True
+        print_results("frozen graph", benchmark_predict(nn))
+
+    export_checkpoint(model_path, model_path + '.npz')
+    print_results("numpy", benchmark_predict(NumpyNet(model_path + '.npz')))
@@ -0,0 +1,68 @@
+import numpy as np
+
+def board_moves(board_dimension):
+    """Move of each policy entry for a board dimension, pass is the last one
+    """
+    return [(r, c) for r in range(board_dimension) for c in range(board_dimension)] + [(-1, -1)]
+
+def mask_policy(p, legal_mask):
+    """Give illegal moves probability 0 and renormalize the policy of each position
+    Args:
+        p: N x (dim x dim + 1) array of move probabilities, pass is the last column
+        legal_mask: N x (dim x dim + 1) array, nonzero for legal moves, or None to keep p
+    Returns:
+        the masked policies, positions without any probability left on legal moves keep zeros
+    """
+    if legal_mask is None:
+        return p
+    p = p * (np.asarray(legal_mask) != 0)
+    sum_p = p.sum(axis=1, keepdims=True)
+    return np.divide(p, sum_p, out=np.zeros_like(p), where=sum_p > 0)
+
+class BoardEncoder():
+    """Encodes stacked board grids into the dim x dim x 3 input planes of the res net with array operations.
+    Plane 0 marks white stones (-1), plane 1 marks black stones (1) and plane 2 holds the player to move.
+    The planes are written into a preallocated buffer that is reused between calls.
+    Grids of another dimension are encoded as well, for the fully convolutional networks, the buffer is then reallocated.
+    """
+    def __init__(self, board_dimension, batch_size=1):
+        """Initialize the encoder
+        Args:
+            board_dimension: dimension of the boards to encode
+            batch_size: number of boards the buffer holds initially, it grows when a larger batch is encoded
+        """
+        self.board_dimension = board_dimension
+        self.buffer = np.zeros((batch_size, board_dimension, board_dimension, 3), dtype=np.float32)
+
+    def encode(self, grids, players):
+        """Encode a batch of grids
+        Args:
+            grids: N x dim x dim array of -1 (white), 0 (empty) and 1 (black), int8 avoids a conversion
+            players: array of the N players to move
+        Returns:
+            N x dim x dim x 3 float32 planes. This is a view of the reused buffer,
+            it is overwritten by the next call so copy it to keep it
+        """
+        grids = np.asarray(grids, dtype=np.int8)
+        players = np.asarray(players, dtype=np.float32)
+        board_number = len(grids)
+        if board_number > len(self.buffer) or grids.shape[1:] != self.buffer.shape[1:3]:
+            self.buffer = np.zeros((max(board_number, len(self.buffer)),) + grids.shape[1:] + (3,), dtype=np.float32)
+
+        planes = self.buffer[:board_number]
+        np.equal(grids, -1, out=planes[..., 0], casting='unsafe')
+        np.equal(grids, 1, out=planes[..., 1], casting='unsafe')
+        planes[..., 2] = players[:, None, None]
+        return planes
+
+    def encode_boards(self, boards):
+        """Encode a list of boards
+        Args:
+            boards: list of boards with board_grid and player
+        Returns:
+            N x dim x dim x 3 float32 planes, a view of the reused buffer
+        """
+        board_dimension = boards[0].board_dimension if len(boards) > 0 else self.board_dimension
+        grids = np.array([board.board_grid for board in boards], dtype=np.int8)
+        players = np.array([board.player for board in boards], dtype=np.float32)
+        return self.encode(grids.reshape(len(boards), board_dimension, board_dimension), players)
@@ -0,0 +1,161 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import tensorflow as tf
+
+def select_checkpoints_to_keep(entries, keep_last, keep_every):
+    """Retention policy: the last keep_last checkpoints and every keep_every-th checkpoint
+    Args:
+        entries: manifest entries ordered from the oldest, each with the 'index' of the save
+        keep_last: number of most recent checkpoints kept
+        keep_every: every checkpoint whose index is a multiple of keep_every is kept, None to keep only the last ones
+    Returns:
+        the entries to keep, in the same order
+    """
+    recent = entries[-keep_last:] if keep_last > 0 else []
+    return [entry for entry in entries
+        if entry in recent or (keep_every and entry['index'] % keep_every == 0)]
+
+class CheckpointManager():
+    """Saves the variables of a session without stalling training.
+    save copies the variable values to host memory, which is fast, and a background thread
+    writes them to disk with a Saver built once over a shadow copy of the variables in a separate graph.
+    Checkpoints have the variable names of the session's graph, so tf.train.Saver.restore reads them as usual.
+    A JSON manifest in the directory lists the kept checkpoints with their step and timestamps.
+    """
+    def __init__(self, sess, directory, prefix='batch_', keep_last=5, keep_every=10, max_pending=2, config=None):
+        """Build the shadow graph and start the writer thread
+        Args:
+            sess: session holding the variables to save
+            directory: directory of the checkpoints and of manifest.json
+            prefix: checkpoint file prefix, a checkpoint is saved as directory/prefix + step
+            keep_last: number of most recent checkpoints kept on disk
+            keep_every: every keep_every-th checkpoint is kept as well, None to keep only the last ones
+            max_pending: number of snapshots waiting to be written before save blocks
+            config: NetworkConfig written next to each checkpoint, so it is restored with its architecture
+        """
+        self.sess = sess
+        self.directory = directory
+        self.prefix = prefix
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.config = config
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.entries = self.read_manifest()
+        self.save_number = self.entries[-1]['index'] + 1 if self.entries else 0
+
+        self.variables = sess.graph.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)
+        self.shadow_graph = tf.Graph()
+        with self.shadow_graph.as_default():
+            self.placeholders = []
+            assign_ops = []
+            for variable in self.variables:
+                name = variable.op.name
+                dtype = variable.dtype.base_dtype
+                shape = variable.get_shape()
+                shadow_variable = tf.Variable(tf.zeros(shape, dtype=dtype), name=name, trainable=False)
+                placeholder = tf.placeholder(dtype, shape)
+                self.placeholders.append(placeholder)
+                assign_ops.append(tf.assign(shadow_variable, placeholder))
+            self.assign_op = tf.group(*assign_ops)
+            self.saver = tf.train.Saver(max_to_keep=None)
+        self.shadow_graph.finalize()
+        self.shadow_sess = tf.Session(graph=self.shadow_graph)
+
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self.write_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path) as manifest_file:
+            return json.load(manifest_file)['checkpoints']
+
+    def write_manifest(self):
+        manifest = {
+            'latest': self.entries[-1]['path'] if self.entries else None,
+            'checkpoints': self.entries
+        }
+        #Write then rename, so a reader never sees a partial manifest
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def save(self, step):
+        """Snapshot the variables and queue them to be written
+        Args:
+            step: training step recorded in the checkpoint name and in the manifest
+        Returns:
+            the path the checkpoint is written to
+        """
+        self.raise_error()
+        values = self.sess.run(self.variables)
+        path = os.path.join(self.directory, self.prefix + str(step))
+        entry = {'step': step, 'index': self.save_number, 'path': path, 'snapshot_time': time.time()}
+        self.save_number += 1
+        self.pending.put((entry, values))
+        return path
+
+    def write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item == None:
+                self.pending.task_done()
+                break
+            entry, values = item
+            try:
+                self.write(entry, values)
+            except Exception as e:
+                self.error = e
+            self.pending.task_done()
+
+    def write(self, entry, values):
+        start_time = time.time()
+        self.shadow_sess.run(self.assign_op, feed_dict=dict(zip(self.placeholders, values)))
+        self.saver.save(self.shadow_sess, entry['path'], write_meta_graph=False)
+        if self.config != None:
+            self.config.save(entry['path'])
+        entry['written_time'] = time.time()
+        entry['write_seconds'] = entry['written_time'] - start_time
+
+        self.entries.append(entry)
+        kept_entries = select_checkpoints_to_keep(self.entries, self.keep_last, self.keep_every)
+        for removed_entry in [e for e in self.entries if e not in kept_entries]:
+            for file_path in glob.glob(removed_entry['path'] + '.*'):
+                os.remove(file_path)
+        self.entries = kept_entries
+        self.write_manifest()
+
+    def wait(self):
+        """Block until every queued checkpoint is written
+        """
+        self.pending.join()
+        self.raise_error()
+
+    def raise_error(self):
+        if self.error != None:
+            error = self.error
+            self.error = None
+            raise error
+
+    def latest_checkpoint(self):
+        """Path of the most recent written checkpoint, None if there is none
+        """
+        return self.entries[-1]['path'] if self.entries else None
+
+    def close(self):
+        """Write the queued checkpoints and stop the writer thread
+        """
+        self.pending.put(None)
+        self.thread.join()
+        self.shadow_sess.close()
+        self.raise_error()
@@ -0,0 +1,96 @@
+import numpy as np
+
+from collections import OrderedDict
+
+from game.symmetry_utils import SymmetryUtils
+
+class EvaluationCache():
+    """Bounded least recently used cache in front of any evaluator with a predict(board) method,
+    such as ResNet or the fake nets used in tests. Positions are keyed by the board grid
+    and the player to move, so a repeated position costs a dictionary lookup instead of a nn call.
+    The game history is not part of the key, so the evaluator's output should only depend on the
+    grid and the player, as it does for ResNet.
+    """
+    def __init__(self, nn, max_size=100000, use_symmetry=False):
+        """Initialize the cache
+        Args:
+            nn: the evaluator to cache, it needs predict(board) and board_dimension
+            max_size: maximum number of positions kept before the least recently used one is evicted
+            use_symmetry: True to share one entry between the 8 symmetric versions of a position.
+                The evaluation of the first version seen is reused for the others
+        Fields:
+            self.hits, self.misses, self.evictions: counters since the cache was created
+        """
+        self.nn = nn
+        self.board_dimension = nn.board_dimension
+        self.max_size = max_size
+        self.use_symmetry = use_symmetry
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.weights_version = getattr(nn, 'weights_version', None)
+
+    def invalidate(self):
+        """Drop all cached evaluations, called when the weights of the evaluator change
+        """
+        self.entries.clear()
+
+    def check_weights_version(self):
+        """Invalidate the cache if the evaluator reports new weights through its weights_version field
+        """
+        weights_version = getattr(self.nn, 'weights_version', None)
+        if weights_version != self.weights_version:
+            self.invalidate()
+            self.weights_version = weights_version
+
+    def predict(self, board):
+        """Same as the predict function of the cached evaluator
+        Args:
+            board: current board including the current player and stone distribution
+        Returns:
+            p_dist: the probability distribution dictionary of the next move, a copy owned by the caller
+            v: the value of the board
+        """
+        self.check_weights_version()
+
+        grid = np.asarray(board.board_grid, dtype=np.int8)
+        symmetry = 0
+        if self.use_symmetry:
+            symmetry, grid = SymmetryUtils.canonical_symmetry(grid)
+        key = (grid.tobytes(), board.player)
+
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            canonical_p_dist, v = self.entries[key]
+        else:
+            self.misses += 1
+            p_dist, v = self.nn.predict(board)
+            #Store the policy in the frame of the canonical grid
+            canonical_p_dist = {SymmetryUtils.transform_move(move, symmetry, board.board_dimension): p
+                for (move, p) in p_dist.items()}
+            self.entries[key] = (canonical_p_dist, v)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        if symmetry == 0:
+            return dict(canonical_p_dist), v
+        inverse = SymmetryUtils.inverse_symmetry(symmetry)
+        return {SymmetryUtils.transform_move(move, inverse, board.board_dimension): p
+            for (move, p) in canonical_p_dist.items()}, v
+
+    def get_stats(self):
+        """Report the cache counters
+        Returns:
+            a dictionary with hits, misses, evictions, the current size and the hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'hit_rate': self.hits * 1.0 / lookups if lookups > 0 else 0.0
+        }
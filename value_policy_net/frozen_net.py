@@ -0,0 +1,103 @@
+import tensorflow as tf
+import numpy as np
+
+from value_policy_net.board_encoder import BoardEncoder, board_moves, mask_policy
+from value_policy_net.numpy_net import fold_batch_norm, get_board_dimension, is_fully_convolutional, value_head_scopes
+
+class FrozenNet():
+    """Inference only TensorFlow graph of ResNet. Batch normalization is folded into the convolutions,
+    the weights are constants and there are no loss, summary or optimizer nodes.
+    It lives in its own graph and session and has the predict and predict_batch interface of ResNet.
+    """
+    def __init__(self, weights, board_dimension=None):
+        """Build the frozen graph
+        Args:
+            weights: dictionary of ResNet variable values, from ResNet.get_inference_weights or export_checkpoint
+            board_dimension: default board dimension of a fully convolutional network, which also evaluates
+                boards of other dimensions. Other networks read it from their weights
+        """
+        self.weights = fold_batch_norm(weights)
+        self.fully_convolutional = is_fully_convolutional(self.weights)
+        self.board_dimension = get_board_dimension(self.weights, board_dimension)
+        self.res_block_number = len([name for name in self.weights if name.startswith('res') and name.endswith('res2/kernel')])
+        self.value_head_scopes = value_head_scopes(self.weights)
+        self.moves = board_moves(self.board_dimension)
+        self.encoder = BoardEncoder(self.board_dimension)
+        self.weights_version = 0
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            input_dimension = None if self.fully_convolutional else self.board_dimension
+            self.x = tf.placeholder(tf.float32, [None, input_dimension, input_dimension, 3], name="input")
+            self.yp_, self.yv_ = self.build_network(self.x)
+        self.graph.finalize()
+        self.sess = tf.Session(graph=self.graph)
+
+    def conv(self, x, scope):
+        kernel = tf.constant(self.weights[scope + '/kernel'], dtype=tf.float32)
+        bias = tf.constant(self.weights[scope + '/bias'], dtype=tf.float32)
+        return tf.nn.bias_add(tf.nn.conv2d(x, kernel, strides=[1, 1, 1, 1], padding="SAME"), bias)
+
+    def fully_connected(self, x, scope):
+        weights = tf.constant(self.weights[scope + '/weights'], dtype=tf.float32)
+        biases = tf.constant(self.weights[scope + '/biases'], dtype=tf.float32)
+        return tf.matmul(x, weights) + biases
+
+    def flatten(self, x):
+        return tf.reshape(x, [-1, int(np.prod(x.get_shape().as_list()[1:]))])
+
+    def build_network(self, x):
+        """Same structure as ResNet.build_network
+        Args:
+            x: input placeholder of dimension board_dim*board_dim*3
+        Returns:
+            P, V: output of policy and value heads
+        """
+        A = tf.nn.relu(self.conv(x, 'conv1'))
+        for i in range(self.res_block_number):
+            A1 = tf.nn.relu(self.conv(A, 'res' + str(i) + '/conv1'))
+            A = tf.nn.relu(self.conv(A1, 'res' + str(i) + '/res2') + A)
+
+        ph = tf.nn.relu(self.conv(A, 'policy_head'))
+        if self.fully_convolutional:
+            board_logits = self.conv(ph, 'policy_conv')
+            board_logits = tf.reshape(board_logits, [tf.shape(board_logits)[0], -1])
+            pass_logit = self.fully_connected(tf.reduce_mean(ph, axis=[1, 2]), 'pass_logit')
+            P = tf.nn.softmax(tf.concat([board_logits, pass_logit], axis=1), name="policy")
+        else:
+            P = tf.nn.softmax(self.fully_connected(self.flatten(ph), 'fully_connected'), name="policy")
+
+        vh = tf.nn.relu(self.conv(A, 'value_head'))
+        vh = tf.reduce_mean(vh, axis=[1, 2]) if self.fully_convolutional else self.flatten(vh)
+        for scope in self.value_head_scopes[:-1]:
+            vh = tf.nn.relu(self.fully_connected(vh, scope))
+        V = tf.nn.tanh(self.fully_connected(vh, self.value_head_scopes[-1]), name="value")
+        return P, V
+
+    def predict(self, board):
+        """Given a board. predict (p,v), same as ResNet.predict
+        Args:
+            board: current board including the current player and stone distribution
+        Returns:
+            p_dist: the probability distribution dictionary of the next move, including pass
+            v: the value of the board
+        """
+        p, v = self.predict_batch([board])
+        moves = self.moves if board.board_dimension == self.board_dimension else board_moves(board.board_dimension)
+        return dict(zip(moves, p[0])), v[0]
+
+    def predict_batch(self, boards, legal_mask=None):
+        """Predict (p, v) for several positions with a single session run, same as ResNet.predict_batch
+        Args:
+            boards: a list of boards, or an N x dim x dim x 3 array of encoded input planes
+            legal_mask: optional N x (dim x dim + 1) array, nonzero for legal moves
+        Returns:
+            p: N x (dim x dim + 1) array of move probabilities, pass is the last column
+            v: array of the N values
+        """
+        planes = boards if isinstance(boards, np.ndarray) else self.encoder.encode_boards(boards)
+        p, v = self.sess.run([self.yp_, self.yv_], feed_dict={self.x: planes})
+        return mask_policy(p, legal_mask), v[:, 0]
+
+    def close(self):
+        self.sess.close()
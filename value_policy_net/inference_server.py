@@ -0,0 +1,214 @@
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
+
+from collections import Counter, deque
+
+from value_policy_net.board_encoder import BoardEncoder
+
+class InferenceServer():
+    """Owns one evaluator and serves many searchers. Requests of the clients are gathered into
+    dynamic batches, bounded by max_batch_size and by max_wait seconds after the first request of a batch,
+    and evaluated with a single predict_batch call.
+    Clients are threads of the server's process, or other processes when use_processes is True,
+    in which case the requests and results travel through multiprocessing queues.
+    """
+    def __init__(self, nn, max_batch_size=32, max_wait=0.002, use_processes=False, latency_window=10000,
+                 version_interval=0.1):
+        """Initialize the server, start has to be called before the clients predict
+        Args:
+            nn: the evaluator, it needs predict_batch(planes) and board_dimension, for example ResNet
+            max_batch_size: largest number of positions evaluated together
+            max_wait: seconds a batch waits for more requests after its first request
+            use_processes: True to serve clients living in other processes
+            latency_window: number of recent requests kept for the latency percentiles
+            version_interval: seconds between two checks of the evaluator's weights_version while no request comes
+        Fields:
+            self.weights_version: shared counter incremented when swap_model replaces the evaluator or the
+                evaluator's own weights_version changes, for example after a ModelRegistry reload in place.
+                It is checked before each batch and every version_interval while idle, so client caches can invalidate
+            self.batch_sizes: histogram of the evaluated batch sizes
+            self.errors: number of batches whose evaluation raised
+        """
+        self.nn = nn
+        self.board_dimension = nn.board_dimension
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.use_processes = use_processes
+        self.version_interval = version_interval
+        self.encoder = BoardEncoder(nn.board_dimension, max_batch_size)
+        self.request_queue = multiprocessing.Queue() if use_processes else queue.Queue()
+        self.response_queues = []
+        self.weights_version = multiprocessing.Value('i', 0)
+        self.nn_weights_version = getattr(nn, 'weights_version', None)
+        self.pending_nn = None
+        self.swap_lock = threading.Lock()
+        self.thread = None
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.errors = 0
+
+    def create_client(self):
+        """Create a client with its own result queue. In process mode the clients have to be created
+        before the client processes are started, and passed to them.
+        Returns:
+            an InferenceClient
+        """
+        response_queue = multiprocessing.Queue() if self.use_processes else queue.Queue()
+        self.response_queues.append(response_queue)
+        return InferenceClient(len(self.response_queues) - 1, self.request_queue, response_queue,
+            self.board_dimension, self.weights_version)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving once the requests already queued are answered
+        """
+        if self.thread != None:
+            self.request_queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def swap_model(self, nn):
+        """Replace the evaluator, for example after a new checkpoint was restored.
+        The swap happens between two batches, so no batch mixes the two models.
+        Args:
+            nn: the new evaluator, it needs the same board_dimension
+        """
+        with self.swap_lock:
+            self.pending_nn = nn
+
+    def check_weights_version(self):
+        """Install a model waiting to be swapped in and increment the clients' weights version if the weights changed
+        """
+        with self.swap_lock:
+            swapped = self.pending_nn != None
+            if swapped:
+                self.nn = self.pending_nn
+                self.pending_nn = None
+        nn_weights_version = getattr(self.nn, 'weights_version', None)
+        if swapped or nn_weights_version != self.nn_weights_version:
+            self.nn_weights_version = nn_weights_version
+            with self.weights_version.get_lock():
+                self.weights_version.value += 1
+
+    def serve(self):
+        stopping = False
+        while not stopping:
+            try:
+                request = self.request_queue.get(timeout=self.version_interval)
+            except queue.Empty:
+                self.check_weights_version()
+                continue
+            if request == None:
+                break
+            batch = [request]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    request = self.request_queue.get(timeout=max(0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if request == None:
+                    stopping = True
+                    break
+                batch.append(request)
+            try:
+                self.evaluate_batch(batch)
+            except Exception as error:
+                #The clients of the batch get the error instead of waiting forever, the server keeps serving
+                self.send_error(batch, error)
+
+    def send_error(self, batch, error):
+        """Answer every request of a failed batch with an error marker, the clients raise it
+        Args:
+            batch: list of (client_id, grid, player, submit_time) requests
+            error: the exception raised while evaluating the batch
+        """
+        message = type(error).__name__ + ': ' + str(error)
+        for (client_id, _, _, _) in batch:
+            self.response_queues[client_id].put((None, message))
+        self.errors += 1
+
+    def evaluate_batch(self, batch):
+        """Evaluate a batch of requests and send each result to its client
+        Args:
+            batch: list of (client_id, grid, player, submit_time) requests
+        """
+        self.check_weights_version()
+
+        grids = np.array([request[1] for request in batch], dtype=np.int8)
+        players = np.array([request[2] for request in batch], dtype=np.float32)
+        p, v = self.nn.predict_batch(self.encoder.encode(grids, players))
+
+        finish_time = time.time()
+        for (i, (client_id, _, _, submit_time)) in enumerate(batch):
+            self.response_queues[client_id].put((np.asarray(p[i]), float(v[i])))
+            self.latencies.append(finish_time - submit_time)
+        self.batch_sizes[len(batch)] += 1
+        self.requests += len(batch)
+
+    def get_stats(self):
+        """Report the serving statistics
+        Returns:
+            a dictionary with the queue depth, the number of requests, batches and failed batches, the batch size histogram,
+            the mean batch size and the 50th, 90th and 99th latency percentiles in seconds
+        """
+        try:
+            queue_depth = self.request_queue.qsize()
+        except NotImplementedError: #multiprocessing queues on macOS
+            queue_depth = None
+        batches = sum(self.batch_sizes.values())
+        latencies = list(self.latencies)
+        stats = {
+            'queue_depth': queue_depth,
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': batches,
+            'batch_sizes': dict(self.batch_sizes),
+            'mean_batch_size': self.requests * 1.0 / batches if batches > 0 else 0.0
+        }
+        for percentile in [50, 90, 99]:
+            stats['latency_p' + str(percentile)] = float(np.percentile(latencies, percentile)) if latencies else 0.0
+        return stats
+
+class InferenceClient():
+    """Evaluator used by a searcher, it sends its positions to an InferenceServer.
+    It has the same predict interface as ResNet, so it can be used by MCTS or wrapped by an EvaluationCache.
+    """
+    def __init__(self, client_id, request_queue, response_queue, board_dimension, weights_version):
+        self.client_id = client_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.board_dimension = board_dimension
+        self.shared_weights_version = weights_version
+        self.moves = [(r, c) for r in range(board_dimension) for c in range(board_dimension)] + [(-1, -1)]
+
+    @property
+    def weights_version(self):
+        return self.shared_weights_version.value
+
+    def predict(self, board, timeout=None):
+        """Given a board. predict (p,v) with the server's evaluator, blocking until the result arrives
+        Args:
+            board: current board including the current player and stone distribution
+            timeout: seconds to wait for the result, None to wait as long as the server takes
+        Returns:
+            p_dist: the probability distribution dictionary of the next move, including pass
+            v: the value of the board
+        Raises:
+            RuntimeError if the server failed to evaluate the batch of the request
+            queue.Empty if no result arrived within timeout
+        """
+        grid = np.asarray(board.board_grid, dtype=np.int8)
+        self.request_queue.put((self.client_id, grid, board.player, time.time()))
+        p, v = self.response_queue.get(timeout=timeout)
+        if p is None:
+            raise RuntimeError("The inference server failed to evaluate the position, " + v)
+        return dict(zip(self.moves, p)), v
@@ -0,0 +1,129 @@
+import threading
+import tensorflow as tf
+import numpy as np
+
+def write_shard(path, planes, labels_p, labels_v):
+    """Write precomputed training samples into a TFRecord shard
+    Args:
+        path: file to write
+        planes: N x dim x dim x 3 input planes, for example from BoardEncoder
+        labels_p: N x (dim x dim + 1) policy labels
+        labels_v: N x 1 value labels
+    """
+    planes = np.asarray(planes, dtype=np.float32)
+    labels_p = np.asarray(labels_p, dtype=np.float32)
+    labels_v = np.asarray(labels_v, dtype=np.float32).reshape(-1, 1)
+    with tf.python_io.TFRecordWriter(path) as writer:
+        for i in range(len(planes)):
+            example = tf.train.Example(features=tf.train.Features(feature={
+                'planes': tf.train.Feature(bytes_list=tf.train.BytesList(value=[planes[i].tobytes()])),
+                'policy': tf.train.Feature(bytes_list=tf.train.BytesList(value=[labels_p[i].tobytes()])),
+                'value': tf.train.Feature(bytes_list=tf.train.BytesList(value=[labels_v[i].tobytes()]))
+            }))
+            writer.write(example.SerializeToString())
+
+def augment(x, yp, yv, board_dimension):
+    """Apply one of the 8 symmetries of the board, drawn at random, to a sample.
+    The board part of the policy is transformed with the planes, pass is unchanged.
+    """
+    rotations = tf.random_uniform([], 0, 4, dtype=tf.int32)
+    flip = tf.random_uniform([]) < 0.5
+    board_p = tf.reshape(yp[:-1], [board_dimension, board_dimension, 1])
+
+    x = tf.image.rot90(x, rotations)
+    board_p = tf.image.rot90(board_p, rotations)
+    x = tf.cond(flip, lambda: tf.image.flip_left_right(x), lambda: x)
+    board_p = tf.cond(flip, lambda: tf.image.flip_left_right(board_p), lambda: board_p)
+
+    yp = tf.concat([tf.reshape(board_p, [-1]), yp[-1:]], axis=0)
+    return x, yp, yv
+
+def prepare_dataset(dataset, board_dimension, batch_size, shuffle_buffer, use_augmentation, repeat,
+                    num_parallel_calls, prefetch_batches):
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer)
+    if repeat:
+        dataset = dataset.repeat()
+    if use_augmentation:
+        dataset = dataset.map(lambda x, yp, yv: augment(x, yp, yv, board_dimension), num_parallel_calls=num_parallel_calls)
+    dataset = dataset.batch(batch_size, drop_remainder=True)
+    #Batches are prepared while the optimizer runs on the previous ones
+    return dataset.prefetch(prefetch_batches)
+
+def dataset_from_arrays(planes, labels_p, labels_v, batch_size=256, shuffle_buffer=25000, use_augmentation=True,
+                        repeat=True, num_parallel_calls=4, prefetch_batches=2):
+    """Training dataset over samples held in memory
+    Args:
+        planes: N x dim x dim x 3 input planes
+        labels_p: N x (dim x dim + 1) policy labels
+        labels_v: N x 1 value labels
+        batch_size: number of samples in a batch, the last incomplete batch is dropped
+        shuffle_buffer: number of samples shuffled together, None or 0 to keep the order
+        use_augmentation: True to apply a random board symmetry to each sample
+        repeat: True to cycle over the samples forever
+        num_parallel_calls: number of samples parsed and augmented in parallel
+        prefetch_batches: number of batches prepared ahead of the training step
+    Returns:
+        a tf.data.Dataset of (x, yp, yv) batches
+    """
+    planes = np.asarray(planes, dtype=np.float32)
+    dataset = tf.data.Dataset.from_tensor_slices((planes, np.asarray(labels_p, dtype=np.float32),
+        np.asarray(labels_v, dtype=np.float32).reshape(-1, 1)))
+    return prepare_dataset(dataset, planes.shape[1], batch_size, shuffle_buffer, use_augmentation, repeat,
+        num_parallel_calls, prefetch_batches)
+
+def dataset_from_shards(paths, board_dimension, batch_size=256, shuffle_buffer=25000, use_augmentation=True,
+                        repeat=True, num_parallel_calls=4, prefetch_batches=2):
+    """Training dataset streaming the samples of TFRecord shards written by write_shard.
+    Shards are read, parsed and augmented in parallel by the TensorFlow runtime.
+    Args:
+        paths: list of shard files
+        board_dimension: dimension of the boards stored in the shards
+        the other arguments are the same as dataset_from_arrays
+    Returns:
+        a tf.data.Dataset of (x, yp, yv) batches
+    """
+    features = {
+        'planes': tf.FixedLenFeature([], tf.string),
+        'policy': tf.FixedLenFeature([], tf.string),
+        'value': tf.FixedLenFeature([], tf.string)
+    }
+    def parse(serialized):
+        example = tf.parse_single_example(serialized, features)
+        x = tf.reshape(tf.decode_raw(example['planes'], tf.float32), [board_dimension, board_dimension, 3])
+        yp = tf.reshape(tf.decode_raw(example['policy'], tf.float32), [board_dimension * board_dimension + 1])
+        yv = tf.reshape(tf.decode_raw(example['value'], tf.float32), [1])
+        return x, yp, yv
+
+    dataset = tf.data.TFRecordDataset(paths, num_parallel_reads=min(len(paths), num_parallel_calls))
+    dataset = dataset.map(parse, num_parallel_calls=num_parallel_calls)
+    return prepare_dataset(dataset, board_dimension, batch_size, shuffle_buffer, use_augmentation, repeat,
+        num_parallel_calls, prefetch_batches)
+
+def dataset_from_replay_buffer(replay_buffer, batch_size, lock=None, prefetch_batches=1):
+    """Endless training dataset of batches drawn from a ReplayBuffer.
+    The next batch is sampled and encoded by the TensorFlow runtime while the optimizer runs on the current one.
+    Args:
+        replay_buffer: the ReplayBuffer, it has to hold at least batch_size samples
+        batch_size: number of samples in a batch
+        lock: optional lock also held while samples are added, so a batch never mixes old and new samples
+        prefetch_batches: number of batches prepared ahead of the training step. Samples added since a batch
+            was prepared are only seen by the next ones
+    Returns:
+        a tf.data.Dataset of (x, yp, yv) batches
+    """
+    if lock == None:
+        lock = threading.Lock()
+
+    def generate_batches():
+        while True:
+            with lock:
+                planes, labels_p, labels_v = replay_buffer.sample(batch_size)
+                #The planes are a view of the encoder buffer, the next sample overwrites them
+                planes = planes.copy()
+            yield planes, labels_p, labels_v
+
+    dimension = replay_buffer.board_dimension
+    dataset = tf.data.Dataset.from_generator(generate_batches, (tf.float32, tf.float32, tf.float32),
+        ([batch_size, dimension, dimension, 3], [batch_size, dimension * dimension + 1], [batch_size, 1]))
+    return dataset.prefetch(prefetch_batches)
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+
+from value_policy_net.network_config import NetworkConfig
+
+def read_latest_checkpoint(directory):
+    """Latest checkpoint listed in the manifest.json written by CheckpointManager
+    Returns:
+        the checkpoint path, None if the directory has no manifest or no checkpoint
+    """
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)['latest']
+
+class RegisteredModel():
+    """A model loaded by ModelRegistry
+    Fields:
+        self.nn: the evaluator, a ResNet by default
+        self.model_path: checkpoint the weights come from
+        self.last_used: clock time of the last get
+    """
+    def __init__(self, nn, model_path, last_used):
+        self.nn = nn
+        self.model_path = model_path
+        self.last_used = last_used
+
+class ModelRegistry():
+    """Keeps several checkpoints loaded in one process, each network in its own graph and session.
+    All the sessions share the TensorFlow runtime of the process. A model is built once and reused by
+    every caller asking for its name, reload swaps its weights to a newer checkpoint without rebuilding
+    the graph, and models that were not used for idle_seconds are closed.
+    Reloading replaces the variables in place under the weights lock of the res net, so predictions running
+    at the same time see either the old or the new weights.
+    Evicted and rebuilt models are closed, so long running callers ask for their model with get before each use
+    instead of keeping it, as AlphaGoZero does. Asking also marks the model as used, so it is not idle while it plays.
+    """
+    def __init__(self, idle_seconds=600, max_models=None, inference_only=True, session_config=None, clock=time.monotonic):
+        """Initialize an empty registry
+        Args:
+            idle_seconds: models unused for longer are evicted, None to keep them until they are unloaded
+            max_models: number of models kept loaded, the least recently used one is evicted beyond it.
+                None for no limit
+            inference_only: True to build the res nets without their training operations
+            session_config: optional tf.ConfigProto of the sessions, for example to bound the thread pools
+            clock: function returning the current time in seconds
+        Fields:
+            self.models: dictionary from name to RegisteredModel
+            self.loads, self.reloads, self.evictions: counters since the registry was created
+        """
+        self.idle_seconds = idle_seconds
+        self.max_models = max_models
+        self.inference_only = inference_only
+        self.session_config = session_config
+        self.clock = clock
+        self.models = {}
+        self.lock = threading.RLock()
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def __contains__(self, name):
+        return name in self.models
+
+    def __len__(self):
+        return len(self.models)
+
+    def build_model(self, model_path):
+        """Build a res net in a new graph and session and restore a checkpoint into it
+        """
+        import tensorflow as tf
+        from value_policy_net.resnet import ResNet
+
+        graph = tf.Graph()
+        with graph.as_default():
+            sess = tf.Session(graph=graph, config=self.session_config)
+            with sess.as_default():
+                return ResNet(model_path=model_path, restored=True, inference_only=self.inference_only)
+
+    def restore_model(self, nn, model_path):
+        """Load a checkpoint into an already built model
+        Returns:
+            True if the weights were restored in place, False if the checkpoint needs another architecture
+        """
+        config = NetworkConfig.load(model_path)
+        if config != None and config != nn.config:
+            return False
+        nn.restore(model_path)
+        return True
+
+    def close_model(self, nn):
+        #Predictions already running finish before the session is closed
+        with nn.weights_lock:
+            nn.sess.close()
+            if nn.frozen_net != None:
+                nn.frozen_net.close()
+
+    def load(self, name, model_path):
+        """Load a checkpoint under a name, a model already loaded under that name is reloaded instead
+        Args:
+            name: name the model is asked for with get, for example 'best' or 'batch_1920'
+            model_path: checkpoint path
+        Returns:
+            the loaded evaluator
+        """
+        with self.lock:
+            if name in self.models:
+                return self.reload(name, model_path)
+            nn = self.build_model(model_path)
+            self.loads += 1
+            self.models[name] = RegisteredModel(nn, model_path, self.clock())
+            self.evict()
+            return nn
+
+    def get(self, name, model_path=None):
+        """Evaluator loaded under a name
+        Args:
+            name: name of the model
+            model_path: checkpoint loaded if the model is not loaded yet, None to raise instead
+        Returns:
+            the evaluator
+        Raises:
+            ValueError if the model is not loaded and no model_path is given
+        """
+        with self.lock:
+            if name not in self.models:
+                if model_path == None:
+                    raise ValueError("No model is loaded under the name " + str(name))
+                return self.load(name, model_path)
+            model = self.models[name]
+            model.last_used = self.clock()
+            self.evict()
+            return model.nn
+
+    def reload(self, name, model_path):
+        """Swap a loaded model to another checkpoint. The weights are restored into the existing graph when
+        the architecture is the same, otherwise the model is rebuilt. weights_version changes either way,
+        so evaluation caches and inference servers in front of the model see new weights
+        Returns:
+            the evaluator holding the new weights, the same object unless it was rebuilt
+        """
+        with self.lock:
+            model = self.models[name]
+            if not self.restore_model(model.nn, model_path):
+                #The new model is ready before the old one is closed
+                old_nn = model.nn
+                model.nn = self.build_model(model_path)
+                model.nn.weights_version = old_nn.weights_version + 1
+                self.close_model(old_nn)
+            self.reloads += 1
+            model.model_path = model_path
+            model.last_used = self.clock()
+            return model.nn
+
+    def reload_latest(self, name, directory):
+        """Reload a model to the latest checkpoint written by a CheckpointManager into directory
+        Returns:
+            True if a newer checkpoint was loaded
+        """
+        with self.lock:
+            model_path = read_latest_checkpoint(directory)
+            if model_path == None or model_path == self.models[name].model_path:
+                return False
+            self.reload(name, model_path)
+            return True
+
+    def unload(self, name):
+        """Close a model and release its graph
+        """
+        with self.lock:
+            model = self.models.pop(name)
+            self.close_model(model.nn)
+
+    def evict(self):
+        """Close the models idle for longer than idle_seconds and the least recently used ones beyond max_models
+        Returns:
+            names of the evicted models
+        """
+        with self.lock:
+            now = self.clock()
+            evicted = [name for (name, model) in self.models.items()
+                if self.idle_seconds != None and now - model.last_used > self.idle_seconds]
+            remaining = sorted([name for name in self.models if name not in evicted], key=lambda name: self.models[name].last_used)
+            if self.max_models != None and len(remaining) > self.max_models:
+                evicted += remaining[:len(remaining) - self.max_models]
+            for name in evicted:
+                self.unload(name)
+            self.evictions += len(evicted)
+            return evicted
+
+    def close(self):
+        """Close every model
+        """
+        with self.lock:
+            for name in list(self.models):
+                self.unload(name)
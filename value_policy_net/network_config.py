@@ -0,0 +1,88 @@
+import json
+import os
+
+class NetworkConfig():
+    """Architecture of the policy value res net. It is saved as JSON next to each checkpoint,
+    so a model is restored with the architecture it was trained with.
+    """
+    FIELDS = ('board_dimension', 'input_planes', 'filters', 'residual_blocks',
+              'policy_head_filters', 'value_head_filters', 'value_head_units', 'value_head_layers', 'l2_beta',
+              'fully_convolutional')
+
+    def __init__(self, board_dimension=5, input_planes=3, filters=64, residual_blocks=3,
+                 policy_head_filters=2, value_head_filters=1, value_head_units=256, value_head_layers=2, l2_beta=0.0001,
+                 fully_convolutional=False):
+        """Initialize an architecture, the defaults are the original network
+        Args:
+            board_dimension: dimension of the go board
+            input_planes: number of input planes. BoardEncoder produces 3 and ResNet raises ValueError for
+                any other number, the field records the input format of a checkpoint
+            filters: number of filters of the convolutions of the residual tower
+            residual_blocks: number of residual blocks after the first convolution
+            policy_head_filters: filters of the 1x1 convolution of the policy head
+            value_head_filters: filters of the 1x1 convolution of the value head
+            value_head_units: units of the fully connected layers of the value head
+            value_head_layers: number of hidden fully connected layers of the value head
+            l2_beta: constant used for l2 regularization
+            fully_convolutional: True for heads without fully connected layers over the board.
+                The policy head is a 1x1 convolution plus a pass logit from global pooling, the value head
+                pools its convolution before the fully connected layers, so the same weights play any board dimension.
+                These heads see pooled features, so they need more head filters than the original ones
+        """
+        self.board_dimension = board_dimension
+        self.input_planes = input_planes
+        self.filters = filters
+        self.residual_blocks = residual_blocks
+        self.policy_head_filters = policy_head_filters
+        self.value_head_filters = value_head_filters
+        self.value_head_units = value_head_units
+        self.value_head_layers = value_head_layers
+        self.l2_beta = l2_beta
+        self.fully_convolutional = fully_convolutional
+        for field in NetworkConfig.FIELDS:
+            if field in ('l2_beta', 'fully_convolutional'):
+                continue
+            #The network can have no residual block and no hidden value layer, but every layer needs a unit
+            smallest_value = 0 if field in ('residual_blocks', 'value_head_layers') else 1
+            if not isinstance(getattr(self, field), int) or getattr(self, field) < smallest_value:
+                raise ValueError(field + " has to be an integer of at least " + str(smallest_value))
+
+    def __eq__(self, other):
+        return isinstance(other, NetworkConfig) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return "NetworkConfig(" + ", ".join([field + "=" + str(getattr(self, field)) for field in NetworkConfig.FIELDS]) + ")"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in NetworkConfig.FIELDS}
+
+    @staticmethod
+    def from_dict(values):
+        unknown_fields = set(values) - set(NetworkConfig.FIELDS)
+        if unknown_fields:
+            raise ValueError("Unknown network config fields: " + str(sorted(unknown_fields)))
+        return NetworkConfig(**values)
+
+    @staticmethod
+    def config_path(model_path):
+        """Path of the config saved next to a checkpoint
+        """
+        return model_path + '.config.json'
+
+    def save(self, model_path):
+        """Write the config next to the checkpoint saved at model_path
+        """
+        with open(NetworkConfig.config_path(model_path), 'w') as config_file:
+            json.dump(self.to_dict(), config_file, indent=2)
+
+    @staticmethod
+    def load(model_path):
+        """Read the config saved next to a checkpoint
+        Returns:
+            the NetworkConfig, None if the checkpoint has no config, as the ones saved before configs existed
+        """
+        path = NetworkConfig.config_path(model_path)
+        if not os.path.exists(path):
+            return None
+        with open(path) as config_file:
+            return NetworkConfig.from_dict(json.load(config_file))
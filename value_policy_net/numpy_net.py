@@ -0,0 +1,195 @@
+import sys
+import numpy as np
+
+from value_policy_net.board_encoder import BoardEncoder, board_moves, mask_policy
+
+#Epsilon of tf.layers.batch_normalization
+BATCH_NORM_EPSILON = 1e-3
+
+def export_checkpoint(model_path, output_path):
+    """Read the weights of a ResNet checkpoint and write them into a compressed npz file.
+    Only the weights used for inference are kept, optimizer slots and counters are dropped.
+    This is the only function of the module that needs TensorFlow.
+    Args:
+        model_path: path of the checkpoint, for example models/batch_1920
+        output_path: path of the npz file to write
+    Returns:
+        list of the exported variable names
+    """
+    import tensorflow as tf
+
+    reader = tf.train.NewCheckpointReader(model_path)
+    names = [name for name in reader.get_variable_to_shape_map() if is_inference_variable(name)]
+    np.savez_compressed(output_path, **{name: reader.get_tensor(name) for name in names})
+    return sorted(names)
+
+def is_inference_variable(name):
+    """True for the variables of the network itself, False for optimizer slots and counters
+    """
+    return not name.startswith('train') and not name.startswith('loss') and 'Adam' not in name
+
+def fold_batch_norm(weights):
+    """Fold the inference mode batch normalization that follows each convolution into the convolution,
+    so a conv block becomes a single convolution with a bias
+    Args:
+        weights: dictionary of ResNet variable values, as written by export_checkpoint
+    Returns:
+        dictionary where each conv scope has scope/kernel and scope/bias, the fully connected weights are unchanged
+    """
+    folded = {}
+    for (name, value) in weights.items():
+        if name.endswith('/conv2d/kernel'):
+            scope = name[:-len('/conv2d/kernel')]
+            if scope + '/batch_normalization/gamma' not in weights:
+                #Convolution without batch normalization, the logits of the fully convolutional policy head
+                folded[scope + '/kernel'] = value
+                folded[scope + '/bias'] = weights[scope + '/conv2d/bias']
+                continue
+            scale = weights[scope + '/batch_normalization/gamma'] / np.sqrt(
+                weights[scope + '/batch_normalization/moving_variance'] + BATCH_NORM_EPSILON)
+            folded[scope + '/kernel'] = value * scale
+            folded[scope + '/bias'] = (weights[scope + '/conv2d/bias'] - weights[scope + '/batch_normalization/moving_mean']) * scale \
+                + weights[scope + '/batch_normalization/beta']
+        elif name.startswith('fully_connected') or name.startswith('pass_logit'):
+            folded[name] = value
+    return folded
+
+def is_fully_convolutional(weights):
+    """True for the weights of a network built with NetworkConfig.fully_convolutional
+    """
+    return any([name.startswith('pass_logit/') for name in weights])
+
+def get_board_dimension(weights, board_dimension):
+    """Board dimension an evaluator plays by default.
+    The weights of the fully connected policy head fix it, a fully convolutional network needs it given
+    """
+    if not is_fully_convolutional(weights):
+        return int(round((weights['fully_connected/weights'].shape[1] - 1) ** 0.5))
+    if board_dimension == None:
+        raise ValueError("The board dimension has to be given for a fully convolutional network")
+    return board_dimension
+
+def value_head_scopes(weights):
+    """Scopes of the fully connected layers of the value head, the last one outputs the value.
+    tf.contrib.layers names them fully_connected_1, fully_connected_2, ... after the policy layer.
+    """
+    scopes = set(name.split('/')[0] for name in weights if name.startswith('fully_connected_'))
+    return sorted(scopes, key=lambda scope: int(scope.split('_')[-1]))
+
+def conv2d_same(x, kernel, bias):
+    """Stride 1 convolution with SAME padding
+    Args:
+        x: N x H x W x C_in input
+        kernel: K x K x C_in x C_out kernel, K odd
+        bias: C_out bias
+    Returns:
+        N x H x W x C_out output
+    """
+    size = kernel.shape[0]
+    pad = size // 2
+    board_number, height, width, channels = x.shape
+    if pad == 0:
+        patches = x
+    else:
+        padded = np.zeros((board_number, height + 2 * pad, width + 2 * pad, channels), dtype=x.dtype)
+        padded[:, pad:pad + height, pad:pad + width] = x
+        #N x H x W x (K x K x C_in) patches, in the order of the kernel rows, so the convolution is one matrix product.
+        #The boards are small, a single BLAS call beats einsum and its per call overhead
+        patches = np.concatenate([padded[:, i:i + height, j:j + width] for i in range(size) for j in range(size)], axis=3)
+    Z = np.matmul(patches.reshape(board_number * height * width, -1), kernel.reshape(size * size * channels, -1))
+    Z += bias
+    return Z.reshape(board_number, height, width, -1)
+
+def relu(x):
+    return np.maximum(x, 0)
+
+class NumpyNet():
+    """TensorFlow free forward pass of ResNet, using weights exported by export_checkpoint.
+    It has the predict and predict_batch interface of ResNet, so play and evaluation can use it
+    without building the training graph. Batch normalization is folded into the convolutions when loading.
+    """
+    def __init__(self, weights_path, board_dimension=None):
+        """Load the exported weights
+        Args:
+            weights_path: npz file written by export_checkpoint
+            board_dimension: default board dimension of a fully convolutional network, which also evaluates
+                boards of other dimensions. Other networks read it from their weights
+        """
+        with np.load(weights_path) as weights:
+            self.weights = fold_batch_norm({name: weights[name].astype(np.float32) for name in weights.files})
+        self.fully_convolutional = is_fully_convolutional(self.weights)
+        self.board_dimension = get_board_dimension(self.weights, board_dimension)
+        self.res_block_number = len([name for name in self.weights if name.startswith('res') and name.endswith('res2/kernel')])
+        self.value_head_scopes = value_head_scopes(self.weights)
+        self.moves = board_moves(self.board_dimension)
+        self.encoder = BoardEncoder(self.board_dimension)
+        self.weights_version = 0
+
+    def conv(self, x, scope):
+        """Convolution with its batch normalization folded in
+        """
+        return conv2d_same(x, self.weights[scope + '/kernel'], self.weights[scope + '/bias'])
+
+    def fully_connected(self, x, scope, activation=True):
+        Z = np.dot(x, self.weights[scope + '/weights']) + self.weights[scope + '/biases']
+        return relu(Z) if activation else Z
+
+    def forward(self, planes):
+        """Run the network
+        Args:
+            planes: N x dim x dim x 3 input planes
+        Returns:
+            p: N x (dim x dim + 1) move probabilities
+            v: N values
+        """
+        A = relu(self.conv(planes, 'conv1'))
+        for i in range(self.res_block_number):
+            A1 = relu(self.conv(A, 'res' + str(i) + '/conv1'))
+            A = relu(self.conv(A1, 'res' + str(i) + '/res2') + A)
+
+        board_number = len(planes)
+        ph = relu(self.conv(A, 'policy_head'))
+        if self.fully_convolutional:
+            board_logits = self.conv(ph, 'policy_conv').reshape(board_number, -1)
+            pass_logit = self.fully_connected(ph.mean(axis=(1, 2)), 'pass_logit', activation=False)
+            p_logits = np.concatenate([board_logits, pass_logit], axis=1)
+        else:
+            p_logits = self.fully_connected(ph.reshape(board_number, -1), 'fully_connected', activation=False)
+        p = np.exp(p_logits - p_logits.max(axis=1, keepdims=True))
+        p = p / p.sum(axis=1, keepdims=True)
+
+        vh = relu(self.conv(A, 'value_head'))
+        vh = vh.mean(axis=(1, 2)) if self.fully_convolutional else vh.reshape(board_number, -1)
+        for scope in self.value_head_scopes[:-1]:
+            vh = self.fully_connected(vh, scope)
+        v = np.tanh(self.fully_connected(vh, self.value_head_scopes[-1], activation=False))
+        return p, v[:, 0]
+
+    def predict(self, board):
+        """Given a board. predict (p,v), same as ResNet.predict
+        Args:
+            board: current board including the current player and stone distribution
+        Returns:
+            p_dist: the probability distribution dictionary of the next move, including pass
+            v: the value of the board
+        """
+        p, v = self.predict_batch([board])
+        moves = self.moves if board.board_dimension == self.board_dimension else board_moves(board.board_dimension)
+        return dict(zip(moves, p[0])), v[0]
+
+    def predict_batch(self, boards, legal_mask=None):
+        """Predict (p, v) for several positions, same as ResNet.predict_batch
+        Args:
+            boards: a list of boards, or an N x dim x dim x 3 array of encoded input planes
+            legal_mask: optional N x (dim x dim + 1) array, nonzero for legal moves
+        Returns:
+            p: N x (dim x dim + 1) array of move probabilities, pass is the last column
+            v: array of the N values
+        """
+        planes = boards if isinstance(boards, np.ndarray) else self.encoder.encode_boards(boards)
+        p, v = self.forward(planes)
+        return mask_policy(p, legal_mask), v
+
+if __name__ == '__main__':
+    #python -m value_policy_net.numpy_net models/batch_1920 models/batch_1920.npz
+    print(export_checkpoint(sys.argv[1], sys.argv[2]))
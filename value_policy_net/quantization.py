@@ -0,0 +1,182 @@
+import json
+import os
+import sys
+import numpy as np
+
+from self_play.replay_buffer import PersistentReplayBuffer
+from value_policy_net.numpy_net import NumpyNet
+
+PRECISIONS = ('int8', 'float16')
+
+def quantize_per_channel(weights):
+    """Symmetric int8 quantization with one scale per output channel, the last axis
+    Args:
+        weights: float kernel or fully connected weight matrix
+    Returns:
+        (quantized, scales): int8 array of the shape of weights and the float32 scale of each output channel,
+        weights is approximately quantized * scales
+    """
+    max_abs = np.abs(weights).reshape(-1, weights.shape[-1]).max(axis=0)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    quantized = np.clip(np.round(weights / scales), -127, 127).astype(np.int8)
+    return quantized, scales
+
+def fake_quantize(x, scale):
+    """Round activations to the int8 grid of scale and back to float, as an int8 kernel would see them
+    """
+    return np.clip(np.round(x / scale), -127, 127) * scale
+
+def round_to_float16(x):
+    """Round float32 values to the 10 bit mantissa of float16 and keep them in float32.
+    It works on the bits of the float32 values, much faster than converting to float16 and back.
+    Ties round away from zero, and values beyond the float16 range are not clipped
+    """
+    bits = np.ascontiguousarray(x, dtype=np.float32).view(np.uint32) + np.uint32(0x1000)
+    bits &= np.uint32(0xFFFFE000)
+    return bits.view(np.float32)
+
+class QuantizationSimulator(NumpyNet):
+    """Accuracy simulator of a reduced precision network, it is not a faster or smaller way to play.
+        int8: weights are rounded to int8 with per channel scales. After calibrate, the inputs of each
+            convolution and fully connected layer are also rounded to int8 with per layer scales
+        float16: weights and the activations between layers are rounded to float16
+    NumPy has no int8 or float16 kernels faster than its float32 ones, so the rounded weights are kept in float32
+    and the layers run in float32 on the rounded values. The simulator predicts what a reduced precision network
+    would, at the speed and memory of NumpyNet. Use accuracy_report to measure the cost against the float32
+    network before deploying to a runtime with reduced precision kernels, and get_quantized_bytes for the size
+    the weights would have there.
+    """
+    def __init__(self, weights_path, precision='int8', board_dimension=None):
+        """Load and quantize the exported weights
+        Args:
+            weights_path: npz file written by export_checkpoint
+            precision: 'int8' or 'float16'
+            board_dimension: default board dimension of a fully convolutional network, see NumpyNet
+        Fields:
+            self.quantized_bytes: bytes of each kernel and weight matrix in reduced precision, with its scales
+            self.activation_scales: int8 scale of the input of each layer, empty until calibrate is called
+        """
+        if precision not in PRECISIONS:
+            raise ValueError("Unknown precision: " + str(precision))
+        super(QuantizationSimulator, self).__init__(weights_path, board_dimension)
+        self.precision = precision
+        self.activation_scales = {}
+        self.activation_ranges = None
+
+        #Only the rounded float32 weights are kept, the int8 and float16 arrays are dropped after rounding
+        self.quantized_bytes = {}
+        for (name, value) in self.weights.items():
+            if name.endswith('kernel') or name.endswith('weights'):
+                if precision == 'int8':
+                    quantized, scales = quantize_per_channel(value)
+                    self.weights[name] = quantized.astype(np.float32) * scales
+                    self.quantized_bytes[name] = quantized.nbytes + scales.nbytes
+                else:
+                    quantized = value.astype(np.float16)
+                    self.weights[name] = quantized.astype(np.float32)
+                    self.quantized_bytes[name] = quantized.nbytes
+        #Biases stay in float32, they are added to the accumulator
+
+    def get_memory_bytes(self):
+        """Bytes of the weights the simulator holds, all float32 like NumpyNet
+        """
+        return sum([value.nbytes for value in self.weights.values()])
+
+    def get_quantized_bytes(self):
+        """Bytes the weights would take in reduced precision, with their scales and the float32 biases
+        """
+        size = sum([value.nbytes for (name, value) in self.weights.items() if name not in self.quantized_bytes])
+        return size + sum(self.quantized_bytes.values())
+
+    def calibrate(self, planes):
+        """Choose the int8 activation scale of each layer from the largest input it receives on sample positions,
+        for example positions stored from self play
+        Args:
+            planes: N x dim x dim x 3 input planes of the calibration positions
+        """
+        self.activation_scales = {}
+        self.activation_ranges = {}
+        self.forward(planes)
+        self.activation_scales = {name: max(value, 1e-8) / 127.0 for (name, value) in self.activation_ranges.items()}
+        self.activation_ranges = None
+
+    def layer_input(self, x, name):
+        if self.activation_ranges != None:
+            self.activation_ranges[name] = max(self.activation_ranges.get(name, 0.0), float(np.abs(x).max()))
+        if self.precision == 'float16':
+            return round_to_float16(x)
+        if name in self.activation_scales:
+            return fake_quantize(x, self.activation_scales[name])
+        return x
+
+    def conv(self, x, scope):
+        return super(QuantizationSimulator, self).conv(self.layer_input(x, scope + '/kernel'), scope)
+
+    def fully_connected(self, x, scope, activation=True):
+        return super(QuantizationSimulator, self).fully_connected(self.layer_input(x, scope + '/weights'), scope, activation)
+
+def load_replay_planes(directory, count, seed=None):
+    """Input planes of self play positions stored in a PersistentReplayBuffer, to calibrate and measure on
+    the positions the network actually plays
+    Args:
+        directory: directory of the replay buffer
+        count: number of positions drawn, at most the number of positions stored
+        seed: seed of the random draw
+    Returns:
+        N x dim x dim x 3 input planes
+    """
+    with open(os.path.join(directory, 'header.json')) as header_file:
+        header = json.load(header_file)
+    replay_buffer = PersistentReplayBuffer(directory, header['capacity'], header['board_dimension'], seed=seed,
+        read_only=True)
+    planes = replay_buffer.get_samples(replay_buffer.sample_indices(min(count, len(replay_buffer))))[0].copy()
+    replay_buffer.close()
+    return planes
+
+def accuracy_report(reference_nn, nn, planes):
+    """Compare a reduced precision network with the float32 network
+    Args:
+        reference_nn: the float32 evaluator, for example NumpyNet
+        nn: the evaluator to measure, for example QuantizationSimulator
+        planes: N x dim x dim x 3 input planes of the test positions
+    Returns:
+        a dictionary with the mean and max KL divergence of the policies, the mean and max absolute value error
+        and the share of positions where both networks have the same most likely move
+    """
+    reference_p, reference_v = reference_nn.predict_batch(planes)
+    p, v = nn.predict_batch(planes)
+    kl = (reference_p * (np.log(reference_p + 1e-12) - np.log(p + 1e-12))).sum(axis=1)
+    value_error = np.abs(reference_v - v)
+    return {
+        'policy_kl_mean': float(kl.mean()),
+        'policy_kl_max': float(kl.max()),
+        'value_error_mean': float(value_error.mean()),
+        'value_error_max': float(value_error.max()),
+        'top1_agreement': float(np.mean(reference_p.argmax(axis=1) == p.argmax(axis=1)))
+    }
+
+if __name__ == '__main__':
+    #python -m value_policy_net.quantization models/batch_1920.npz [replay_directory | positions.npz]
+    #The positions are drawn from the PersistentReplayBuffer of a training run, train_nn's replay_path,
+    #or read from N x dim x dim x 3 planes stored under 'planes'. Random positions are used without them
+    from value_policy_net.benchmarks import benchmark_predict, print_results, random_positions
+    from value_policy_net.board_encoder import BoardEncoder
+
+    reference_nn = NumpyNet(sys.argv[1])
+    if len(sys.argv) > 2 and os.path.isdir(sys.argv[2]):
+        planes = load_replay_planes(sys.argv[2], 2000)
+    elif len(sys.argv) > 2:
+        with np.load(sys.argv[2]) as positions:
+            planes = positions['planes']
+    else:
+        grids, players = random_positions(reference_nn.board_dimension, 2000)
+        planes = BoardEncoder(reference_nn.board_dimension).encode(grids, players).copy()
+    calibration_planes, test_planes = planes[:len(planes) // 2], planes[len(planes) // 2:]
+
+    print_results("float32", benchmark_predict(reference_nn))
+    for precision in PRECISIONS:
+        nn = QuantizationSimulator(sys.argv[1], precision)
+        nn.calibrate(calibration_planes)
+        print(precision, "weights bytes in reduced precision:", nn.get_quantized_bytes())
+        print_results(precision + " accuracy", accuracy_report(reference_nn, nn, test_planes))
+        print_results(precision + " speed", benchmark_predict(nn))
@@ -0,0 +1,55 @@
+import numpy as np
+
+class ReservoirSample():
+    """Fixed size uniform sample of a stream of training samples (reservoir sampling, algorithm R).
+    Memory and evaluation cost stay constant however many samples are offered.
+    """
+    def __init__(self, capacity, seed=None):
+        """Initialize an empty sample
+        Args:
+            capacity: maximum number of samples kept
+            seed: seed of the random generator choosing the replaced samples
+        Fields:
+            self.seen: number of samples offered so far
+        """
+        self.capacity = capacity
+        self.rng = np.random.RandomState(seed)
+        self.planes = None
+        self.labels_p = None
+        self.labels_v = None
+        self.size = 0
+        self.seen = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, planes, labels_p, labels_v):
+        """Offer samples to the reservoir, each kept sample ends up in it with probability capacity / seen
+        Args:
+            planes: N x dim x dim x 3 input planes
+            labels_p: N x (dim x dim + 1) policy labels
+            labels_v: N x 1 value labels
+        """
+        if self.planes is None:
+            self.planes = np.zeros((self.capacity,) + planes.shape[1:], dtype=np.float32)
+            self.labels_p = np.zeros((self.capacity,) + np.shape(labels_p)[1:], dtype=np.float32)
+            self.labels_v = np.zeros((self.capacity,) + np.shape(labels_v)[1:], dtype=np.float32)
+
+        for i in range(len(planes)):
+            if self.size < self.capacity:
+                index = self.size
+                self.size += 1
+            else:
+                index = self.rng.randint(self.seen + 1)
+            self.seen += 1
+            if index < self.capacity:
+                self.planes[index] = planes[i]
+                self.labels_p[index] = labels_p[i]
+                self.labels_v[index] = labels_v[i]
+
+    def get_samples(self):
+        """Current samples
+        Returns:
+            (planes, labels_p, labels_v) arrays of the kept samples
+        """
+        return self.planes[:self.size], self.labels_p[:self.size], self.labels_v[:self.size]
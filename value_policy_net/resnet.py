@@ -3,16 +3,26 @@ import numpy as np
 import os
 import random
 import logging
+import threading
+import time
+
+from collections import deque
 
 from game.game_board import GameBoard
 from game.go_board import GoBoard
+from value_policy_net.board_encoder import BoardEncoder, board_moves, mask_policy
+from value_policy_net.frozen_net import FrozenNet
+from value_policy_net.network_config import NetworkConfig
+from value_policy_net.numpy_net import is_inference_variable
+from value_policy_net.reservoir_sample import ReservoirSample
 
 class ResNet():
     """Go algorithm without human knowledge
     Original paper from: https://www.nature.com/articles/nature24270.pdf
     Using a res net and capability amplification with Monte Carlo Tree Search
     """
-    def __init__(self, board_dimension = 5, l2_beta=0.0001, model_path=None, restored=False):
+    def __init__(self, board_dimension = 5, l2_beta=0.0001, model_path=None, restored=False, frozen_inference=False,
+                 held_out_size=300, evaluation_interval=10, config=None, inference_only=False):
         """Initialize a supervised learning res net model
         Args:
             board_dimension: dimension for the go board to learn. A regular go board is 19*19
@@ -20,19 +30,68 @@ class ResNet():
             l2_beta: constant used for l2 regularization
             model_path: path to the model to be restored from or save to
             restored: boolean indicating if we want to restore a saved model
+            frozen_inference: True to run predict on a frozen copy of the network with batch norm folded in,
+                rebuilt whenever the weights change
+            held_out_size: number of samples in the held out set, a reservoir sample of the positions given to hold_out
+            evaluation_interval: number of training batches between two evaluations of the held out set
+            config: NetworkConfig of the architecture. When it is None, the config saved with the restored model
+                is used, or the original architecture for board_dimension and l2_beta
+            inference_only: True to build only the network, for play and evaluation. There is no loss, optimizer,
+                summary writer or training log, so the model is ready sooner, and the train functions raise ValueError
         """
+        if config == None and restored:
+            config = NetworkConfig.load(model_path)
+        if config == None:
+            config = NetworkConfig(board_dimension=board_dimension, l2_beta=l2_beta)
+        if config.input_planes != 3:
+            raise ValueError("BoardEncoder produces 3 input planes, the config asks for " + str(config.input_planes))
+        self.config = config
+        board_dimension = config.board_dimension
         self.board_dimension = board_dimension
+        self.frozen_inference = frozen_inference
+        self.frozen_net = None
+        #Move of each policy entry, pass is the last one
+        self.moves = board_moves(board_dimension)
+        self.encoder = BoardEncoder(board_dimension)
+        self.inference_only = inference_only
+        #Used for Tensorboard
+        self.batch_num = 0 
+        #Changes whenever the weights change, used to invalidate evaluation caches
+        self.weights_version = 0
+        #Held while predicting and while restoring, so a prediction never reads half restored weights
+        self.weights_lock = threading.RLock()
 
         #Define the tensors that compose the graph
-        self.regularizer = tf.contrib.layers.l2_regularizer(l2_beta)
-        self.x = tf.placeholder(tf.float32, [None, self.board_dimension, self.board_dimension, 3], name="input")
-        self.yp = tf.placeholder(tf.float32, [None,  self.board_dimension*self.board_dimension + 1], name="labels_p")
-        self.yv = tf.placeholder(tf.float32, [None, 1], name="labels_v")
+        self.regularizer = tf.contrib.layers.l2_regularizer(config.l2_beta)
+        #A fully convolutional network takes boards of any dimension
+        input_dimension = None if config.fully_convolutional else self.board_dimension
+        policy_size = None if config.fully_convolutional else self.board_dimension*self.board_dimension + 1
+        if inference_only:
+            self.x = tf.placeholder(tf.float32, [None, input_dimension, input_dimension, config.input_planes], name="input")
+            self.yp_, self.yv_, self.yp_logits, self.yv_logits = self.build_network(self.x)
+            self.sess = tf.get_default_session()
+            #Only the network variables exist, the optimizer slots of the checkpoint are not read
+            self.saver = tf.train.Saver(max_to_keep=500)
+            if restored:
+                self.restore(model_path)
+            else:
+                self.sess.run(tf.global_variables_initializer())
+            return
+
+        #Inputs are fed, or read from a tf.data pipeline when they are not fed
+        self.dataset_iterator = tf.data.Iterator.from_structure((tf.float32, tf.float32, tf.float32),
+            ([None, input_dimension, input_dimension, config.input_planes], [None, policy_size], [None, 1]))
+        dataset_x, dataset_yp, dataset_yv = self.dataset_iterator.get_next()
+        #Dataset the iterator was last initialized with
+        self.dataset = None
+        self.x = tf.placeholder_with_default(dataset_x, [None, input_dimension, input_dimension, config.input_planes], name="input")
+        self.yp = tf.placeholder_with_default(dataset_yp, [None, policy_size], name="labels_p")
+        self.yv = tf.placeholder_with_default(dataset_yv, [None, 1], name="labels_v")
         self.yp_, self.yv_, self.yp_logits, self.yv_logits = self.build_network(self.x) 
         with tf.variable_scope("loss", reuse=tf.AUTO_REUSE) as scope:
             value_loss, policy_loss, reg_loss = self.calc_loss()
-        #Used for Tensorboard
-        self.batch_num = 0 
+        self.value_loss = value_loss
+        self.policy_loss = policy_loss
         tf.summary.scalar('TrainingLoss', self.loss)
         tf.summary.scalar('TraingValueLoss', value_loss)
         tf.summary.scalar('TraingPolicyLoss', policy_loss)
@@ -57,11 +116,10 @@ class ResNet():
 
         self.sess.run(tf.global_variables_initializer())
 
-        #For logging
-        self.recorded_losses = np.empty(0)
-        self.training_data_sample = np.empty(0)
-        self.training_label_p_sample = np.empty(0)
-        self.training_label_v_sample = np.empty(0)
+        #For logging, the held out set and the recorded losses have a bounded size
+        self.held_out_set = ReservoirSample(held_out_size)
+        self.evaluation_interval = evaluation_interval
+        self.recorded_losses = deque(maxlen=100)
 
         self.logger = logging.getLogger('alphago0_training')
         self.logger.setLevel(logging.INFO)
@@ -73,9 +131,10 @@ class ResNet():
         self.logger.addHandler(fh) 
         self.logger.info('creating an instance of ResNet')
         
+        #Created once, a Saver adds save and restore ops to the graph every time it is built
+        self.saver = tf.train.Saver(max_to_keep=500)
         if restored:
-            saver = tf.train.Saver(max_to_keep=500)
-            saver.restore(self.sess, model_path)
+            self.restore(model_path)
 
     def calc_accuracy(self):
         """Calculate the accuracy function for the fake value network
@@ -128,14 +187,14 @@ class ResNet():
         
     def build_conv_block(self, input_tensor, varscope):
         with tf.variable_scope(varscope, reuse=tf.AUTO_REUSE) as scope:
-            Z = tf.layers.conv2d(input_tensor, filters=64, kernel_size=3, strides=1, padding="SAME", kernel_regularizer=self.regularizer)
+            Z = tf.layers.conv2d(input_tensor, filters=self.config.filters, kernel_size=3, strides=1, padding="SAME", kernel_regularizer=self.regularizer)
             Z = tf.layers.batch_normalization(Z)
             A = tf.nn.relu(Z, name="A")
             return A
 
     def build_res_layer(self, input_tensor, res_tensor, varscope):
         with tf.variable_scope(varscope, reuse=tf.AUTO_REUSE) as scope:
-            Z = tf.layers.conv2d(input_tensor, filters=64, kernel_size=3, strides=1, padding="SAME", kernel_regularizer=self.regularizer)
+            Z = tf.layers.conv2d(input_tensor, filters=self.config.filters, kernel_size=3, strides=1, padding="SAME", kernel_regularizer=self.regularizer)
             Z = tf.layers.batch_normalization(Z)
             A = Z + res_tensor
             A = tf.nn.relu(A)
@@ -173,7 +232,7 @@ class ResNet():
     def build_network(self, x):
         """ResNet structure
         Args:
-            x: input as a tf placeholder of dimension board_dim*board_dim*3
+            x: input as a tf placeholder of dimension board_dim*board_dim*input_planes
         Returns:
             p_logits, v_logits: the logits for policy and value
             P, V: output of policy and value heads
@@ -181,19 +240,23 @@ class ResNet():
 
         A = self.build_conv_block(input_tensor=x, varscope="conv1")
 
-        for i in range(3):
+        for i in range(self.config.residual_blocks):
             A = self.build_res_block(input_tensor=A, varscope="res" + str(i))
 
+        if self.config.fully_convolutional:
+            p_logits, v_logits = self.build_fully_convolutional_heads(A)
+            return tf.nn.softmax(p_logits), tf.nn.tanh(v_logits), p_logits, v_logits
+
         #Policy head
-        ph1 = self.build_head_conv_layer(A, "policy_head", filter=2)
+        ph1 = self.build_head_conv_layer(A, "policy_head", filter=self.config.policy_head_filters)
         ph1 = tf.contrib.layers.flatten(ph1)
         p_logits = tf.contrib.layers.fully_connected(ph1, self.board_dimension*self.board_dimension+1, activation_fn=None)
 
         #Value head
-        vh1 = self.build_head_conv_layer(A, "value_head", filter=1)
+        vh1 = self.build_head_conv_layer(A, "value_head", filter=self.config.value_head_filters)
         vh2 = tf.contrib.layers.flatten(vh1)
-        vh2 = tf.contrib.layers.fully_connected(vh2, 256)
-        vh2 = tf.contrib.layers.fully_connected(vh2, 256)
+        for i in range(self.config.value_head_layers):
+            vh2 = tf.contrib.layers.fully_connected(vh2, self.config.value_head_units)
         v_logits = tf.contrib.layers.fully_connected(vh2, 1, activation_fn=None)
         
         P = tf.nn.softmax(p_logits)
@@ -201,59 +264,152 @@ class ResNet():
 
         return P, V, p_logits, v_logits
 
+    def build_fully_convolutional_heads(self, A):
+        """Policy and value heads that work on any board dimension
+        Args:
+            A: output of the residual tower
+        Returns:
+            p_logits, v_logits: the logits for policy, with pass last, and value
+        """
+        #Policy head: one logit per intersection from a 1x1 convolution, the pass logit from the pooled features
+        ph1 = self.build_head_conv_layer(A, "policy_head", filter=self.config.policy_head_filters)
+        with tf.variable_scope("policy_conv", reuse=tf.AUTO_REUSE) as scope:
+            board_logits = tf.layers.conv2d(ph1, filters=1, kernel_size=1, strides=1, padding="SAME", kernel_regularizer=self.regularizer)
+        board_logits = tf.reshape(board_logits, [tf.shape(board_logits)[0], -1])
+        pass_logit = tf.contrib.layers.fully_connected(tf.reduce_mean(ph1, axis=[1, 2]), 1, activation_fn=None, scope="pass_logit")
+        p_logits = tf.concat([board_logits, pass_logit], axis=1)
+
+        #Value head: global average pooling, then the same fully connected layers as the original head
+        vh1 = self.build_head_conv_layer(A, "value_head", filter=self.config.value_head_filters)
+        vh2 = tf.reduce_mean(vh1, axis=[1, 2])
+        for i in range(self.config.value_head_layers):
+            vh2 = tf.contrib.layers.fully_connected(vh2, self.config.value_head_units, scope="fully_connected_" + str(i + 1))
+        v_logits = tf.contrib.layers.fully_connected(vh2, 1, activation_fn=None, scope="fully_connected_" + str(self.config.value_head_layers + 1))
+        return p_logits, v_logits
+
     def train(self, training_boards, training_labels_p, training_labels_v, model_path = None):
         """Train the res net model with results from each iteration of self play.
         Args:
             model_path: location where we want the final model to be saved,
                 None if we don't want to save the model
-            training_boards: an array of board grids
+            training_boards: an array of boards, or an N x dim x dim x 3 array of encoded input planes
             training_labels_p: an dim x dim + 1 array indicating the policy for current board
             training_labels_v: an array of results indicating who is the winner
         Returns:
             None, but a model is saved at the model_path
         """
+        self.check_trainable()
         self.batch_num += 1
         self.logger.info("batch number:" + str(self.batch_num))
-        training_boards = np.array([self.convert_to_resnet_input(board) for board in training_boards])
+        if not (isinstance(training_boards, np.ndarray) and training_boards.ndim == 4):
+            training_boards = self.encoder.encode_boards(training_boards)
+
         _, training_loss, summary = self.sess.run(
             [self.train_op, self.loss, self.merged],
             feed_dict={self.x: training_boards, self.yp: training_labels_p, self.yv: training_labels_v}
         )
+        self.weights_version += 1
         self.train_writer.add_summary(summary, self.batch_num)
+        print("Training loss for this batch is:", training_loss)
+        self.logger.info("Training loss for this batch is: " + str(training_loss))
 
-        if len(self.training_data_sample) == 0:
-            self.training_data_sample = training_boards[0:3]
-        else:
-            self.training_data_sample = np.append(self.training_data_sample, training_boards[0:3], axis=0)
-        if len(self.training_label_p_sample) == 0:
-            self.training_label_p_sample = training_labels_p[0:3]
-        else:
-            self.training_label_p_sample = np.append(self.training_label_p_sample, training_labels_p[0:3], axis=0)
-        if len(self.training_label_v_sample) == 0:
-            self.training_label_v_sample = training_labels_v[0:3]
-        else:
-            self.training_label_v_sample = np.append(self.training_label_v_sample, training_labels_v[0:3], axis=0)
-        
-        print("number of training data sample", len(self.training_label_v_sample))
-        self.logger.info("number of training data sample " + str(len(self.training_label_v_sample)))
-        predicted_p, predicted_v, loss = self.sess.run(
-            [self.yp_, self.yv_, self.loss],
-            feed_dict={self.x: self.training_data_sample, self.yp: self.training_label_p_sample, self.yv: self.training_label_v_sample}
+        if self.batch_num % self.evaluation_interval == 0:
+            self.evaluate_held_out_set()
+
+        if model_path:
+            self.save(model_path)
+
+    def hold_out(self, boards, labels_p, labels_v):
+        """Offer positions to the held out set, they should not be given to the train functions.
+        The held out set only has boards of the network's dimension, positions of other dimensions are ignored
+        Args:
+            boards: an array of boards, or an N x dim x dim x 3 array of encoded input planes
+            labels_p: N x (dim x dim + 1) policy labels
+            labels_v: N x 1 value labels
+        """
+        self.check_trainable()
+        if not (isinstance(boards, np.ndarray) and boards.ndim == 4):
+            boards = self.encoder.encode_boards(boards)
+        if len(boards) > 0 and boards.shape[1] == self.board_dimension:
+            self.held_out_set.add(boards, np.asarray(labels_p), np.asarray(labels_v).reshape(-1, 1))
+
+    def restore(self, model_path):
+        """Load the variables of a checkpoint into the existing graph, without rebuilding it
+        Args:
+            model_path: checkpoint path, saved from a network with the same config
+        """
+        with self.weights_lock:
+            self.saver.restore(self.sess, model_path)
+            self.weights_version += 1
+
+    def check_trainable(self):
+        if self.inference_only:
+            raise ValueError("The res net was built with inference_only, it has no training operations")
+
+    def save(self, model_path):
+        """Save the variables and the network config next to them
+        Args:
+            model_path: checkpoint path, the config is written to model_path.config.json
+        """
+        self.saver.save(self.sess, model_path)
+        self.config.save(model_path)
+
+    def evaluate_held_out_set(self):
+        """Evaluate the losses on the held out set and write them to the summary writer
+        Returns:
+            the total loss on the held out set, None if the set is empty
+        """
+        self.check_trainable()
+        if len(self.held_out_set) == 0:
+            return None
+        planes, labels_p, labels_v = self.held_out_set.get_samples()
+        loss, value_loss, policy_loss = self.sess.run(
+            [self.loss, self.value_loss, self.policy_loss],
+            feed_dict={self.x: planes, self.yp: labels_p, self.yv: labels_v}
         )
+        summary = tf.Summary(value=[
+            tf.Summary.Value(tag='HeldOutLoss', simple_value=loss),
+            tf.Summary.Value(tag='HeldOutValueLoss', simple_value=value_loss),
+            tf.Summary.Value(tag='HeldOutPolicyLoss', simple_value=policy_loss)
+        ])
+        self.train_writer.add_summary(summary, self.batch_num)
 
-        if len(self.recorded_losses) == 0:
-            self.recorded_losses = np.array([loss])
-        else:
-            self.recorded_losses = np.append(self.recorded_losses, [loss], axis=0)
-        print("Losses throughout training", str(self.recorded_losses))
-        print("Training loss for this batch is:", training_loss)
+        self.recorded_losses.append(loss)
+        print("Held out losses throughout training", list(self.recorded_losses))
+        self.logger.info("Held out loss on " + str(len(self.held_out_set)) + " samples: " + str(loss))
+        return loss
 
-        self.logger.info("Losses throughout training " +  str(self.recorded_losses))
-        self.logger.info("Training loss for this batch is: " + str(training_loss))
+    def train_on_dataset(self, dataset, steps, model_path = None):
+        """Train the res net on a tf.data pipeline, such as the ones of input_pipeline.
+        Batches are read inside the graph, so no data goes through feed_dict
+        Args:
+            dataset: a tf.data.Dataset of (x, yp, yv) batches. Passing the same dataset again continues
+                where the previous call stopped, so an endless dataset can be trained on a few steps at a time
+            steps: number of training steps
+            model_path: location where the final model is saved, None to not save it
+        Returns:
+            (loss, samples_per_second): the loss of the last step and the training throughput
+        """
+        self.check_trainable()
+        if dataset is not self.dataset:
+            self.sess.run(self.dataset_iterator.make_initializer(dataset))
+            self.dataset = dataset
+        samples = 0
+        start_time = time.perf_counter()
+        for step in range(steps):
+            self.batch_num += 1
+            _, loss, summary, batch_yv = self.sess.run([self.train_op, self.loss, self.merged, self.yv])
+            samples += len(batch_yv)
+            self.train_writer.add_summary(summary, self.batch_num)
+            if self.batch_num % self.evaluation_interval == 0:
+                self.evaluate_held_out_set()
+        samples_per_second = samples / (time.perf_counter() - start_time)
+        self.weights_version += 1
+        self.logger.info("dataset training loss: " + str(loss) + ", samples per second: " + str(samples_per_second))
 
         if model_path:
-            saver = tf.train.Saver(max_to_keep=500)
-            save_path = saver.save(self.sess, model_path)
+            self.save(model_path)
+        return loss, samples_per_second
 
     def generate_mini_batches(self, batch_size, train_data, train_labels_p, train_labels_v):
         """ Yield mini batches in tuples from the original dataset with a specified batch size
@@ -328,32 +484,81 @@ class ResNet():
         """Given a board. predict (p,v) according to the current res net
         Args:
             board: current board including the current player and stone distribution
-            model_path: None if we used the model previously trained for this object, 
-                otherwise restore the model from this path used in real time playing
         Returns:
             p_dist: the probability distribution dictionary of the next move according to current policy. including pass
             v: the probability of winning from this board.
         """
+        p, v = self.predict_batch([board])
+        moves = self.moves if board.board_dimension == self.board_dimension else board_moves(board.board_dimension)
+        return dict(zip(moves, p[0])), v[0]
 
-        p_dist = {}
-        input_to_nn = self.convert_to_resnet_input(board)
+    def predict_batch(self, boards, legal_mask=None):
+        """Predict (p, v) for several positions with a single session run
+        Args:
+            boards: a list of boards, or an N x dim x dim x 3 array of encoded input planes
+            legal_mask: optional N x (dim x dim + 1) array, nonzero for legal moves.
+                Illegal moves get probability 0 and the policy of each position is renormalized
+        Returns:
+            p: N x (dim x dim + 1) array of move probabilities, pass is the last column
+            v: array of the N values
+        """
+        with self.weights_lock:
+            if self.frozen_inference:
+                return self.get_frozen_net().predict_batch(boards, legal_mask)
 
-        p = self.sess.run(self.yp_, feed_dict={self.x: [input_to_nn]})
-        v = self.sess.run(self.yv_, feed_dict={self.x: [input_to_nn]})
+            if isinstance(boards, np.ndarray):
+                planes = boards
+            else:
+                planes = self.encoder.encode_boards(boards)
 
-        p = p[0]
-        p_dist[(-1, -1)] = p[self.board_dimension**2]
-        for r in range(self.board_dimension):
-            for c in range(self.board_dimension):
-                p_dist[(r, c)] = p[r * self.board_dimension + c]
-        
-        return p_dist, v
+            p, v = self.sess.run([self.yp_, self.yv_], feed_dict={self.x: planes})
+
+        return mask_policy(p, legal_mask), v[:, 0]
+
+    def get_inference_weights(self):
+        """Current values of the network variables, without optimizer slots and counters
+        Returns:
+            dictionary from variable name to value, with the names used in checkpoints
+        """
+        variables = [variable for variable in self.sess.graph.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)
+            if is_inference_variable(variable.op.name)]
+        return dict(zip([variable.op.name for variable in variables], self.sess.run(variables)))
+
+    def get_frozen_net(self):
+        """Frozen inference copy of the network for the current weights, rebuilt after the weights changed
+        """
+        if self.frozen_net == None or self.frozen_net.weights_version != self.weights_version:
+            if self.frozen_net != None:
+                self.frozen_net.close()
+            self.frozen_net = FrozenNet(self.get_inference_weights(), self.board_dimension)
+            self.frozen_net.weights_version = self.weights_version
+        return self.frozen_net
+
+    def verify_frozen_net(self, boards_number=64, tolerance=1e-4):
+        """Compare the frozen network with the training graph on random positions
+        Args:
+            boards_number: number of random positions
+            tolerance: largest absolute difference allowed on any probability or value
+        Returns:
+            (policy_error, value_error): largest absolute differences between the two networks
+        Raises:
+            ValueError if a difference is larger than tolerance
+        """
+        grids = np.random.randint(-1, 2, size=(boards_number, self.board_dimension, self.board_dimension))
+        players = np.random.choice([-1, 1], size=boards_number)
+        planes = self.encoder.encode(grids, players).copy()
+
+        p, v = self.sess.run([self.yp_, self.yv_], feed_dict={self.x: planes})
+        frozen_p, frozen_v = self.get_frozen_net().predict_batch(planes)
+        policy_error = float(np.abs(frozen_p - p).max())
+        value_error = float(np.abs(frozen_v - v[:, 0]).max())
+        if policy_error > tolerance or value_error > tolerance:
+            raise ValueError("Frozen network differs from the training graph: policy error {}, value error {}".format(
+                policy_error, value_error))
+        return policy_error, value_error
 
     def convert_to_resnet_input(self, original_board):
-        converted_grid = np.array(self.convert_to_one_hot_boards(original_board.board_grid))   
-        player_layer = np.ones((self.board_dimension , self.board_dimension , 1)) * original_board.player
-        append_result = np.append(converted_grid, player_layer, axis = 2)
-        return append_result
+        return self.encoder.encode_boards([original_board])[0].copy()
 
     def convert_to_one_hot_boards(self, original_board_grid):
         """Convert the format of the go board from a dim by dim 2d array to a dim by dim by 3 3d array.
@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+from game.go_board import GoBoard
+from value_policy_net.board_encoder import BoardEncoder, mask_policy
+
+class BoardEncoderTest(unittest.TestCase):
+    def test_encode_boards(self):
+        encoder = BoardEncoder(board_dimension = 3)
+        board = GoBoard(3, 1, board_grid = [[1, 0, -1], [0, -1, 0], [1, 0, 0]], game_history = [])
+        planes = encoder.encode_boards([board, GoBoard(3, -1, board_grid = [], game_history = [])])
+
+        self.assertEqual(planes.shape, (2, 3, 3, 3))
+        self.assertEqual(planes.dtype, np.float32)
+        npt.assert_array_equal(planes[0, :, :, 0], [[0, 0, 1], [0, 1, 0], [0, 0, 0]])
+        npt.assert_array_equal(planes[0, :, :, 1], [[1, 0, 0], [0, 0, 0], [1, 0, 0]])
+        npt.assert_array_equal(planes[0, :, :, 2], np.ones((3, 3)))
+        npt.assert_array_equal(planes[1, :, :, :2], np.zeros((3, 3, 2)))
+        npt.assert_array_equal(planes[1, :, :, 2], -np.ones((3, 3)))
+
+    def test_buffer_reuse(self):
+        encoder = BoardEncoder(board_dimension = 5, batch_size = 4)
+        grids = np.random.randint(-1, 2, size=(10, 5, 5)).astype(np.int8)
+        players = np.ones(10)
+        planes = encoder.encode(grids, players)
+        self.assertEqual(len(planes), 10)
+        #Smaller batches are written into the same buffer
+        self.assertTrue(np.shares_memory(encoder.encode(grids[:3], players[:3]), planes))
+        npt.assert_array_equal(planes[:3, :, :, 1], grids[:3] == 1)
+
+    def test_mask_policy(self):
+        p = np.array([[0.5, 0.25, 0.25], [0.5, 0.5, 0.0]])
+        legal_mask = np.array([[1, 1, 0], [0, 0, 1]])
+        npt.assert_allclose(mask_policy(p, legal_mask), [[2.0 / 3, 1.0 / 3, 0.0], [0.0, 0.0, 0.0]])
+        self.assertTrue(mask_policy(p, None) is p)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+import tensorflow as tf
+
+from value_policy_net.checkpoint_manager import CheckpointManager, select_checkpoints_to_keep
+
+class CheckpointManagerTest(unittest.TestCase):
+    def test_select_checkpoints_to_keep(self):
+        entries = [{'index': i} for i in range(25)]
+        kept = select_checkpoints_to_keep(entries, keep_last=3, keep_every=10)
+        self.assertEqual([entry['index'] for entry in kept], [0, 10, 20, 22, 23, 24])
+
+    def test_save_and_restore(self):
+        directory = tempfile.mkdtemp()
+        with tf.Graph().as_default():
+            weights = tf.get_variable('conv1/kernel', initializer=np.zeros((3, 3), dtype=np.float32))
+            increment = tf.assign_add(weights, np.ones((3, 3), dtype=np.float32))
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                manager = CheckpointManager(sess, directory, keep_last=2, keep_every=3)
+                for step in range(1, 6):
+                    sess.run(increment)
+                    manager.save(step * 10)
+                manager.close()
+
+                with open(os.path.join(directory, 'manifest.json')) as manifest_file:
+                    manifest = json.load(manifest_file)
+                self.assertEqual([entry['step'] for entry in manifest['checkpoints']], [10, 40, 50])
+                self.assertEqual(manifest['latest'], os.path.join(directory, 'batch_50'))
+                self.assertFalse(os.path.exists(os.path.join(directory, 'batch_20.index')))
+
+                #The checkpoint has the names of the original graph and the snapshot values
+                tf.train.Saver().restore(sess, os.path.join(directory, 'batch_40'))
+                np.testing.assert_array_equal(sess.run(weights), 4 * np.ones((3, 3)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from game.go_board import GoBoard
+from value_policy_net.evaluation_cache import EvaluationCache
+from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
+
+class CountingNet(UniformPredictionNet):
+    """ Uniform prediction net that counts its predict calls
+    """
+    def __init__(self, board_dimension = 5):
+        super(CountingNet, self).__init__(board_dimension = board_dimension)
+        self.predict_count = 0
+        self.weights_version = 0
+
+    def predict(self, board):
+        self.predict_count += 1
+        p, v = super(CountingNet, self).predict(board)
+        #Make the policy depend on the position so symmetry mapping is tested
+        for (r, c) in p:
+            if r >= 0:
+                p[(r, c)] = r * 10 + c
+        return p, v
+
+class EvaluationCacheTest(unittest.TestCase):
+    def test_hits_and_lru_eviction(self):
+        nn = CountingNet()
+        cache = EvaluationCache(nn, max_size=2)
+        boards = [GoBoard(5, 1, board_grid=[[0]*5 for r in range(5)], game_history=[]) for i in range(3)]
+        for i in range(3):
+            boards[i].board_grid[0][i] = 1
+
+        cache.predict(boards[0])
+        cache.predict(boards[1])
+        p, _ = cache.predict(boards[0])
+        p.pop((1, 1)) #Callers own their copy
+        self.assertEqual(nn.predict_count, 2)
+        self.assertIn((1, 1), cache.predict(boards[0])[0])
+
+        cache.predict(boards[2]) #Evicts boards[1], the least recently used
+        cache.predict(boards[1])
+        self.assertEqual(nn.predict_count, 4)
+        self.assertEqual(cache.get_stats()['evictions'], 2)
+        self.assertEqual(cache.hits, 2)
+
+    def test_invalidate_when_weights_change(self):
+        nn = CountingNet()
+        cache = EvaluationCache(nn)
+        board = GoBoard(5, 1)
+        cache.predict(board)
+        nn.weights_version += 1
+        cache.predict(board)
+        self.assertEqual(nn.predict_count, 2)
+
+    def test_symmetric_positions_share_an_entry(self):
+        nn = CountingNet()
+        cache = EvaluationCache(nn, use_symmetry=True)
+        board = GoBoard(5, 1, board_grid=[[0]*5 for r in range(5)], game_history=[])
+        board.board_grid[0][1] = 1
+        rotated = GoBoard(5, 1, board_grid=[[0]*5 for r in range(5)], game_history=[])
+        rotated.board_grid[1][4] = 1 #board rotated clockwise
+
+        expected_p, _ = nn.predict(rotated)
+        p, _ = cache.predict(board)
+        p, _ = cache.predict(rotated)
+        self.assertEqual(cache.hits, 1)
+        #The rotated board is answered with the evaluation of the original board, rotated clockwise
+        original_p, _ = nn.predict(board)
+        self.assertEqual(set(p.keys()), set(expected_p.keys()))
+        for (r, c) in p:
+            if r >= 0:
+                self.assertAlmostEqual(p[(r, c)], original_p[(4 - c, r)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import multiprocessing
+import threading
+import time
+import unittest
+import numpy as np
+
+from game.go_board import GoBoard
+from value_policy_net.evaluation_cache import EvaluationCache
+from value_policy_net.inference_server import InferenceServer
+
+class StoneCountNet():
+    """Batched evaluator with a uniform policy, the value is the stone difference for the player to move
+    multiplied by scale
+    """
+    def __init__(self, board_dimension, scale=1.0):
+        self.board_dimension = board_dimension
+        self.scale = scale
+        self.weights_version = 0
+
+    def predict_batch(self, planes):
+        p = np.ones((len(planes), self.board_dimension**2 + 1)) / (self.board_dimension**2 + 1)
+        v = (planes[..., 1].sum(axis=(1, 2)) - planes[..., 0].sum(axis=(1, 2))) * planes[:, 0, 0, 2] * self.scale
+        return p, v
+
+class FailingNet():
+    """Batched evaluator raising on its first fail_batches calls, like a model whose session was closed
+    """
+    def __init__(self, board_dimension, fail_batches=1):
+        self.board_dimension = board_dimension
+        self.fail_batches = fail_batches
+
+    def predict_batch(self, planes):
+        if self.fail_batches > 0:
+            self.fail_batches -= 1
+            raise RuntimeError("session is closed")
+        return StoneCountNet(self.board_dimension).predict_batch(planes)
+
+def predict_in_process(client, result_queue):
+    board = GoBoard(3, -1, board_grid=[[1, 1, 0], [0, 0, 0], [0, 0, 0]], game_history=[])
+    result_queue.put(client.predict(board)[1])
+
+class InferenceServerTest(unittest.TestCase):
+    def test_threads_share_batches(self):
+        server = InferenceServer(StoneCountNet(3), max_batch_size=8, max_wait=0.05)
+        server.start()
+        results = {}
+        def search(i, client):
+            grid = [[0] * 3 for r in range(3)]
+            grid[i // 3][i % 3] = 1
+            p, v = client.predict(GoBoard(3, 1, board_grid=grid, game_history=[]))
+            results[i] = (p, v)
+        threads = [threading.Thread(target=search, args=(i, server.create_client())) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.stop()
+
+        self.assertEqual([results[i][1] for i in range(8)], [1.0] * 8)
+        self.assertAlmostEqual(results[0][0][(-1, -1)], 0.1)
+        stats = server.get_stats()
+        self.assertEqual(stats['requests'], 8)
+        #The requests arrive within max_wait, so they are evaluated in fewer batches
+        self.assertTrue(stats['batches'] < 8)
+        self.assertTrue(stats['latency_p99'] >= stats['latency_p50'] > 0)
+
+    def test_swap_model(self):
+        server = InferenceServer(StoneCountNet(3), max_wait=0)
+        client = server.create_client()
+        server.start()
+        board = GoBoard(3, 1, board_grid=[[1, 0, 0], [0, 0, 0], [0, 0, 0]], game_history=[])
+        self.assertEqual(client.predict(board)[1], 1.0)
+        self.assertEqual(client.weights_version, 0)
+        server.swap_model(StoneCountNet(3, scale=0.5))
+        self.assertEqual(client.predict(board)[1], 0.5)
+        self.assertEqual(client.weights_version, 1)
+        server.stop()
+
+    def test_weights_reloaded_in_place(self):
+        nn = StoneCountNet(3)
+        server = InferenceServer(nn, max_wait=0, version_interval=0.01)
+        cache = EvaluationCache(server.create_client())
+        server.start()
+        board = GoBoard(3, 1, board_grid=[[1, 0, 0], [0, 0, 0], [0, 0, 0]], game_history=[])
+        self.assertEqual(cache.predict(board)[1], 1.0)
+
+        #New weights restored into the same evaluator, as ModelRegistry.reload does
+        nn.scale = 0.5
+        nn.weights_version += 1
+        deadline = time.time() + 10
+        while cache.nn.weights_version == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.predict(board)[1], 0.5)
+        self.assertEqual(cache.misses, 2)
+        server.stop()
+
+    def test_failing_evaluator(self):
+        server = InferenceServer(FailingNet(3), max_wait=0)
+        client = server.create_client()
+        server.start()
+        board = GoBoard(3, 1, board_grid=[[1, 0, 0], [0, 0, 0], [0, 0, 0]], game_history=[])
+        with self.assertRaises(RuntimeError):
+            client.predict(board, timeout=10)
+        #The server keeps serving after the failed batch
+        self.assertEqual(client.predict(board, timeout=10)[1], 1.0)
+        self.assertEqual(server.get_stats()['errors'], 1)
+        server.stop()
+
+    def test_process_client(self):
+        server = InferenceServer(StoneCountNet(3), use_processes=True)
+        client = server.create_client()
+        server.start()
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=predict_in_process, args=(client, result_queue))
+        process.start()
+        self.assertEqual(result_queue.get(timeout=30), -2.0)
+        process.join()
+        server.stop()
+
+if __name__ == '__main__':
+    unittest.main()
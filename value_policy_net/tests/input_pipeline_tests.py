@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import tensorflow as tf
+
+from self_play.replay_buffer import ReplayBuffer
+from value_policy_net.input_pipeline import dataset_from_arrays, dataset_from_replay_buffer, dataset_from_shards, write_shard
+
+def stone_samples(sample_number):
+    """Samples with one black stone at (0, 1), half of the policies play at the stone and half pass
+    """
+    planes = np.zeros((sample_number, 5, 5, 3), dtype=np.float32)
+    planes[:, 0, 1, 1] = 1
+    labels_p = np.zeros((sample_number, 26), dtype=np.float32)
+    labels_p[:sample_number // 2, 1] = 1
+    labels_p[sample_number // 2:, 25] = 1
+    return planes, labels_p, np.ones((sample_number, 1))
+
+class InputPipelineTest(unittest.TestCase):
+    def check_batch(self, x, yp):
+        for i in range(len(x)):
+            if yp[i, 25] == 1:
+                self.assertEqual(yp[i, :25].sum(), 0)
+            else:
+                #The augmented policy still points at the augmented stone
+                self.assertEqual(np.argmax(yp[i, :25]), np.argmax(x[i, :, :, 1].reshape(-1)))
+
+    def test_dataset_from_shards(self):
+        planes, labels_p, labels_v = stone_samples(200)
+        directory = tempfile.mkdtemp()
+        paths = [os.path.join(directory, 'shard_' + str(i) + '.tfrecord') for i in range(2)]
+        write_shard(paths[0], planes[:100], labels_p[:100], labels_v[:100])
+        write_shard(paths[1], planes[100:], labels_p[100:], labels_v[100:])
+
+        with tf.Graph().as_default():
+            x, yp, yv = dataset_from_shards(paths, board_dimension=5, batch_size=50).make_one_shot_iterator().get_next()
+            with tf.Session() as sess:
+                for i in range(4):
+                    batch_x, batch_yp, batch_yv = sess.run([x, yp, yv])
+                    self.assertEqual(batch_x.shape, (50, 5, 5, 3))
+                    self.check_batch(batch_x, batch_yp)
+
+    def test_dataset_from_arrays(self):
+        planes, labels_p, labels_v = stone_samples(100)
+        with tf.Graph().as_default():
+            x, yp, yv = dataset_from_arrays(planes, labels_p, labels_v, batch_size=30, repeat=False).make_one_shot_iterator().get_next()
+            with tf.Session() as sess:
+                batch_numbers = 0
+                try:
+                    while True:
+                        batch_x, batch_yp, _ = sess.run([x, yp, yv])
+                        self.check_batch(batch_x, batch_yp)
+                        batch_numbers += 1
+                except tf.errors.OutOfRangeError:
+                    pass
+                #The incomplete last batch is dropped
+                self.assertEqual(batch_numbers, 3)
+
+    def test_dataset_from_replay_buffer(self):
+        replay_buffer = ReplayBuffer(capacity=40, board_dimension=5, seed=0)
+        grids = np.zeros((40, 5, 5), dtype=np.int8)
+        grids[:, 0, 1] = 1
+        _, labels_p, labels_v = stone_samples(40)
+        replay_buffer.add(grids, -np.ones(40), labels_p, labels_v)
+
+        with tf.Graph().as_default():
+            x, yp, yv = dataset_from_replay_buffer(replay_buffer, batch_size=16).make_one_shot_iterator().get_next()
+            with tf.Session() as sess:
+                for i in range(3):
+                    batch_x, batch_yp, batch_yv = sess.run([x, yp, yv])
+                    self.assertEqual(batch_x.shape, (16, 5, 5, 3))
+                    self.check_batch(batch_x, batch_yp)
+                    np.testing.assert_array_equal(batch_yv, np.ones((16, 1)))
+
+if __name__ == '__main__':
+    unittest.main()
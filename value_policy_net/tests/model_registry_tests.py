@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+
+from value_policy_net.model_registry import ModelRegistry
+from value_policy_net.tests.uniform_prediction_net import UniformPredictionNet
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeRegistry(ModelRegistry):
+    """Registry of UniformPredictionNet instances, checkpoints ending with 'wide' need another architecture
+    """
+    def __init__(self, **kwargs):
+        super(FakeRegistry, self).__init__(**kwargs)
+        self.closed = []
+
+    def build_model(self, model_path):
+        nn = UniformPredictionNet(path_to_model = tempfile.gettempdir(), board_dimension = 2)
+        nn.model_path = model_path
+        nn.weights_version = 0
+        return nn
+
+    def restore_model(self, nn, model_path):
+        if model_path.endswith('wide'):
+            return False
+        nn.model_path = model_path
+        nn.weights_version += 1
+        return True
+
+    def close_model(self, nn):
+        self.closed.append(nn.model_path)
+
+class ModelRegistryTest(unittest.TestCase):
+    def test_get_and_reload(self):
+        registry = FakeRegistry(idle_seconds=None)
+        nn = registry.get('best', 'models/batch_10')
+        self.assertTrue(registry.get('best') is nn)
+        self.assertEqual(registry.loads, 1)
+        self.assertRaises(ValueError, registry.get, 'other')
+
+        #Same architecture, the weights are swapped in place
+        self.assertTrue(registry.reload('best', 'models/batch_20') is nn)
+        self.assertEqual((nn.model_path, nn.weights_version), ('models/batch_20', 1))
+
+        #Another architecture, the model is rebuilt with a newer weights version
+        rebuilt_nn = registry.reload('best', 'models/batch_30_wide')
+        self.assertFalse(rebuilt_nn is nn)
+        self.assertEqual(rebuilt_nn.weights_version, 2)
+        self.assertEqual(registry.closed, ['models/batch_20'])
+
+    def test_reload_latest(self):
+        registry = FakeRegistry(idle_seconds=None)
+        directory = tempfile.mkdtemp()
+        registry.load('best', os.path.join(directory, 'batch_10'))
+        self.assertFalse(registry.reload_latest('best', directory))
+
+        with open(os.path.join(directory, 'manifest.json'), 'w') as manifest_file:
+            json.dump({'latest': os.path.join(directory, 'batch_20'), 'checkpoints': []}, manifest_file)
+        self.assertTrue(registry.reload_latest('best', directory))
+        self.assertEqual(registry.get('best').model_path, os.path.join(directory, 'batch_20'))
+        self.assertFalse(registry.reload_latest('best', directory))
+
+    def test_eviction(self):
+        clock = FakeClock()
+        registry = FakeRegistry(idle_seconds=60, max_models=2, clock=clock)
+        registry.load('a', 'models/batch_1')
+        clock.now = 10
+        registry.load('b', 'models/batch_2')
+        clock.now = 20
+        registry.get('a')
+        #The least recently used model goes beyond max_models
+        registry.load('c', 'models/batch_3')
+        self.assertEqual(sorted(registry.models), ['a', 'c'])
+        self.assertEqual(registry.closed, ['models/batch_2'])
+
+        #Models unused for idle_seconds are closed
+        clock.now = 85
+        registry.get('c')
+        self.assertEqual(sorted(registry.models), ['c'])
+        self.assertEqual(registry.evictions, 2)
+
+        registry.close()
+        self.assertEqual(len(registry), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from value_policy_net.network_config import NetworkConfig
+from value_policy_net.numpy_net import value_head_scopes
+
+class NetworkConfigTest(unittest.TestCase):
+    def test_save_and_load(self):
+        config = NetworkConfig(board_dimension=7, filters=32, residual_blocks=6, value_head_layers=1)
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = os.path.join(directory, 'batch_10')
+            self.assertEqual(NetworkConfig.load(model_path), None)
+            config.save(model_path)
+            self.assertTrue(os.path.exists(model_path + '.config.json'))
+            self.assertEqual(NetworkConfig.load(model_path), config)
+        self.assertNotEqual(config, NetworkConfig())
+
+    def test_invalid_config(self):
+        self.assertRaises(ValueError, NetworkConfig, filters=-1)
+        self.assertRaises(ValueError, NetworkConfig, residual_blocks=2.5)
+        for field in ['board_dimension', 'filters', 'value_head_units']:
+            self.assertRaises(ValueError, NetworkConfig, **{field: 0})
+        self.assertEqual(NetworkConfig(residual_blocks=0, value_head_layers=0).residual_blocks, 0)
+        self.assertRaises(ValueError, NetworkConfig.from_dict, {'filters': 32, 'kernel_size': 5})
+
+    def test_value_head_scopes(self):
+        weights = {'fully_connected/weights': None}
+        for i in range(1, 12):
+            weights['fully_connected_' + str(i) + '/weights'] = None
+            weights['fully_connected_' + str(i) + '/biases'] = None
+        scopes = value_head_scopes(weights)
+        self.assertEqual(len(scopes), 11)
+        self.assertEqual(scopes[1], 'fully_connected_2')
+        self.assertEqual(scopes[-1], 'fully_connected_11')
+
+if __name__ == '__main__':
+    unittest.main()
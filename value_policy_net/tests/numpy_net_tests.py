@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import numpy.testing as npt
+
+from game.go_board import GoBoard
+from value_policy_net.numpy_net import NumpyNet, conv2d_same, fold_batch_norm, BATCH_NORM_EPSILON
+
+def random_weights(board_dimension, filters=8, fully_convolutional=False):
+    """Weights with the variable names of a ResNet checkpoint, with a smaller number of filters
+    """
+    weights = {}
+    def conv(scope, in_filters, out_filters, kernel_size):
+        weights[scope + '/conv2d/kernel'] = np.random.randn(kernel_size, kernel_size, in_filters, out_filters) * 0.1
+        weights[scope + '/conv2d/bias'] = np.random.randn(out_filters) * 0.1
+        weights[scope + '/batch_normalization/gamma'] = np.random.rand(out_filters) + 0.5
+        weights[scope + '/batch_normalization/beta'] = np.random.randn(out_filters) * 0.1
+        weights[scope + '/batch_normalization/moving_mean'] = np.random.randn(out_filters) * 0.1
+        weights[scope + '/batch_normalization/moving_variance'] = np.random.rand(out_filters) + 0.5
+    def fc(scope, in_size, out_size):
+        weights[scope + '/weights'] = np.random.randn(in_size, out_size) * 0.1
+        weights[scope + '/biases'] = np.random.randn(out_size) * 0.1
+
+    area = board_dimension * board_dimension
+    conv('conv1', 3, filters, 3)
+    for i in range(3):
+        conv('res' + str(i) + '/conv1', filters, filters, 3)
+        conv('res' + str(i) + '/res2', filters, filters, 3)
+    if fully_convolutional:
+        conv('policy_head', filters, 4, 1)
+        conv('value_head', filters, 4, 1)
+        weights['policy_conv/conv2d/kernel'] = np.random.randn(1, 1, 4, 1) * 0.1
+        weights['policy_conv/conv2d/bias'] = np.random.randn(1) * 0.1
+        fc('pass_logit', 4, 1)
+        fc('fully_connected_1', 4, 256)
+    else:
+        conv('policy_head', filters, 2, 1)
+        conv('value_head', filters, 1, 1)
+        fc('fully_connected', 2 * area, area + 1)
+        fc('fully_connected_1', area, 256)
+    fc('fully_connected_2', 256, 256)
+    fc('fully_connected_3', 256, 1)
+    return weights
+
+class NumpyNetTest(unittest.TestCase):
+    def test_conv2d_same(self):
+        x = np.random.randn(2, 5, 5, 3)
+        kernel = np.random.randn(3, 3, 3, 4)
+        bias = np.random.randn(4)
+        padded = np.pad(x, ((0, 0), (1, 1), (1, 1), (0, 0)))
+        expected = np.zeros((2, 5, 5, 4))
+        for r in range(5):
+            for c in range(5):
+                expected[:, r, c, :] = np.tensordot(padded[:, r:r+3, c:c+3, :], kernel, axes=([1, 2, 3], [0, 1, 2])) + bias
+        npt.assert_allclose(conv2d_same(x, kernel, bias), expected, rtol=1e-6, atol=1e-9)
+
+    def test_fold_batch_norm(self):
+        weights = random_weights(board_dimension = 5)
+        folded = fold_batch_norm(weights)
+        self.assertEqual(sorted([name for name in folded if name.startswith('res0')]),
+            ['res0/conv1/bias', 'res0/conv1/kernel', 'res0/res2/bias', 'res0/res2/kernel'])
+
+        x = np.random.randn(2, 5, 5, 8)
+        Z = conv2d_same(x, weights['res1/res2/conv2d/kernel'], weights['res1/res2/conv2d/bias'])
+        expected = (Z - weights['res1/res2/batch_normalization/moving_mean']) \
+            / np.sqrt(weights['res1/res2/batch_normalization/moving_variance'] + BATCH_NORM_EPSILON) \
+            * weights['res1/res2/batch_normalization/gamma'] + weights['res1/res2/batch_normalization/beta']
+        npt.assert_allclose(conv2d_same(x, folded['res1/res2/kernel'], folded['res1/res2/bias']), expected, rtol=1e-6, atol=1e-9)
+
+    def test_predict(self):
+        weights_path = os.path.join(tempfile.mkdtemp(), 'weights.npz')
+        np.savez(weights_path, **random_weights(board_dimension = 5))
+        nn = NumpyNet(weights_path)
+        self.assertEqual(nn.board_dimension, 5)
+        self.assertEqual(nn.res_block_number, 3)
+
+        board = GoBoard(5, 1, board_grid=[], game_history=[])
+        other_board = GoBoard(5, -1, board_grid=[[1, 0, 0, 0, -1]] + [[0] * 5 for r in range(4)], game_history=[])
+        p, v = nn.predict_batch([board, other_board])
+        self.assertEqual(p.shape, (2, 26))
+        self.assertEqual(v.shape, (2,))
+        npt.assert_allclose(p.sum(axis=1), 1, rtol=1e-5)
+        self.assertTrue(np.all(np.abs(v) <= 1))
+
+        p_dist, single_v = nn.predict(other_board)
+        npt.assert_allclose([p_dist[move] for move in nn.moves], p[1], rtol=1e-5)
+        self.assertAlmostEqual(single_v, v[1], places=5)
+
+    def test_fully_convolutional(self):
+        weights_path = os.path.join(tempfile.mkdtemp(), 'weights.npz')
+        np.savez(weights_path, **random_weights(board_dimension = 5, fully_convolutional = True))
+        self.assertRaises(ValueError, NumpyNet, weights_path)
+        nn = NumpyNet(weights_path, board_dimension = 5)
+        self.assertTrue(nn.fully_convolutional)
+
+        #The same weights evaluate every board dimension
+        for board_dimension in [5, 7, 9]:
+            board = GoBoard(board_dimension, 1, board_grid=[], game_history=[])
+            p, v = nn.predict_batch([board, board])
+            self.assertEqual(p.shape, (2, board_dimension * board_dimension + 1))
+            npt.assert_allclose(p.sum(axis=1), 1, rtol=1e-5)
+            p_dist, single_v = nn.predict(board)
+            self.assertEqual(len(p_dist), board_dimension * board_dimension + 1)
+            self.assertAlmostEqual(p_dist[(-1, -1)], p[0, -1], places=5)
+
+if __name__ == '__main__':
+    unittest.main()
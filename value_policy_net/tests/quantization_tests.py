@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from value_policy_net.board_encoder import BoardEncoder
+from value_policy_net.numpy_net import NumpyNet
+from self_play.replay_buffer import PersistentReplayBuffer
+from value_policy_net.quantization import QuantizationSimulator, accuracy_report, load_replay_planes
+from value_policy_net.quantization import quantize_per_channel, round_to_float16
+from value_policy_net.tests.numpy_net_tests import random_weights
+
+class QuantizationTest(unittest.TestCase):
+    def test_quantize_per_channel(self):
+        weights = np.random.randn(3, 3, 4, 6) * np.arange(1, 7)
+        quantized, scales = quantize_per_channel(weights)
+        self.assertEqual(quantized.dtype, np.int8)
+        self.assertEqual(scales.shape, (6,))
+        #Rounding error is at most half a step of each channel
+        self.assertTrue(np.all(np.abs(quantized * scales - weights) <= scales / 2 + 1e-6))
+
+    def test_round_to_float16(self):
+        x = (np.random.randn(1000) * 100).astype(np.float32)
+        rounded = round_to_float16(x)
+        self.assertEqual(rounded.dtype, np.float32)
+        #Same values as float16, up to ties that round away from zero
+        np.testing.assert_allclose(rounded, x.astype(np.float16).astype(np.float32), rtol=2 ** -10)
+
+    def test_accuracy_report(self):
+        weights_path = os.path.join(tempfile.mkdtemp(), 'weights.npz')
+        np.savez(weights_path, **random_weights(board_dimension = 5))
+        grids = np.random.randint(-1, 2, size=(200, 5, 5))
+        planes = BoardEncoder(5).encode(grids, np.random.choice([-1, 1], size=200)).copy()
+        reference_nn = NumpyNet(weights_path)
+
+        for precision in ['int8', 'float16']:
+            nn = QuantizationSimulator(weights_path, precision)
+            nn.calibrate(planes[:100])
+            report = accuracy_report(reference_nn, nn, planes[100:])
+            self.assertTrue(report['policy_kl_mean'] < 1e-2)
+            self.assertTrue(report['value_error_mean'] < 5e-2)
+        self.assertEqual(len(nn.activation_scales), 13)
+
+        float_bytes = sum([value.nbytes for value in reference_nn.weights.values()])
+        nn = QuantizationSimulator(weights_path, 'int8')
+        self.assertTrue(nn.get_quantized_bytes() < float_bytes / 3)
+        #The simulator itself holds float32 weights
+        self.assertEqual(nn.get_memory_bytes(), float_bytes)
+
+    def test_load_replay_planes(self):
+        directory = tempfile.mkdtemp()
+        replay_buffer = PersistentReplayBuffer(directory, 10, 5)
+        grids = np.random.randint(-1, 2, size=(6, 5, 5))
+        replay_buffer.add(grids, np.ones(6), np.zeros((6, 26)), np.zeros((6, 1)))
+        replay_buffer.close()
+
+        planes = load_replay_planes(directory, 100)
+        self.assertEqual(planes.shape, (6, 5, 5, 3))
+        self.assertEqual(sorted(map(bytes, planes[..., 1] - planes[..., 0])),
+            sorted(map(bytes, grids.astype(np.float32))))
+
+if __name__ == '__main__':
+    unittest.main()
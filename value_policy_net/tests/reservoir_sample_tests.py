@@ -0,0 +1,23 @@
+import unittest
+import numpy as np
+
+from value_policy_net.reservoir_sample import ReservoirSample
+
+class ReservoirSampleTest(unittest.TestCase):
+    def test_bounded_uniform_sample(self):
+        reservoir = ReservoirSample(capacity=500, seed=0)
+        for batch in range(100):
+            #The value label records the index of the sample in the stream
+            indices = np.arange(batch * 100, (batch + 1) * 100)
+            reservoir.add(np.zeros((100, 5, 5, 3)), np.zeros((100, 26)), indices.reshape(-1, 1))
+            self.assertEqual(len(reservoir), min(500, (batch + 1) * 100))
+
+        planes, labels_p, labels_v = reservoir.get_samples()
+        self.assertEqual(planes.shape, (500, 5, 5, 3))
+        self.assertEqual(reservoir.seen, 10000)
+        self.assertEqual(len(np.unique(labels_v)), 500)
+        #Early and late samples are kept alike
+        self.assertAlmostEqual(labels_v.mean() / 10000, 0.5, delta=0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import numpy.testing as npt
 import numpy as np
@@ -6,6 +8,11 @@ import tensorflow as tf
 from game.go_board import GoBoard
 
 from game.go_utils import GoUtils
+from value_policy_net.board_encoder import BoardEncoder
+from value_policy_net.input_pipeline import dataset_from_arrays
+from value_policy_net.model_registry import ModelRegistry
+from value_policy_net.network_config import NetworkConfig
+from value_policy_net.numpy_net import NumpyNet, export_checkpoint
 from value_policy_net.resnet import ResNet
 
 class ResNetTest(unittest.TestCase):
@@ -14,6 +21,118 @@ class ResNetTest(unittest.TestCase):
             res = ResNet(board_dimension=5, l2_beta=1e-4)
             res.fake_train("../models_fake")
 
+    def test_predict_batch(self):
+        with tf.Session().as_default():
+            res = ResNet(board_dimension=5, l2_beta=1e-4)
+            utils = GoUtils()
+            board = GoBoard(board_dimension=5, player=1)
+            _, next_board = utils.make_move(board, (2, 2))
+            p, v = res.predict_batch([board, next_board])
+            self.assertEqual(p.shape, (2, 26))
+            self.assertEqual(v.shape, (2,))
+
+            #predict is the single board case of predict_batch
+            p_dist, single_v = res.predict(next_board)
+            npt.assert_allclose([p_dist[move] for move in res.moves], p[1], rtol=1e-5)
+            self.assertAlmostEqual(single_v, v[1], places=5)
+
+            legal_mask = np.ones((2, 26))
+            legal_mask[:, 12] = 0
+            masked_p, _ = res.predict_batch([board, next_board], legal_mask=legal_mask)
+            npt.assert_allclose(masked_p[:, 12], 0)
+            npt.assert_allclose(masked_p.sum(axis=1), 1, rtol=1e-5)
+
+    def test_frozen_inference(self):
+        with tf.Session().as_default():
+            res = ResNet(board_dimension=5, l2_beta=1e-4)
+            policy_error, value_error = res.verify_frozen_net()
+            self.assertTrue(policy_error < 1e-4 and value_error < 1e-4)
+
+            board = GoBoard(board_dimension=5, player=1)
+            p, v = res.predict_batch([board])
+            res.frozen_inference = True
+            frozen_p, frozen_v = res.predict_batch([board])
+            npt.assert_allclose(frozen_p, p, atol=1e-5)
+            npt.assert_allclose(frozen_v, v, atol=1e-5)
+
+    def test_train_on_dataset(self):
+        with tf.Session().as_default():
+            res = ResNet(board_dimension=5, l2_beta=1e-4)
+            planes = np.random.randint(0, 2, size=(64, 5, 5, 3)).astype(np.float32)
+            labels_p = np.random.dirichlet(np.ones(26), size=64)
+            labels_v = np.random.choice([-1, 1], size=(64, 1))
+            loss, samples_per_second = res.train_on_dataset(dataset_from_arrays(planes, labels_p, labels_v, batch_size=16), steps=5)
+            self.assertTrue(np.isfinite(loss))
+            self.assertTrue(samples_per_second > 0)
+            self.assertEqual(res.weights_version, 1)
+            #Feeding still works with the pipeline attached
+            p, v = res.predict_batch(planes[:2])
+            self.assertEqual(p.shape, (2, 26))
+
+    def test_inference_only(self):
+        board = GoBoard(board_dimension=5, player=1)
+        model_path = os.path.join(tempfile.mkdtemp(), 'batch_1')
+        with tf.Graph().as_default(), tf.Session().as_default():
+            res = ResNet(board_dimension=5, l2_beta=1e-4)
+            res.save(model_path)
+            p, v = res.predict_batch([board])
+
+        with tf.Graph().as_default(), tf.Session().as_default():
+            res = ResNet(model_path=model_path, restored=True, inference_only=True)
+            self.assertFalse(any(['Adam' in variable.op.name for variable in tf.global_variables()]))
+            inference_p, inference_v = res.predict_batch([board])
+            npt.assert_allclose(inference_p, p, atol=1e-6)
+            npt.assert_allclose(inference_v, v, atol=1e-6)
+            self.assertRaises(ValueError, res.train, [board], np.ones((1, 26)) / 26, np.ones((1, 1)))
+
+    def test_registry_reload(self):
+        board = GoBoard(board_dimension=5, player=1)
+        directory = tempfile.mkdtemp()
+        with tf.Graph().as_default(), tf.Session().as_default():
+            res = ResNet(board_dimension=5, l2_beta=1e-4)
+            res.save(os.path.join(directory, 'batch_1'))
+            p, v = res.predict_batch([board])
+            labels_p = np.zeros((16, 26))
+            labels_p[:, 12] = 1
+            res.train([board] * 16, labels_p, np.ones((16, 1)))
+            res.save(os.path.join(directory, 'batch_2'))
+            trained_p, trained_v = res.predict_batch([board])
+        self.assertFalse(np.allclose(trained_p, p, atol=1e-6))
+
+        registry = ModelRegistry(idle_seconds=None)
+        nn = registry.get('best', os.path.join(directory, 'batch_1'))
+        npt.assert_allclose(nn.predict_batch([board])[0], p, atol=1e-6)
+        #The trained weights are restored into the same graph
+        self.assertTrue(registry.reload('best', os.path.join(directory, 'batch_2')) is nn)
+        reloaded_p, reloaded_v = nn.predict_batch([board])
+        npt.assert_allclose(reloaded_p, trained_p, atol=1e-6)
+        npt.assert_allclose(reloaded_v, trained_v, atol=1e-6)
+        self.assertEqual(nn.weights_version, 2)
+        registry.close()
+
+    def test_fully_convolutional_export(self):
+        config = NetworkConfig(board_dimension=5, filters=16, residual_blocks=2, policy_head_filters=4,
+            value_head_filters=4, value_head_units=32, fully_convolutional=True)
+        model_path = os.path.join(tempfile.mkdtemp(), 'batch_1')
+        planes = {}
+        for board_dimension in [5, 7]:
+            grids = np.random.randint(-1, 2, size=(8, board_dimension, board_dimension))
+            planes[board_dimension] = BoardEncoder(board_dimension).encode(grids, np.random.choice([-1, 1], size=8)).copy()
+
+        with tf.Graph().as_default(), tf.Session().as_default():
+            res = ResNet(config=config)
+            res.save(model_path)
+            predictions = {board_dimension: res.predict_batch(planes[board_dimension]) for board_dimension in planes}
+        export_checkpoint(model_path, model_path + '.npz')
+
+        #The same weights play both dimensions after the export
+        nn = NumpyNet(model_path + '.npz', board_dimension=5)
+        for board_dimension in planes:
+            p, v = nn.predict_batch(planes[board_dimension])
+            self.assertEqual(p.shape, (8, board_dimension * board_dimension + 1))
+            npt.assert_allclose(p, predictions[board_dimension][0], atol=1e-5)
+            npt.assert_allclose(v, predictions[board_dimension][1], atol=1e-5)
+
     # def test_convert_to_onehot(self):
     #     with tf.Session().as_default():
     #         res = ResNet(board_dimension=5)